@@ -20,7 +20,90 @@ export const CONFIG = {
   USE_TRUNK_BASED_RENDERING: false,
   USE_DEFERRED_RENDERING: true,
   MAX_VISIBLE_TRUNKS: 256,
+  USE_SERVER_CHUNK_VISIBILITY: true,
+  USE_CHUNK_PREFETCH: true,
   ALPHA_DISCARD_EPSILON: 0.05,
 
-  SORTING_EPSILON: 1e-3
+  SORTING_EPSILON: 1e-3,
+
+  /* Backend (src/scripts) tuning, ignored by the client:
+      INGEST_BLOCK_SPLATS : PLY rows per block when building packed caches
+                            (0 = load the whole scene at once)
+      INGEST_WORKERS      : threads for transform / packing row shards
+                            (0 = one per CPU core)
+      MEMORY_CACHE_BYTES  : in-process LRU budget for packed scenes, chunks
+                            and maps (0 = disabled)
+      STREAM_SLICE_BYTES  : response slice size, rounded to whole splats
+      PRECOMPRESS_ENCODINGS : content codings built once per cache, in order
+                            of preference ('zstd' / 'br' need the zstandard /
+                            brotli packages and are skipped without them);
+                            /ply and /map variants are stored with their
+                            caches, chunk variants by separate_trunk.py, and
+                            only stored variants are ever served
+      PRECOMPRESS_SHUFFLED: also build byte-shuffled variants, served for
+                            ?shuffle=1 with a splat-layout response header
+      PREFETCH_HORIZON_SEC: how far ahead /prefetch_chunks extrapolates the
+                            camera path
+      PREFETCH_RADIUS     : distance from the path within which chunks are
+                            prefetched
+      PREFETCH_BUDGET_BYTES : default byte budget of one prefetch plan
+      PACKED_LAYOUT       : 'full' (PACKED_PIX_PER_SPLAT pixels per splat) or
+                            'compact' (2 pixels / 32 bytes per splat, positions
+                            quantized to bounds); /ply advertises it with
+                            splat-packing / splat-bounds headers. Chunks use
+                            the layout chosen by separate_trunk.py --packing
+      SPATIAL_ORDER       : 'input' (PLY training order) or, opt-in, 'morton'
+                            (splats sorted by 3D Z-order before packing)
+      BLOCK_BOUNDS_SPLATS : splats per bounding box recorded with the packed
+                            cache and served by /block_bounds (0 = none)
+      PRUNE_VARIANTS      : lighter /ply?variant=<name> payloads keeping the
+                            most important splats (opacity x footprint area)
+                            within maxSplats and / or maxBytes (0 = no limit);
+                            /ply_variants lists them with what was dropped
+      PRUNE_REFLECTANCE_WEIGHT : importance boost for reflective splats,
+                            score * (1 + weight * refl_strength)
+      METRICS_ENABLED     : per-stage Server-Timing headers on /ply, /map and
+                            /load_chunk, aggregated as Prometheus histograms
+                            at /metrics (404 when disabled)
+      OFFLOAD_WORKERS     : threads running the blocking work of /ply, /map,
+                            /load_chunk and /load_chunks (0 = one per CPU
+                            core); concurrent requests for the same payload
+                            share one job
+      OFFLOAD_QUEUE       : jobs allowed to wait for a thread; beyond it new
+                            work is refused with 503 + Retry-After
+      OFFLOAD_RETRY_AFTER_SEC : Retry-After sent with those 503s
+      PREWARM             : opt-in; at startup, build or validate the packed
+                            /ply caches (with PRUNE_VARIANTS), chunk manifests
+                            and maps of the scenes under res/; /ready answers
+                            503 until done
+      PREWARM_SCENES      : scenes to prewarm ([] = every scene under res/
+                            except generated bench_* / synth* ones)
+      PREWARM_WORKERS     : scenes prewarmed concurrently
+      PREWARM_PIN         : hot scenes whose /ply and /map bodies are kept in
+                            the memory cache, never evicted
+  */
+  INGEST_BLOCK_SPLATS: 262144,
+  INGEST_WORKERS: 0,
+  MEMORY_CACHE_BYTES: 1073741824,
+  STREAM_SLICE_BYTES: 4194304,
+  PRECOMPRESS_ENCODINGS: ['zstd', 'br', 'gzip'],
+  PRECOMPRESS_SHUFFLED: true,
+  PREFETCH_HORIZON_SEC: 2.0,
+  PREFETCH_RADIUS: 4.0,
+  PREFETCH_BUDGET_BYTES: 67108864,
+  PACKED_LAYOUT: 'full',
+  SPATIAL_ORDER: 'input',
+  BLOCK_BOUNDS_SPLATS: 1024,
+  PRUNE_VARIANTS: {
+    mobile: { maxSplats: 1000000, maxBytes: 33554432 }
+  },
+  PRUNE_REFLECTANCE_WEIGHT: 0.5,
+  METRICS_ENABLED: true,
+  OFFLOAD_WORKERS: 0,
+  OFFLOAD_QUEUE: 16,
+  OFFLOAD_RETRY_AFTER_SEC: 2,
+  PREWARM: false,
+  PREWARM_SCENES: [],
+  PREWARM_WORKERS: 2,
+  PREWARM_PIN: []
 } as const;
\ No newline at end of file
@@ -5,6 +5,7 @@ import { controls } from './scene/controls'
 // Auto-select splat implementation (WebGPU vs WebGL)
 import { Button3D } from './ui3d/Button3D'
 import { CONFIG } from './config'
+import { parseSplatBounds } from './splat/webgl/GaussianSplatWebGL'
 
 // Log renderer capabilities where available (WebGPU renderer may not expose same fields)
 const render_capabilities =
@@ -48,13 +49,35 @@ if (CONFIG.USE_TRUNK_BASED_RENDERING) {
     throw new Error('Trunk streaming is not supported by the active renderer')
   }
 } else {
-  const sceneRes = await fetch(`http://localhost:8000/ply?filename=${encodeURIComponent(CONFIG.SCENE)}`)
+  // phones get the pruned 'mobile' variant (PRUNE_VARIANTS on the server)
+  const variantQuery = /Mobi|Android|iPhone|iPad/i.test(navigator.userAgent) ? '&variant=mobile' : ''
+  const sceneRes = await fetch(`http://localhost:8000/ply?filename=${encodeURIComponent(CONFIG.SCENE)}${variantQuery}`)
   if (!sceneRes.ok) throw new Error(`Failed to fetch scene ${CONFIG.SCENE}`)
 
   const rawByte = await sceneRes.arrayBuffer()
   const srcFloats = new Float32Array(rawByte)
-  const vertexCount = Math.floor(srcFloats.length / CONFIG.PACKED_FLOAT_PER_SPLAT)
-  splat_renderer.setBuffer(srcFloats.buffer, vertexCount)
+  // the server picks the layout (PACKED_LAYOUT) and says so in the headers
+  const compact = sceneRes.headers.get('splat-packing') === 'compact'
+    ? parseSplatBounds(sceneRes.headers.get('splat-bounds'))
+    : null
+  const wordsPerSplat = Number(sceneRes.headers.get('n-channels')) || CONFIG.PACKED_FLOAT_PER_SPLAT
+  const vertexCount = Math.floor(srcFloats.length / wordsPerSplat)
+  if (compact && render_capabilities === 'WebGPU') {
+    console.warn('Compact splat packing is only decoded by the WebGL renderer')
+  }
+  splat_renderer.setBuffer(srcFloats.buffer, vertexCount, compact)
+
+  // per-block boxes (BLOCK_BOUNDS_SPLATS) let the sort worker cull whole blocks
+  if (sceneRes.headers.get('n-blocks') && typeof (splat_renderer as any).setBlockBounds === 'function') {
+    try {
+      const blocksRes = await fetch(`http://localhost:8000/block_bounds?filename=${encodeURIComponent(CONFIG.SCENE)}${variantQuery}`)
+      if (blocksRes.ok) {
+        ;(splat_renderer as any).setBlockBounds(await blocksRes.arrayBuffer(), Number(blocksRes.headers.get('block-splats')))
+      }
+    } catch (err) {
+      console.warn('Block bounds unavailable:', err)
+    }
+  }
 }
 
 try {
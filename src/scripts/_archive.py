@@ -0,0 +1,303 @@
+import os
+import mmap
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.scripts._cache import _open_tmp
+
+# -----------------------------------------------------------------------------
+# Single-file chunk archive: one data file + one binary index
+# -----------------------------------------------------------------------------
+#   res/<scene>/chunks/chunks.bin   data header (magic, generation), then the
+#                                   chunk payloads (raw little-endian uint32
+#                                   words), each starting on a 64-byte boundary
+#   res/<scene>/chunks/chunks.idx   header, fixed-size records, id string table
+#   res/<scene>/chunks/chunks.<encoding>[.shuffled].bin / .idx
+#                                   same pair per precompressed variant: each
+#                                   payload is one chunk compressed on its own
+#
+# A rebuild appends: payloads of unchanged chunks (same id and digest) keep
+# their bytes and offsets, changed or new ones are written past the end of
+# the data file, and only the index is replaced. Readers of the old index
+# never see their bytes move. Once dead payloads would outweigh live ones the
+# pair is rewritten from scratch under a new generation. The index carries
+# the generation and the data size it covers, so a stale or mismatched pair
+# is detected on open. A full rewrite renames the data file into place
+# first, then the index, both before metadata.json.
+
+ARCHIVE_DATA = "chunks.bin"
+ARCHIVE_INDEX = "chunks.idx"
+ARCHIVE_ALIGN = 64
+ARCHIVE_VERSION = 2
+
+# magic, generation; the first payload starts at ARCHIVE_ALIGN
+DATA_HEADER = struct.Struct("<8sQ")
+DATA_MAGIC = b"SPLATBIN"
+
+# magic, version, record count, data size, id table size, generation
+INDEX_HEADER = struct.Struct("<8sIIQQQ")
+INDEX_MAGIC = b"SPLATIDX"
+
+INDEX_RECORD = np.dtype([
+    ("offset", "<u8"),
+    ("length", "<u8"),
+    ("vertex_count", "<u4"),
+    ("id_offset", "<u4"),
+    ("id_length", "<u4"),
+    ("bounds", "<f4", (2, 3)),
+    ("digest", "u1", (20,)),
+])
+DIGEST_BYTES = INDEX_RECORD["digest"].shape[0]
+
+
+def archive_variant(encoding: str, shuffled: bool = False) -> str:
+    return encoding + (".shuffled" if shuffled else "")
+
+
+def archive_paths(chunks_dir: str, variant: str | None = None) -> tuple[str, str]:
+    """
+    Data and index paths of the archive, or of one of its precompressed
+    variants (archive_variant(): chunks.gzip.bin, chunks.gzip.shuffled.idx).
+    """
+    if variant is None:
+        return os.path.join(chunks_dir, ARCHIVE_DATA), os.path.join(chunks_dir, ARCHIVE_INDEX)
+    stem = os.path.join(chunks_dir, f"chunks.{variant}")
+    return stem + ".bin", stem + ".idx"
+
+
+def _aligned(size: int) -> int:
+    return -(-size // ARCHIVE_ALIGN) * ARCHIVE_ALIGN
+
+
+def _digest(digest) -> bytes:
+    # hex (sha1().hexdigest()) or raw bytes, zero-padded; none for plain writes
+    if digest is None:
+        return bytes(DIGEST_BYTES)
+    raw = bytes.fromhex(digest) if isinstance(digest, str) else bytes(digest)
+    return raw[:DIGEST_BYTES].ljust(DIGEST_BYTES, b"\0")
+
+
+def _write_index(index_path: str, generation: int, data_size: int, records: np.ndarray, names: list[bytes]) -> None:
+    id_table = b"".join(names)
+    header = INDEX_HEADER.pack(INDEX_MAGIC, ARCHIVE_VERSION, len(records), data_size, len(id_table), generation)
+    f, tmp = _open_tmp(index_path)
+    try:
+        with f:
+            f.write(header + records.tobytes() + id_table)
+        os.replace(tmp, index_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def read_archive_index(index_path: str) -> tuple[int, int, np.ndarray, list[str]]:
+    """
+    (generation, data size, records, ids) of an archive index; ValueError
+    when it is truncated or of another version.
+    """
+    with open(index_path, "rb") as f:
+        raw = f.read()
+    if len(raw) < INDEX_HEADER.size:
+        raise ValueError(f"Truncated chunk index: {index_path}")
+    magic, version, count, data_size, id_bytes, generation = INDEX_HEADER.unpack_from(raw)
+    if magic != INDEX_MAGIC or version != ARCHIVE_VERSION:
+        raise ValueError(f"Unsupported chunk index: {index_path}")
+    table_start = INDEX_HEADER.size + count * INDEX_RECORD.itemsize
+    if len(raw) != table_start + id_bytes:
+        raise ValueError(f"Truncated chunk index: {index_path}")
+
+    records = np.frombuffer(raw, dtype=INDEX_RECORD, count=count, offset=INDEX_HEADER.size)
+    id_table = raw[table_start:]
+    ids = [
+        id_table[a:a + n].decode("utf-8")
+        for a, n in zip(records["id_offset"].tolist(), records["id_length"].tolist())
+    ]
+    return generation, data_size, records, ids
+
+
+def _check_data_file(f, data_path: str, generation: int, data_size: int) -> int:
+    # the data file may run past the index (an append in progress or
+    # abandoned), never short of it, and must be of the same generation
+    size = os.fstat(f.fileno()).st_size
+    header = f.read(DATA_HEADER.size)
+    if size < data_size or len(header) < DATA_HEADER.size or DATA_HEADER.unpack(header) != (DATA_MAGIC, generation):
+        raise ValueError(f"Chunk archive does not match its index: {data_path}")
+    return size
+
+
+def write_archive(chunks_dir: str, chunks, digests=None, variant: str | None = None) -> int:
+    """
+    Write (id, payload, vertex count, (2, 3) bounds) tuples into a new
+    archive pair, in order; payloads are any contiguous buffer (bytes,
+    uint32 rows). `digests` (one per chunk) let update_archive recognize
+    unchanged payloads later; `variant` names a precompressed variant pair
+    (see archive_paths). Returns the data file size.
+    """
+    data_path, index_path = archive_paths(chunks_dir, variant)
+    chunks = list(chunks)
+    digests = list(digests) if digests is not None else [None] * len(chunks)
+    generation = int.from_bytes(os.urandom(8), "little")
+    records = np.zeros(len(chunks), dtype=INDEX_RECORD)
+    names = []
+    id_offset = 0
+
+    f, tmp = _open_tmp(data_path)
+    try:
+        with f:
+            f.write(DATA_HEADER.pack(DATA_MAGIC, generation).ljust(ARCHIVE_ALIGN, b"\0"))
+            for i, ((chunk_id, payload, vertex_count, bounds), digest) in enumerate(zip(chunks, digests)):
+                f.write(b"\0" * (-f.tell() % ARCHIVE_ALIGN))
+                name = chunk_id.encode("utf-8")
+                records[i] = (
+                    f.tell(), memoryview(payload).nbytes, vertex_count, id_offset, len(name), bounds,
+                    np.frombuffer(_digest(digest), dtype=np.uint8),
+                )
+                f.write(payload)
+                names.append(name)
+                id_offset += len(name)
+            data_size = f.tell()
+        os.replace(tmp, data_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    _write_index(index_path, generation, data_size, records, names)
+    return data_size
+
+
+def _resolve(payloads: list, rows, workers: int) -> None:
+    # build the payloads given as callables (compression), in place
+    rows = [i for i in rows if callable(payloads[i])]
+    if workers > 1 and len(rows) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            built = list(pool.map(lambda i: payloads[i](), rows))
+    else:
+        built = [payloads[i]() for i in rows]
+    for i, payload in zip(rows, built):
+        payloads[i] = payload
+
+
+def update_archive(
+    chunks_dir: str, chunks, digests, variant: str | None = None, workers: int = 1, rewrite: bool = False,
+) -> int:
+    """
+    Bring the archive pair to `chunks` (as in write_archive, with one digest
+    per chunk), writing only the payloads whose id and digest are not
+    already in it: they are appended to the data file and the index is
+    replaced. A payload may be a callable, called only when it has to be
+    written (on `workers` threads). Falls back to a full rewrite, copying
+    kept payloads from the old data file, when there is no readable
+    archive, when dead payloads would outweigh live ones or on `rewrite`
+    (every payload is built again). Returns the number of payloads built.
+    """
+    data_path, index_path = archive_paths(chunks_dir, variant)
+    chunks = list(chunks)
+    payloads = [payload for _, payload, _, _ in chunks]
+    digests = [_digest(d) for d in digests]
+    try:
+        if rewrite:
+            raise ValueError("rewrite requested")
+        generation, data_size, old_records, old_ids = read_archive_index(index_path)
+        with open(data_path, "rb") as f:
+            _check_data_file(f, data_path, generation, data_size)
+    except (OSError, ValueError):
+        _resolve(payloads, range(len(chunks)), workers)
+        write_archive(chunks_dir, [(c[0], p, c[2], c[3]) for c, p in zip(chunks, payloads)], digests, variant)
+        return len(chunks)
+
+    old_rows = {chunk_id: row for row, chunk_id in enumerate(old_ids)}
+    reuse = []
+    for (chunk_id, _, _, _), digest in zip(chunks, digests):
+        row = old_rows.get(chunk_id)
+        reuse.append(row if row is not None and old_records[row]["digest"].tobytes() == digest else None)
+    _resolve(payloads, [i for i, row in enumerate(reuse) if row is None], workers)
+    lengths = [
+        memoryview(payload).nbytes if row is None else int(old_records[row]["length"])
+        for payload, row in zip(payloads, reuse)
+    ]
+
+    live = sum(_aligned(n) for n in lengths)
+    appended = sum(_aligned(n) for n, row in zip(lengths, reuse) if row is None)
+    if _aligned(data_size) + appended - ARCHIVE_ALIGN > 2 * live:
+        with open(data_path, "rb") as f:
+            for i, row in enumerate(reuse):
+                if row is not None:
+                    f.seek(int(old_records[row]["offset"]))
+                    payloads[i] = f.read(lengths[i])
+        write_archive(chunks_dir, [(c[0], p, c[2], c[3]) for c, p in zip(chunks, payloads)], digests, variant)
+        return sum(row is None for row in reuse)
+
+    records = np.zeros(len(chunks), dtype=INDEX_RECORD)
+    names = []
+    id_offset = 0
+    end = data_size
+    for i, ((chunk_id, _, vertex_count, bounds), digest, row) in enumerate(zip(chunks, digests, reuse)):
+        if row is None:
+            offset = _aligned(end)
+            end = offset + lengths[i]
+        else:
+            offset = int(old_records[row]["offset"])
+        name = chunk_id.encode("utf-8")
+        records[i] = (
+            offset, lengths[i], vertex_count, id_offset, len(name), bounds,
+            np.frombuffer(digest, dtype=np.uint8),
+        )
+        names.append(name)
+        id_offset += len(name)
+    if end == data_size and records.tobytes() == old_records.tobytes() and [c[0] for c in chunks] == old_ids:
+        return 0
+
+    with open(data_path, "r+b") as f:
+        # drop what an interrupted append left behind; readers never touch
+        # bytes past the data size of the index they hold
+        f.truncate(data_size)
+        for payload, record, row in zip(payloads, records, reuse):
+            if row is None:
+                f.seek(int(record["offset"]))
+                f.write(payload)
+        f.truncate(end)
+
+    _write_index(index_path, generation, end, records, names)
+    return sum(row is None for row in reuse)
+
+
+class ChunkArchive:
+    """
+    Read side of the archive: the index is parsed once and the data file is
+    memory-mapped, so a chunk payload is a slice of the mapping with no
+    per-request open, zip parse or copy.
+    """
+
+    def __init__(self, chunks_dir: str, variant: str | None = None):
+        data_path, index_path = archive_paths(chunks_dir, variant)
+        generation, data_size, self.records, self.ids = read_archive_index(index_path)
+        self.index = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+
+        with open(data_path, "rb") as f:
+            size = _check_data_file(f, data_path, generation, data_size)
+            # mmap keeps the file alive even if a rebuild replaces it; bytes
+            # past data_size (a later append) are never referenced
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._mmap) if self._mmap is not None else memoryview(b"")
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self.index
+
+    def payload(self, chunk_id: str) -> memoryview:
+        record = self.records[self.index[chunk_id]]
+        offset = int(record["offset"])
+        return self._view[offset:offset + int(record["length"])]
+
+    def warm(self, chunk_id: str) -> None:
+        """
+        Ask the kernel to read a chunk's pages ahead of the request for it.
+        """
+        if self._mmap is None or not hasattr(mmap, "MADV_WILLNEED"):
+            return
+        record = self.records[self.index[chunk_id]]
+        start = int(record["offset"]) // mmap.PAGESIZE * mmap.PAGESIZE
+        length = int(record["offset"]) + int(record["length"]) - start
+        if length > 0:
+            self._mmap.madvise(mmap.MADV_WILLNEED, start, length)
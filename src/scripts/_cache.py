@@ -0,0 +1,346 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from src.scripts._encoding import ENCODING_SUFFIX, SHUFFLE_BLOCK_RECORDS, Compressor, encoded_path, shuffle_bytes
+from src.scripts._metrics import NULL_TIMER
+
+# -----------------------------------------------------------------------------
+# Packed scene cache: raw little-endian uint32 words + JSON sidecar
+# -----------------------------------------------------------------------------
+#   res/<scene>/packed_<P>.json  {"vertexCount", "pixelsPerSplat", "nbytes",
+#                                "data", ...}
+#   res/<scene>/packed_<P>.<G>.bin
+#                                raw_data bytes, exactly as sent to the client
+#   res/<scene>/packed_<P>.<G>.bin.gz, packed_<P>.<G>.shuffled.bin.gz, ...
+#                                precompressed variants listed in the sidecar
+#   res/<scene>/packed_<P>.<G>.blocks.bin
+#                                float32 (min, max) box per run of splats,
+#                                when the sidecar lists "blocks"
+#   res/<scene>/packed_<P>_<variant>.json, ...
+#                                pruned variant (PRUNE_VARIANTS), same layout
+#
+# <G> is a random generation per build and "data" in the sidecar names the
+# .bin of the generation it describes. A build writes all of its files
+# under new names and then renames the sidecar into place: that one rename
+# switches readers over, and files a reader resolved from the old sidecar
+# (a /ply stream opening by path) keep their contents. The generation
+# before the previous one is deleted once the new sidecar is in place.
+# Readers also check every advertised size.
+
+CACHE_VERSION = 3
+
+
+def packed_cache_paths(scene_dir: str, pixels_per_splat: int, variant: str | None = None) -> tuple[str, str]:
+    stem = os.path.join(scene_dir, f"packed_{pixels_per_splat}" + (f"_{variant}" if variant else ""))
+    return stem + ".bin", stem + ".json"
+
+
+def block_bounds_path(bin_path: str) -> str:
+    return os.path.splitext(bin_path)[0] + ".blocks.bin"
+
+
+def packed_data_path(bin_path: str, meta: dict) -> str:
+    """
+    Data file of the generation a sidecar describes; variants and block
+    bounds are named after it.
+    """
+    return os.path.join(os.path.dirname(bin_path), meta["data"])
+
+
+def _generation_files(data_path: str) -> list[str]:
+    paths = [data_path, block_bounds_path(data_path)]
+    for encoding in ENCODING_SUFFIX:
+        paths += [encoded_path(data_path, encoding), encoded_path(data_path, encoding, shuffled=True)]
+    return paths
+
+
+def _open_tmp(path: str):
+    # unique per writer, in the target directory so os.replace stays atomic
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    return os.fdopen(fd, "wb"), tmp
+
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    f, tmp = _open_tmp(path)
+    try:
+        with f:
+            f.write(data)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def write_encoded_file(
+    src_path: str,
+    encoding: str,
+    shuffle_stride: int | None = None,
+    block_records: int = SHUFFLE_BLOCK_RECORDS,
+) -> int:
+    """
+    Compress a file block by block, byte-shuffling each block first when
+    `shuffle_stride` is given, into its variant path. Returns the size.
+    """
+    dst_path = encoded_path(src_path, encoding, shuffled=shuffle_stride is not None)
+    f, tmp = _open_tmp(dst_path)
+    try:
+        c = Compressor(encoding)
+        with f, open(src_path, "rb") as src:
+            while True:
+                data = src.read(block_records * (shuffle_stride or 64))
+                if not data:
+                    break
+                if shuffle_stride is not None:
+                    data = shuffle_bytes(data, shuffle_stride, block_records)
+                f.write(c.compress(data))
+            f.write(c.flush())
+            nbytes = f.tell()
+        os.replace(tmp, dst_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return nbytes
+
+
+def write_packed_cache(
+    bin_path: str,
+    meta_path: str,
+    blocks,
+    pixels_per_splat: int,
+    encodings=(),
+    shuffle: bool = False,
+    block_bounds=None,
+    timer=NULL_TIMER,
+    **extra,
+) -> dict:
+    """
+    Append packed (raw_data, vertexCount) blocks to a new generation of the
+    data file, compress it once per requested encoding (and once more per
+    encoding over the byte-shuffled layout when `shuffle` is set) and
+    finally rename the sidecar into place. `bin_path` is the unversioned
+    name the generation files are derived from. Returns the sidecar dict.
+
+    `block_bounds` (a _morton.BlockBoundsBuilder) is fed every block and
+    its per-block boxes are written next to the data before the sidecar.
+    `timer` (a _metrics.StageTimer) gets the write / bounds / compress
+    stages; time spent producing `blocks` is left to the producer.
+    """
+    stem, ext = os.path.splitext(bin_path)
+    data_path = f"{stem}.{os.urandom(8).hex()}{ext}"
+    f, tmp = _open_tmp(data_path)
+    vertex_count = 0
+    try:
+        with f:
+            for raw_data, vcount in blocks:
+                with timer.stage("write"):
+                    np.ascontiguousarray(raw_data, dtype="<u4").tofile(f)
+                if block_bounds is not None:
+                    with timer.stage("bounds"):
+                        block_bounds.add(raw_data)
+                vertex_count += int(vcount)
+            nbytes = f.tell()
+        os.replace(tmp, data_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    stride = int(pixels_per_splat) * 16
+    with timer.stage("compress"):
+        variants = {"packed": {enc: write_encoded_file(data_path, enc) for enc in encodings}}
+        if shuffle:
+            variants["shuffled"] = {enc: write_encoded_file(data_path, enc, stride) for enc in encodings}
+    if block_bounds is not None:
+        with timer.stage("bounds"):
+            boxes = block_bounds.result()
+        atomic_write_bytes(block_bounds_path(data_path), boxes.astype("<f4").tobytes())
+        extra["blocks"] = {"splats": int(block_bounds.block_splats), "count": int(boxes.shape[0])}
+
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    meta = {
+        "version": CACHE_VERSION,
+        "vertexCount": vertex_count,
+        "pixelsPerSplat": int(pixels_per_splat),
+        "dtype": "uint32",
+        "nbytes": nbytes,
+        "data": os.path.basename(data_path),
+        # generation the old sidecar named (unversioned before CACHE_VERSION 3)
+        "previous": previous.get("data", os.path.basename(bin_path)) if previous else None,
+        "encodings": list(encodings),
+        "shuffle": bool(shuffle),
+        "variants": variants,
+        **extra,
+    }
+    atomic_write_bytes(meta_path, json.dumps(meta).encode("utf-8"))
+
+    # readers may still be streaming the previous generation, never the one before
+    stale = previous.get("previous")
+    if stale and stale != meta["data"]:
+        for path in _generation_files(os.path.join(os.path.dirname(bin_path), stale)):
+            if os.path.exists(path):
+                os.remove(path)
+    return meta
+
+
+def read_packed_cache(bin_path: str, meta_path: str, expect: dict | None = None) -> dict | None:
+    """
+    Sidecar of a complete cache, or None when it is missing, from another
+    cache version, does not match the data file, or was built from inputs
+    other than `expect` (source fingerprint, transform, ...).
+    """
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != CACHE_VERSION:
+            return None
+        data_path = packed_data_path(bin_path, meta)
+        if os.path.getsize(data_path) != meta["nbytes"]:
+            return None
+        for layout, sizes in meta["variants"].items():
+            for enc, nbytes in sizes.items():
+                if os.path.getsize(encoded_path(data_path, enc, layout == "shuffled")) != nbytes:
+                    return None
+        if "blocks" in meta and os.path.getsize(block_bounds_path(data_path)) != meta["blocks"]["count"] * 24:
+            return None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if expect and any(meta.get(k) != v for k, v in expect.items()):
+        return None
+    return meta
+
+
+def open_packed(bin_path: str) -> np.ndarray:
+    """
+    Read-only uint32 view of a packed cache, mapped rather than loaded.
+    """
+    if os.path.getsize(bin_path) == 0:
+        return np.zeros(0, dtype=np.uint32)
+    return np.memmap(bin_path, dtype="<u4", mode="r")
+
+
+# -----------------------------------------------------------------------------
+# Cache keys
+# -----------------------------------------------------------------------------
+
+def source_fingerprint(path: str) -> dict:
+    """
+    Cheap identity of an input file; changes whenever it is rewritten.
+    """
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def array_digest(a: np.ndarray | None) -> str:
+    if a is None:
+        return "none"
+    a = np.ascontiguousarray(a, dtype=np.float32)
+    return hashlib.sha1(a.tobytes()).hexdigest()[:16]
+
+
+# -----------------------------------------------------------------------------
+# In-process LRU
+# -----------------------------------------------------------------------------
+
+class ByteLRU:
+    """
+    Thread-safe LRU map bounded by the total byte size of its values.
+
+    Keys are (identity, version) pairs. Storing a new version for an
+    identity drops the old one right away, so a rebuilt scene or chunk
+    never leaves its stale payload behind until LRU eviction. Pinned
+    identities (hot scenes) count against the budget but are never
+    evicted; a new version still replaces the old one.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget = int(budget_bytes)
+        self._items: OrderedDict = OrderedDict()
+        self._versions: dict = {}
+        self._pinned: set = set()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, identity, version):
+        with self._lock:
+            item = self._items.get((identity, version))
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end((identity, version))
+            self.hits += 1
+            return item[0]
+
+    def put(self, identity, version, value, nbytes: int) -> bool:
+        """
+        Insert a value; returns False when it alone exceeds the budget.
+        """
+        if nbytes > self.budget:
+            return False
+        with self._lock:
+            if self._pinned and identity not in self._pinned:
+                pinned = sum(n for (key, _), (_, n) in self._items.items() if key in self._pinned)
+                if pinned + nbytes > self.budget:
+                    return False
+            old = self._versions.get(identity)
+            if old is not None:
+                self._drop((identity, old))
+                if old != version:
+                    self.invalidations += 1
+            self._items[(identity, version)] = (value, nbytes)
+            self._versions[identity] = version
+            self._bytes += nbytes
+            while self._bytes > self.budget:
+                victim = next((key for key in self._items if key[0] not in self._pinned), None)
+                if victim is None:
+                    # only pinned entries left: pins may exceed the budget
+                    break
+                self._drop(victim)
+                self.evictions += 1
+        return True
+
+    def pin(self, identity) -> None:
+        with self._lock:
+            self._pinned.add(identity)
+
+    def unpin(self, identity) -> None:
+        with self._lock:
+            self._pinned.discard(identity)
+
+    def _drop(self, key) -> None:
+        _, nbytes = self._items.pop(key)
+        self._bytes -= nbytes
+        if self._versions.get(key[0]) == key[1]:
+            del self._versions[key[0]]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._versions.clear()
+            self._pinned.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._items),
+                "pinned": len(self._pinned),
+                "bytes": self._bytes,
+                "budget": self.budget,
+            }
@@ -0,0 +1,118 @@
+import os
+import zlib
+
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# Content encodings
+# -----------------------------------------------------------------------------
+# gzip is always available; brotli and zstd are used only when their Python
+# packages are installed.
+
+ENCODING_SUFFIX = {"gzip": ".gz", "br": ".br", "zstd": ".zst"}
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 9
+
+# records per shuffle block (blosc-style: bytes are regrouped per block so
+# the filter can be applied and undone while streaming)
+SHUFFLE_BLOCK_RECORDS = 1 << 16
+
+
+def _has_module(name: str) -> bool:
+    try:
+        __import__(name)
+    except ImportError:
+        return False
+    return True
+
+
+def available_encodings(requested) -> list[str]:
+    """
+    Requested encodings, in order, that can be produced in this process.
+    """
+    modules = {"gzip": None, "br": "brotli", "zstd": "zstandard"}
+    return [
+        enc for enc in requested
+        if enc in modules and (modules[enc] is None or _has_module(modules[enc]))
+    ]
+
+
+class Compressor:
+    """
+    Streaming compressor with a uniform compress()/flush() interface.
+    """
+
+    def __init__(self, encoding: str):
+        if encoding == "gzip":
+            obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress, self._flush = obj.compress, obj.flush
+        elif encoding == "br":
+            import brotli
+            obj = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress, self._flush = obj.process, obj.finish
+        elif encoding == "zstd":
+            import zstandard
+            obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            self._compress, self._flush = obj.compress, obj.flush
+        else:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+
+    def compress(self, data) -> bytes:
+        return self._compress(data)
+
+    def flush(self) -> bytes:
+        return self._flush()
+
+
+def encode_bytes(data, encoding: str) -> bytes:
+    c = Compressor(encoding)
+    return c.compress(data) + c.flush()
+
+
+# -----------------------------------------------------------------------------
+# Byte shuffle
+# -----------------------------------------------------------------------------
+
+def shuffle_bytes(data, stride: int, block_records: int = SHUFFLE_BLOCK_RECORDS) -> bytes:
+    """
+    Regroup bytes by position within a record (byte 0 of every record, then
+    byte 1, ...) separately for each block of `block_records` records.
+    Exponents, quantized colors and zero halves end up in long runs, which
+    generic compressors handle far better than the interleaved layout.
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if buf.size % stride:
+        raise ValueError(f"payload is not a whole number of {stride}-byte records")
+    out = np.empty_like(buf)
+    block = block_records * stride
+    for start in range(0, buf.size, block):
+        rec = buf[start:start + block].reshape(-1, stride)
+        out[start:start + rec.size] = rec.T.ravel()
+    return out.tobytes()
+
+
+def unshuffle_bytes(data, stride: int, block_records: int = SHUFFLE_BLOCK_RECORDS) -> bytes:
+    buf = np.frombuffer(data, dtype=np.uint8)
+    out = np.empty_like(buf)
+    block = block_records * stride
+    for start in range(0, buf.size, block):
+        cols = buf[start:start + block].reshape(stride, -1)
+        out[start:start + cols.size] = cols.T.ravel()
+    return out.tobytes()
+
+
+def shuffle_header(stride: int, block_records: int = SHUFFLE_BLOCK_RECORDS) -> str:
+    return f"shuffled;stride={stride};block={block_records}"
+
+
+# -----------------------------------------------------------------------------
+# Precompressed files
+# -----------------------------------------------------------------------------
+
+def encoded_path(path: str, encoding: str, shuffled: bool = False) -> str:
+    stem, ext = os.path.splitext(path)
+    if shuffled:
+        stem += ".shuffled"
+    return stem + ext + ENCODING_SUFFIX[encoding]
@@ -0,0 +1,185 @@
+import struct
+import hashlib
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+# -----------------------------------------------------------------------------
+# Sliced / ranged binary responses
+# -----------------------------------------------------------------------------
+
+def make_etag(*parts) -> str:
+    """
+    Strong ETag from whatever identifies the payload version.
+    """
+    digest = hashlib.sha1("|".join(map(str, parts)).encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def parse_range(value: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Single byte range of a Range header as a half-open (start, stop).
+
+    Returns None when the header is absent or is something we answer with
+    the full body (other units, multiple ranges, malformed specs), and
+    raises 416 when the range lies past the end of the payload.
+    """
+    if not value:
+        return None
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            # suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise _unsatisfiable(size)
+            return max(0, size - length), size
+        start = int(first)
+        stop = int(last) + 1 if last else size
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise _unsatisfiable(size)
+    if start >= stop:
+        return None
+    return start, min(stop, size)
+
+
+def _unsatisfiable(size: int) -> HTTPException:
+    return HTTPException(
+        status_code=416,
+        detail="Requested range not satisfiable",
+        headers={"Content-Range": f"bytes */{size}"},
+    )
+
+
+def negotiate_encoding(value: str | None, available) -> str:
+    """
+    Pick a content coding for an Accept-Encoding header among the
+    precompressed variants in `available` (listed in server preference
+    order). Falls back to "identity" when the client accepts none of them.
+    """
+    if not value:
+        return "identity"
+
+    weights = {}
+    for item in value.split(","):
+        name, *params = item.strip().split(";")
+        q = 1.0
+        for param in params:
+            key, _, val = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        if name:
+            weights[name.strip().lower()] = q
+
+    best, best_q = "identity", 0.0
+    for enc in available:
+        q = weights.get(enc, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def slice_bounds(start: int, stop: int, slice_bytes: int):
+    """
+    Split [start, stop) at absolute multiples of slice_bytes, so every
+    streamed slice after the first begins on a record boundary.
+    """
+    pos = start
+    while pos < stop:
+        end = min(stop, (pos // slice_bytes + 1) * slice_bytes)
+        yield pos, end
+        pos = end
+
+
+def payload_response(
+    request: Request,
+    size: int,
+    etag: str,
+    headers: dict,
+    *,
+    body: bytes | None = None,
+    path: str | None = None,
+    align: int = 1,
+    slice_bytes: int = 1 << 22,
+    media_type: str = "application/octet-stream",
+) -> StreamingResponse:
+    """
+    Stream an in-memory body or a file in record-aligned slices, honoring
+    a single-range Range request (206) guarded by If-Range.
+    """
+    slice_bytes = max(align, slice_bytes // align * align)
+    headers = {**headers, "Accept-Ranges": "bytes", "ETag": etag}
+
+    byte_range = parse_range(request.headers.get("range"), size)
+    if_range = request.headers.get("if-range")
+    if byte_range is not None and if_range is not None and if_range.strip() != etag:
+        byte_range = None
+
+    status_code = 200
+    start, stop = 0, size
+    if byte_range is not None:
+        start, stop = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+    headers["Content-Length"] = str(stop - start)
+
+    if body is not None:
+        view = memoryview(body)
+
+        def content():
+            for a, b in slice_bounds(start, stop, slice_bytes):
+                yield bytes(view[a:b])
+    else:
+        def content():
+            with open(path, "rb") as f:
+                f.seek(start)
+                for a, b in slice_bounds(start, stop, slice_bytes):
+                    yield f.read(b - a)
+
+    return StreamingResponse(content(), status_code=status_code, headers=headers, media_type=media_type)
+
+
+# -----------------------------------------------------------------------------
+# Framed multi-payload streams
+# -----------------------------------------------------------------------------
+#   per frame: uint32 id byte length, uint32 vertex count, uint32 data byte
+#   length (little endian), the UTF-8 id zero-padded to 4 bytes, the data
+#   zero-padded to 4 bytes (only compressed frame data needs the padding).
+# Every field and payload therefore starts on a 4-byte boundary.
+
+FRAME_HEADER = struct.Struct("<III")
+
+
+def frame_header(frame_id: str, vertex_count: int, nbytes: int) -> bytes:
+    encoded = frame_id.encode("utf-8")
+    padding = b"\0" * (-len(encoded) % 4)
+    return FRAME_HEADER.pack(len(encoded), vertex_count, nbytes) + encoded + padding
+
+
+def frame_padding(nbytes: int) -> bytes:
+    return b"\0" * (-nbytes % 4)
+
+
+def iter_frames(data: bytes):
+    """
+    Decode a framed stream into (id, vertex count, data) tuples.
+    """
+    view = memoryview(data)
+    pos = 0
+    while pos < len(view):
+        id_len, vertex_count, nbytes = FRAME_HEADER.unpack_from(view, pos)
+        pos += FRAME_HEADER.size
+        frame_id = bytes(view[pos:pos + id_len]).decode("utf-8")
+        pos += id_len + (-id_len % 4)
+        yield frame_id, vertex_count, bytes(view[pos:pos + nbytes])
+        pos += nbytes + (-nbytes % 4)
@@ -0,0 +1,206 @@
+import os
+import json
+import threading
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from src.scripts._archive import ChunkArchive, archive_variant
+from src.scripts._encoding import encoded_path
+from src.scripts._morton import BLOCK_BOUNDS_FILE, read_block_bounds
+
+# -----------------------------------------------------------------------------
+# Chunk manifest: res/<scene>/chunks/metadata.json, parsed once per version
+# -----------------------------------------------------------------------------
+
+# octree builds (separate_trunk.py --max_splats) add these; passed through
+HIERARCHY_CHUNK_KEYS = ("depth", "parent")
+HIERARCHY_SCENE_KEYS = ("partition", "max_splats", "nodes")
+# separate_trunk.py --block_splats: "blocks" is [first, count] into blocks.bin
+BLOCK_CHUNK_KEYS = ("blocks",)
+BLOCK_SCENE_KEYS = ("order", "block_splats")
+
+
+def chunk_variants(encodings, shuffled: bool) -> list[tuple[str, str]]:
+    """
+    (layout, encoding) of every precompressed chunk payload a build
+    stores: each encoding over the packed layout, then over the
+    byte-shuffled one when `shuffled` is set.
+    """
+    layouts = ["packed", "shuffled"] if shuffled else ["packed"]
+    return [(layout, encoding) for layout in layouts for encoding in encodings]
+
+
+def variant_file(chunk_id: str, layout: str, encoding: str) -> str:
+    # --layout files: <id>.bin.gz, <id>.shuffled.bin.gz, ... next to <id>.npz
+    return encoded_path(f"{chunk_id}.bin", encoding, layout == "shuffled")
+
+
+@dataclass
+class ChunkManifest:
+    """
+    Indexed form of a scene's chunk metadata.
+
+    `bounds` is (N, 2, 3) float32 (min, max) and `vertex_counts` (N,) int64,
+    both in the row order of `ids`; `index` maps a chunk id to that row.
+    `meta_body` is the ready-to-send /get_chunk_meta JSON response.
+    `archive` is set when the chunks live in a single-file archive
+    (separate_trunk.py --layout archive) instead of one .npz per chunk.
+    `packing` is the splat layout of the payloads ("full" or "compact").
+    `block_bounds` is the (M, 2, 3) float32 box of every run of
+    `block_splats` splats of every chunk, when recorded at build time.
+    `encodings` / `shuffled` list the precompressed payloads the build
+    stored (see chunk_variants); `variant_archives` maps their (layout,
+    encoding) to the variant archives of the archive layout.
+    """
+    scene: str
+    version: tuple[int, int]
+    chunks_dir: str
+    entries: list[dict]
+    ids: list[str]
+    index: dict[str, int]
+    bounds: np.ndarray
+    vertex_counts: np.ndarray
+    meta_body: bytes
+    archive: ChunkArchive | None = None
+    packing: str = "full"
+    block_bounds: np.ndarray | None = None
+    block_splats: int = 0
+    encodings: list[str] = field(default_factory=list)
+    shuffled: bool = False
+    variant_archives: dict = field(default_factory=dict)
+
+    def entry(self, chunk_id: str) -> dict | None:
+        row = self.index.get(chunk_id)
+        return None if row is None else self.entries[row]
+
+    def chunk_path(self, entry: dict) -> str:
+        return os.path.join(self.chunks_dir, entry["file"])
+
+    def variant_path(self, entry: dict, layout: str, encoding: str) -> str:
+        return os.path.join(self.chunks_dir, variant_file(entry["id"], layout, encoding))
+
+    def payload_archive(self, layout: str, encoding: str) -> ChunkArchive | None:
+        # the archive holding one stored payload variant (archive layout)
+        if encoding == "identity":
+            return self.archive
+        return self.variant_archives.get((layout, encoding))
+
+
+def build_manifest(
+    scene: str,
+    metadata: dict,
+    chunks_dir: str,
+    version=(0, 0),
+    archive: ChunkArchive | None = None,
+    block_bounds: np.ndarray | None = None,
+    variant_archives: dict | None = None,
+) -> ChunkManifest:
+    entries = [
+        {
+            "id": chunk["id"],
+            "file": chunk["file"],
+            "bounds": chunk["bounds"],
+            "vertexCount": int(chunk["vertexCount"]),
+            **{key: chunk[key] for key in HIERARCHY_CHUNK_KEYS + BLOCK_CHUNK_KEYS if key in chunk},
+        }
+        for chunk in metadata.get("chunks", [])
+    ]
+    ids = [entry["id"] for entry in entries]
+
+    bounds = np.zeros((len(entries), 2, 3), dtype=np.float32)
+    for row, entry in enumerate(entries):
+        bounds[row, 0] = entry["bounds"]["min"]
+        bounds[row, 1] = entry["bounds"]["max"]
+
+    meta_body = json.dumps({
+        "scene": scene,
+        "trunk_size": metadata.get("trunk_size"),
+        "total_vertex": metadata.get("total_vertex"),
+        "chunks": entries,
+        "packing": metadata.get("packing", "full"),
+        **{key: metadata[key] for key in HIERARCHY_SCENE_KEYS + BLOCK_SCENE_KEYS if key in metadata},
+    }).encode("utf-8")
+
+    return ChunkManifest(
+        scene=scene,
+        version=version,
+        chunks_dir=chunks_dir,
+        entries=entries,
+        ids=ids,
+        index={chunk_id: row for row, chunk_id in enumerate(ids)},
+        bounds=bounds,
+        vertex_counts=np.array([entry["vertexCount"] for entry in entries], dtype=np.int64),
+        meta_body=meta_body,
+        archive=archive,
+        packing=metadata.get("packing", "full"),
+        block_bounds=block_bounds,
+        block_splats=int(metadata.get("block_splats", 0)),
+        encodings=list(metadata.get("encodings", [])),
+        shuffled=bool(metadata.get("shuffled", False)),
+        variant_archives=variant_archives or {},
+    )
+
+
+class ManifestCache:
+    """
+    Per-scene ChunkManifest, reloaded only when metadata.json changes
+    (mtime or size). A request costs one stat() instead of a JSON parse.
+    """
+
+    def __init__(self, res_dir: str = "res"):
+        self.res_dir = res_dir
+        self._manifests: dict[str, ChunkManifest] = {}
+        self._lock = threading.Lock()
+
+    def metadata_path(self, scene: str) -> str:
+        return os.path.abspath(os.path.join(self.res_dir, scene, "chunks", "metadata.json"))
+
+    def _stat(self, path: str) -> tuple[int, int]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Chunk metadata not found: {path}") from None
+        return st.st_mtime_ns, st.st_size
+
+    def current(self, scene: str) -> ChunkManifest | None:
+        """
+        The cached manifest when metadata.json is unchanged, else None:
+        one stat(), never a parse (async endpoints offload the get()).
+        """
+        path = self.metadata_path(scene)
+        version = self._stat(path)
+        manifest = self._manifests.get(path)
+        return manifest if manifest is not None and manifest.version == version else None
+
+    def get(self, scene: str) -> ChunkManifest:
+        path = self.metadata_path(scene)
+        version = self._stat(path)
+
+        manifest = self._manifests.get(path)
+        if manifest is not None and manifest.version == version:
+            return manifest
+
+        with open(path, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        chunks_dir = os.path.dirname(path)
+        # the archives are in place before metadata.json, so a new metadata
+        # version always sees the matching archives
+        archive, variant_archives = None, {}
+        if metadata.get("layout") == "archive":
+            archive = ChunkArchive(chunks_dir)
+            variant_archives = {
+                (layout, encoding): ChunkArchive(chunks_dir, archive_variant(encoding, layout == "shuffled"))
+                for layout, encoding in chunk_variants(metadata.get("encodings", []), metadata.get("shuffled", False))
+            }
+        block_bounds = None
+        if metadata.get("block_splats"):
+            block_bounds = read_block_bounds(os.path.join(chunks_dir, BLOCK_BOUNDS_FILE))
+        manifest = build_manifest(scene, metadata, chunks_dir, version, archive, block_bounds, variant_archives)
+        with self._lock:
+            self._manifests[path] = manifest
+        return manifest
+
+    def clear(self) -> None:
+        with self._lock:
+            self._manifests.clear()
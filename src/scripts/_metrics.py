@@ -0,0 +1,177 @@
+import time
+import bisect
+import threading
+import contextlib
+
+# -----------------------------------------------------------------------------
+# Request stage timers (Server-Timing) and Prometheus metrics (/metrics)
+# -----------------------------------------------------------------------------
+# A StageTimer accumulates the wall time of named phases of one request
+# (the same name may be entered several times, e.g. once per ingest block)
+# and renders them as a Server-Timing header. MetricsRegistry aggregates
+# finished requests into histograms / counters and renders the Prometheus
+# text exposition format. With metrics disabled, handlers use NULL_TIMER,
+# whose stages are a shared no-op context and which records nothing.
+# A StageTimer is not thread-safe: work run on another thread times itself
+# into a timer of its own, which the request merges once the work is done.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = tuple(float(1 << s) for s in range(10, 33, 2))     # 1 KiB .. 4 GiB
+
+
+class StageTimer:
+    enabled = True
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.cache: str | None = None
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - t
+
+    def cache_result(self, where: str) -> None:
+        # where the payload came from: 'memory', 'disk', 'archive', 'build', ...
+        self.cache = where
+
+    def merge(self, other: "StageTimer") -> None:
+        # fold in the stages of a job timed on another thread, once it is done
+        for name, seconds in other.stages.items():
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+        if other.cache is not None:
+            self.cache = other.cache
+
+    def total(self) -> float:
+        return time.perf_counter() - self.start
+
+    def header(self) -> str:
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={self.total() * 1000:.2f}")
+        return ", ".join(parts)
+
+
+class _NullTimer:
+    enabled = False
+    _context = contextlib.nullcontext()
+
+    def stage(self, name: str):
+        return self._context
+
+    def cache_result(self, where: str) -> None:
+        pass
+
+    def merge(self, other) -> None:
+        pass
+
+    def header(self) -> None:
+        return None
+
+
+NULL_TIMER = _NullTimer()
+
+
+def _labels(labels: tuple[tuple[str, str], ...], extra: str = "") -> str:
+    items = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        items.append(extra)
+    return "{" + ",".join(items) + "}" if items else ""
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """
+    Labelled histograms and counters, safe to update from the worker
+    threads that run the (sync) endpoints.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: dict[str, tuple[str, str]] = {}
+        self._histograms: dict[str, dict[tuple, _Histogram]] = {}
+        self._buckets: dict[str, tuple] = {}
+        self._counters: dict[str, dict[tuple, float]] = {}
+
+    def histogram(self, name: str, help_text: str, buckets=LATENCY_BUCKETS) -> None:
+        self._help[name] = ("histogram", help_text)
+        self._histograms.setdefault(name, {})
+        self._buckets[name] = tuple(buckets)
+
+    def counter(self, name: str, help_text: str) -> None:
+        self._help[name] = ("counter", help_text)
+        self._counters.setdefault(name, {})
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms[name]
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(self._buckets[name])
+            hist.observe(value)
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0.0) + value
+
+    def render(
+        self,
+        gauges: dict[str, tuple[str, float]] | None = None,
+        totals: dict[str, tuple[str, float]] | None = None,
+    ) -> str:
+        """
+        Prometheus text format; `gauges` (name -> (help, value)) are
+        point-in-time values sampled by the caller, `totals` counts kept
+        since start elsewhere (names end in _total), exposed as counters.
+        """
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in self._help.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                if kind == "counter":
+                    for key, value in sorted(self._counters[name].items()):
+                        lines.append(f"{name}{_labels(key)} {value:g}")
+                    continue
+                for key, hist in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        le = 'le="%g"' % bound
+                        lines.append(f"{name}_bucket{_labels(key, le)} {cumulative}")
+                    cumulative += hist.counts[-1]
+                    le = 'le="+Inf"'
+                    lines.append(f"{name}_bucket{_labels(key, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(key)} {hist.sum:.6f}")
+                    lines.append(f"{name}_count{_labels(key)} {cumulative}")
+        for kind, sampled in (("counter", totals), ("gauge", gauges)):
+            for name, (help_text, value) in (sampled or {}).items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+
+def request_registry() -> MetricsRegistry:
+    """
+    The registry the endpoints record into (see load_resource.py).
+    """
+    registry = MetricsRegistry()
+    registry.histogram("splat_request_seconds", "Handler time until the response starts, by endpoint")
+    registry.histogram("splat_stage_seconds", "Time spent in one stage of a request, by endpoint and stage")
+    registry.histogram("splat_response_bytes", "Response body size, by endpoint", BYTES_BUCKETS)
+    registry.counter("splat_cache_requests_total", "Payload lookups by endpoint and where they were served from")
+    return registry
@@ -0,0 +1,124 @@
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# Spatial (Z-order) splat ordering and per-block bounds
+# -----------------------------------------------------------------------------
+# Sorting splats by the 3D Morton code of their position keeps neighbours
+# close in the packed buffer: runs of bytes repeat more (compression), a
+# block of consecutive splats covers a small box (culling) and texture rows
+# hold nearby splats (cache behaviour).
+
+SPATIAL_ORDERS = ("input", "morton")
+MORTON_BITS = 21            # per axis, 63 bits in total
+BLOCK_BOUNDS_FILE = "blocks.bin"
+
+# bit-spreading masks: insert two zero bits between consecutive bits
+_SPREAD = [
+    (32, 0x1F00000000FFFF),
+    (16, 0x1F0000FF0000FF),
+    (8, 0x100F00F00F00F00F),
+    (4, 0x10C30C30C30C30C3),
+    (2, 0x1249249249249249),
+]
+
+
+def _spread_bits(v: np.ndarray) -> np.ndarray:
+    v = v.astype(np.uint64) & np.uint64((1 << MORTON_BITS) - 1)
+    tmp = np.empty_like(v)
+    for shift, mask in _SPREAD:
+        np.left_shift(v, np.uint64(shift), out=tmp)
+        v |= tmp
+        v &= np.uint64(mask)
+    return v
+
+
+def morton_codes(points: np.ndarray, lo=None, hi=None) -> np.ndarray:
+    """
+    uint64 Z-order codes of (N, 3) points quantized to MORTON_BITS per axis
+    over [lo, hi] (default: the points' own box). NaN coordinates map to
+    the low corner.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if points.shape[0] == 0:
+        return np.zeros(0, dtype=np.uint64)
+    lo = np.nanmin(points, axis=0) if lo is None else np.asarray(lo, dtype=np.float64)
+    hi = np.nanmax(points, axis=0) if hi is None else np.asarray(hi, dtype=np.float64)
+    extent = np.where(hi > lo, hi - lo, 1.0)
+
+    scale = (1 << MORTON_BITS) - 1
+    q = (points - lo) * (scale / extent)
+    np.nan_to_num(q, copy=False, nan=0.0)
+    np.floor(q, out=q)
+    np.clip(q, 0, scale, out=q)
+    codes = _spread_bits(q[:, 0])
+    codes |= _spread_bits(q[:, 1]) << np.uint64(1)
+    codes |= _spread_bits(q[:, 2]) << np.uint64(2)
+    return codes
+
+
+def morton_order(points: np.ndarray, lo=None, hi=None) -> np.ndarray:
+    """
+    Row permutation that sorts points by Morton code (stable, so equal
+    codes keep their input order).
+    """
+    return np.argsort(morton_codes(points, lo, hi), kind="stable")
+
+
+def block_bounds(points: np.ndarray, block_splats: int) -> np.ndarray:
+    """
+    (ceil(N / block_splats), 2, 3) float32 (min, max) boxes of consecutive
+    runs of block_splats points; the last block may be shorter.
+    """
+    points = np.asarray(points, dtype=np.float32)
+    n = points.shape[0]
+    count = -(-n // block_splats)
+    out = np.empty((count, 2, 3), dtype=np.float32)
+    full = n // block_splats
+    if full:
+        blocks = points[:full * block_splats].reshape(full, block_splats, 3)
+        out[:full, 0] = blocks.min(axis=1)
+        out[:full, 1] = blocks.max(axis=1)
+    if count > full:
+        tail = points[full * block_splats:]
+        out[full, 0] = tail.min(axis=0)
+        out[full, 1] = tail.max(axis=0)
+    return out
+
+
+def check_order(order: str) -> str:
+    if order not in SPATIAL_ORDERS:
+        raise ValueError(f"Unknown spatial order: {order!r} (expected one of {SPATIAL_ORDERS})")
+    return order
+
+
+def read_block_bounds(path: str) -> np.ndarray:
+    return np.fromfile(path, dtype="<f4").reshape(-1, 2, 3)
+
+
+class BlockBoundsBuilder:
+    """
+    block_bounds over a stream of batches whose sizes need not be multiples
+    of the block size (e.g. packed ingest blocks after filtering).
+    `positions` maps a batch to its (n, 3) points; by default a batch is
+    the points themselves.
+    """
+
+    def __init__(self, block_splats: int, positions=None):
+        self.block_splats = block_splats
+        self.positions = positions
+        self._parts: list[np.ndarray] = []
+        self._pending = np.zeros((0, 3), dtype=np.float32)
+
+    def add(self, batch) -> None:
+        points = batch if self.positions is None else self.positions(batch)
+        points = np.concatenate([self._pending, np.asarray(points, dtype=np.float32)])
+        whole = points.shape[0] // self.block_splats * self.block_splats
+        if whole:
+            self._parts.append(block_bounds(points[:whole], self.block_splats))
+        self._pending = points[whole:]
+
+    def result(self) -> np.ndarray:
+        parts = self._parts + ([block_bounds(self._pending, self.block_splats)] if self._pending.shape[0] else [])
+        if not parts:
+            return np.zeros((0, 2, 3), dtype=np.float32)
+        return np.concatenate(parts)
@@ -0,0 +1,83 @@
+import math
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# -----------------------------------------------------------------------------
+# Bounded offload pool with single-flight jobs (async endpoints)
+# -----------------------------------------------------------------------------
+# Blocking work of the async endpoints (PLY ingest, cache reads, npz loads,
+# compression) runs on a fixed number of threads. Jobs carry a key: while a
+# job is in flight, submitting the same key joins it instead of starting a
+# second one, so N concurrent cold requests for a scene build it once and
+# all receive the same result (or exception). Admission is bounded: once
+# `workers + queue` distinct jobs are in flight, new keys are refused with
+# Saturated, which the endpoints turn into 503 + Retry-After. Joining an
+# in-flight job is always admitted, it adds no work.
+
+
+class Saturated(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"offload pool saturated, retry after {retry_after:g}s")
+        self.retry_after = retry_after
+
+    def header(self) -> str:
+        # Retry-After takes whole seconds
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class OffloadPool:
+    def __init__(self, workers: int, queue: int = 0, retry_after: float = 1.0):
+        self.workers = max(1, int(workers))
+        self.limit = self.workers + max(0, int(queue))
+        self.retry_after = float(retry_after)
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="offload")
+        self._lock = threading.Lock()
+        self._inflight: dict = {}
+        self._pending = 0
+        self.joined = 0
+        self.rejected = 0
+
+    def submit(self, key, fn, *args) -> Future:
+        """
+        Future of fn(*args), shared with the in-flight job of the same key
+        (key None: never shared). Raises Saturated when the pool is full.
+        """
+        with self._lock:
+            future = self._inflight.get(key) if key is not None else None
+            if future is not None:
+                self.joined += 1
+                return future
+            if self._pending >= self.limit:
+                self.rejected += 1
+                raise Saturated(self.retry_after)
+            self._pending += 1
+            future = self._executor.submit(fn, *args)
+            if key is not None:
+                self._inflight[key] = future
+        future.add_done_callback(lambda f: self._release(key, f))
+        return future
+
+    def _release(self, key, future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            if key is not None and self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def run(self, key, fn, *args):
+        # shielded: a disconnecting client must not cancel a job others joined
+        return await asyncio.shield(asyncio.wrap_future(self.submit(key, fn, *args)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "limit": self.limit,
+                "pending": self._pending,
+                "inflightKeys": len(self._inflight),
+                "joined": self.joined,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
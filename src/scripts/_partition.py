@@ -0,0 +1,158 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# Spatial partitioning of splat positions into chunks
+# -----------------------------------------------------------------------------
+
+@dataclass
+class Cell:
+    """
+    One output chunk: its id, AABB and the splat rows it holds. `depth` and
+    `parent` place it in the octree (0 / None for grid cells).
+    """
+    id: str
+    lo: np.ndarray
+    hi: np.ndarray
+    rows: np.ndarray
+    depth: int = 0
+    parent: str | None = None
+
+
+def grid_partition(points: np.ndarray, trunk_size: float) -> list[Cell]:
+    """
+    Uniform grid of trunk_size cubes aligned to multiples of trunk_size.
+
+    Cells are found with one stable argsort of a linearized (cx, cy, cz)
+    key, so each cell's rows are a contiguous, ascending run of the sort
+    order; cells come out in (cx, cy, cz) lexicographic order.
+    """
+    points = np.asarray(points)
+    if points.shape[0] == 0:
+        return []
+
+    # Align strict grid
+    start = np.floor(points.min(axis=0).astype(np.float64) / trunk_size) * trunk_size
+
+    # Assign each point to a chunk index
+    idx = np.floor((points - start) / trunk_size).astype(np.int64)
+    dims = idx.max(axis=0) + 1
+    key = (idx[:, 0] * dims[1] + idx[:, 1]) * dims[2] + idx[:, 2]
+
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    starts = np.flatnonzero(np.r_[True, sorted_key[1:] != sorted_key[:-1]])
+    stops = np.r_[starts[1:], order.size]
+
+    cells = []
+    for a, b in zip(starts, stops):
+        cx, cy, cz = idx[order[a]]
+        lo = start + np.array([cx, cy, cz]) * trunk_size
+        cells.append(Cell(f"{cx}_{cy}_{cz}", lo, lo + trunk_size, order[a:b]))
+    return cells
+
+
+# bit k of an octant index selects the upper half along axis k
+_OCTANT_BITS = (np.arange(8)[:, None] >> np.arange(3)) & 1
+_OCTANT_WEIGHTS = np.array([1, 2, 4], dtype=np.int64)
+
+
+def _merge_sparse(sparse: list, max_splats: int) -> list[list]:
+    """
+    Greedily group sparse octants (in octant order) so that every group
+    holds at most max_splats rows.
+    """
+    groups, current, count = [], [], 0
+    for item in sparse:
+        n = item[3].size
+        if current and count + n > max_splats:
+            groups.append(current)
+            current, count = [], 0
+        current.append(item)
+        count += n
+    if current:
+        groups.append(current)
+    return groups
+
+
+def octree_partition(
+    points: np.ndarray,
+    max_splats: int,
+    min_splats: int | None = None,
+    max_depth: int = 21,
+) -> tuple[list[Cell], list[dict]]:
+    """
+    Split a cube around `points` into octants until every leaf holds at
+    most `max_splats` rows (or `max_depth` is reached).
+
+    Sibling octants with fewer than `min_splats` rows (default max_splats
+    // 8) are not kept as separate tiny chunks: they are merged into
+    shared leaves of at most max_splats rows, bounded by the union of the
+    merged octants.
+
+    Returns the leaves sorted by id and the internal nodes as
+    {"id", "bounds", "depth", "parent", "children"} dicts. Ids spell the
+    octant path from the root "r" ("r07" = octant 7 of octant 0); a merged
+    leaf is "<parent>m<octants>".
+    """
+    if min_splats is None:
+        min_splats = max(1, max_splats // 8)
+    points = np.asarray(points)
+    leaves: list[Cell] = []
+    nodes: list[dict] = []
+    if points.shape[0] == 0:
+        return leaves, nodes
+
+    lo = points.min(axis=0).astype(np.float64)
+    size = max(float((points.max(axis=0) - lo).max()), 1e-6)
+    stack = [("r", lo, lo + size, np.arange(points.shape[0]), 0, None)]
+
+    while stack:
+        node_id, lo, hi, rows, depth, parent = stack.pop()
+        if rows.size <= max_splats or depth >= max_depth:
+            leaves.append(Cell(node_id, lo, hi, rows, depth, parent))
+            continue
+
+        center = (lo + hi) * 0.5
+        octant = (points[rows] >= center).astype(np.int64) @ _OCTANT_WEIGHTS
+        order = np.argsort(octant, kind="stable")
+        counts = np.bincount(octant, minlength=8)
+        parts = np.split(rows[order], np.cumsum(counts)[:-1])
+
+        children, sparse = [], []
+        for k in np.flatnonzero(counts):
+            bits = _OCTANT_BITS[k].astype(bool)
+            child = (f"{node_id}{k}", np.where(bits, center, lo), np.where(bits, hi, center), parts[k])
+            if counts[k] < min_splats:
+                sparse.append(child)
+            else:
+                children.append(child[0])
+                stack.append((*child, depth + 1, node_id))
+
+        for group in _merge_sparse(sparse, max_splats):
+            if len(group) == 1:
+                leaf_id = group[0][0]
+            else:
+                leaf_id = node_id + "m" + "".join(child_id[len(node_id):] for child_id, *_ in group)
+            leaves.append(Cell(
+                leaf_id,
+                np.min([g[1] for g in group], axis=0),
+                np.max([g[2] for g in group], axis=0),
+                np.sort(np.concatenate([g[3] for g in group])),
+                depth + 1,
+                node_id,
+            ))
+            children.append(leaf_id)
+
+        nodes.append({
+            "id": node_id,
+            "bounds": {"min": lo.tolist(), "max": hi.tolist()},
+            "depth": depth,
+            "parent": parent,
+            "children": sorted(children),
+        })
+
+    leaves.sort(key=lambda cell: cell.id)
+    nodes.sort(key=lambda node: node["id"])
+    return leaves, nodes
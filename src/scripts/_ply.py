@@ -0,0 +1,160 @@
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# PLY header parsing
+# -----------------------------------------------------------------------------
+
+# PLY scalar type names -> NumPy type codes (byte order is applied later)
+PLY_TYPES = {
+    "char": "i1", "int8": "i1",
+    "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2",
+    "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4",
+    "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4",
+    "double": "f8", "float64": "f8",
+}
+
+PLY_BYTE_ORDER = {
+    "ascii": "=",
+    "binary_little_endian": "<",
+    "binary_big_endian": ">",
+}
+
+
+@dataclass
+class PlyElementHeader:
+    name: str
+    count: int
+    properties: list[tuple[str, str]] = field(default_factory=list)
+    has_list: bool = False
+
+
+@dataclass
+class PlyHeader:
+    format: str
+    elements: list[PlyElementHeader]
+    data_offset: int
+
+    @property
+    def byte_order(self) -> str:
+        return PLY_BYTE_ORDER[self.format]
+
+    def element(self, name: str) -> PlyElementHeader:
+        for elem in self.elements:
+            if elem.name == name:
+                return elem
+        raise KeyError(f"PLY element not found: {name}")
+
+
+def read_ply_header(path: str) -> PlyHeader:
+    """
+    Parse the ASCII header of a PLY file without touching the body.
+    """
+    elements: list[PlyElementHeader] = []
+    fmt = None
+
+    with open(path, "rb") as f:
+        magic = f.readline().strip()
+        if magic != b"ply":
+            raise ValueError(f"Not a PLY file: {path}")
+
+        while True:
+            line = f.readline()
+            if not line:
+                raise ValueError(f"Unterminated PLY header: {path}")
+            tokens = line.decode("ascii").split()
+            if not tokens or tokens[0] in ("comment", "obj_info"):
+                continue
+
+            if tokens[0] == "end_header":
+                break
+            elif tokens[0] == "format":
+                fmt = tokens[1]
+                if fmt not in PLY_BYTE_ORDER:
+                    raise ValueError(f"Unknown PLY format: {fmt}")
+            elif tokens[0] == "element":
+                elements.append(PlyElementHeader(tokens[1], int(tokens[2])))
+            elif tokens[0] == "property":
+                if not elements:
+                    raise ValueError("PLY property declared before any element")
+                if tokens[1] == "list":
+                    elements[-1].has_list = True
+                    elements[-1].properties.append((tokens[4], "list"))
+                else:
+                    elements[-1].properties.append((tokens[2], PLY_TYPES[tokens[1]]))
+
+        data_offset = f.tell()
+
+    if fmt is None:
+        raise ValueError(f"PLY header has no format line: {path}")
+
+    return PlyHeader(fmt, elements, data_offset)
+
+
+def vertex_dtype(header: PlyHeader) -> np.dtype:
+    """
+    Structured dtype of one vertex record as laid out in the file.
+    """
+    vertex = header.element("vertex")
+    return np.dtype([(name, header.byte_order + code) for name, code in vertex.properties])
+
+
+# -----------------------------------------------------------------------------
+# Vertex reading
+# -----------------------------------------------------------------------------
+
+def _can_memmap(header: PlyHeader) -> bool:
+    """
+    The vertex block can be mapped directly when the file is binary little
+    endian and every element stored before it has a fixed record size.
+    """
+    if header.format != "binary_little_endian":
+        return False
+    for elem in header.elements:
+        if elem.has_list:
+            return False
+        if elem.name == "vertex":
+            return True
+    return False
+
+
+def _vertex_offset(header: PlyHeader) -> int:
+    offset = header.data_offset
+    for elem in header.elements:
+        if elem.name == "vertex":
+            break
+        itemsize = np.dtype([(n, "<" + c) for n, c in elem.properties]).itemsize
+        offset += elem.count * itemsize
+    return offset
+
+
+def read_ply_vertices(path: str) -> np.ndarray:
+    """
+    Return the vertex element of a PLY file as a structured array.
+
+    Binary little-endian files are mapped with np.memmap, so the returned
+    array is a read-only view of the file and columns (v["x"], ...) are
+    strided views rather than copies. ASCII and big-endian files fall back
+    to plyfile.
+    """
+    header = read_ply_header(path)
+
+    if not _can_memmap(header):
+        from plyfile import PlyData
+        return PlyData.read(path)["vertex"].data
+
+    count = header.element("vertex").count
+    dtype = vertex_dtype(header)
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+
+    offset = _vertex_offset(header)
+    if os.path.getsize(path) < offset + count * dtype.itemsize:
+        raise ValueError(f"Truncated PLY vertex block: {path}")
+
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
@@ -0,0 +1,61 @@
+import numpy as np
+
+from src.scripts._visibility import box_distance_sq
+
+# -----------------------------------------------------------------------------
+# Trajectory-based chunk prefetch planning
+# -----------------------------------------------------------------------------
+
+def extrapolate_path(position, velocity, horizon: float, steps: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (steps, 3) constant-velocity samples over [0, horizon] seconds and their
+    times. The current position is always the first sample.
+    """
+    t = np.linspace(0.0, horizon, max(1, steps))
+    p = np.asarray(position, dtype=np.float64)
+    v = np.asarray(velocity, dtype=np.float64)
+    return p + t[:, None] * v, t
+
+
+def plan_prefetch(
+    bounds: np.ndarray,
+    chunk_bytes: np.ndarray,
+    position,
+    velocity,
+    heading=None,
+    horizon: float = 2.0,
+    steps: int = 8,
+    radius: float = 4.0,
+    budget_bytes: int | None = None,
+) -> np.ndarray:
+    """
+    Rows of the chunks worth fetching before the camera gets there, most
+    urgent first, cut off once their byte sizes exceed `budget_bytes`.
+
+    A chunk qualifies when it comes within `radius` of the extrapolated
+    path. Its cost is the distance still to travel: the path length up to
+    the closest sample plus the remaining gap to the box. With a `heading`
+    (view direction), chunks behind the camera cost up to `radius` more,
+    so what will come into view is ranked ahead of what is left behind.
+    """
+    path, t = extrapolate_path(position, velocity, horizon, steps)
+    speed = float(np.linalg.norm(velocity))
+
+    gap = np.sqrt(box_distance_sq(bounds, path))                        # (K, N)
+    cost = (gap + (speed * t)[:, None]).min(axis=0)
+    near = gap.min(axis=0) <= radius
+
+    if heading is not None:
+        h = np.asarray(heading, dtype=np.float64)
+        h = h / max(np.linalg.norm(h), 1e-12)
+        to_chunk = bounds.mean(axis=1) - np.asarray(position, dtype=np.float64)
+        dist = np.maximum(np.linalg.norm(to_chunk, axis=1), 1e-12)
+        cos = (to_chunk @ h) / dist
+        cost = cost + radius * 0.5 * (1.0 - cos)
+
+    rows = np.flatnonzero(near)
+    rows = rows[np.argsort(cost[rows], kind="stable")]
+    if budget_bytes is not None:
+        # sizes are non-negative, so this keeps a prefix of the ranking
+        rows = rows[np.cumsum(chunk_bytes[rows]) <= budget_bytes]
+    return rows
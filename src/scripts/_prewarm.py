@@ -0,0 +1,119 @@
+import os
+import time
+import threading
+
+# -----------------------------------------------------------------------------
+# Startup prewarm: scene discovery and per-scene readiness
+# -----------------------------------------------------------------------------
+# At startup the server validates or builds, for every scene under res/,
+#   ply     the packed /ply cache (and its PRUNE_VARIANTS)
+#   chunks  the chunk manifest (metadata.json, archive mapping, block bounds)
+#   map     the environment map body
+# Prewarm is opt-in (PREWARM). Unless scenes are named, generated ones
+# (synthetic or benchmark scenes, GENERATED_SCENE_PREFIXES) are skipped.
+# The steps a scene gets depend on the files it has. PrewarmStatus tracks
+# them for /ready: the server is ready once no scene is pending or warming.
+# A failed step is reported but does not hold readiness back, so one broken
+# scene cannot keep the instance out of rotation.
+
+PREWARM_STEPS = ("ply", "chunks", "map")
+
+# src/scripts/_synthetic.py / benchmark.py scenes, never served
+GENERATED_SCENE_PREFIXES = ("bench_", "synth")
+
+_STEP_FILES = {
+    "ply": "point_cloud.ply",
+    "chunks": os.path.join("chunks", "metadata.json"),
+    "map": "map1.npz",
+}
+
+
+def discover_scenes(res_dir: str = "res", names=None) -> dict[str, list[str]]:
+    """
+    Scene directories under `res_dir` (only `names`, if given) mapped to the
+    prewarm steps their files call for. Directories with none, and generated
+    scenes not named explicitly, are skipped.
+    """
+    if not os.path.isdir(res_dir):
+        return {}
+    if not names:
+        names = [name for name in os.listdir(res_dir) if not name.startswith(GENERATED_SCENE_PREFIXES)]
+    scenes = {}
+    for name in sorted(names):
+        scene_dir = os.path.join(res_dir, name)
+        steps = [step for step in PREWARM_STEPS if os.path.exists(os.path.join(scene_dir, _STEP_FILES[step]))]
+        if os.path.isdir(scene_dir) and steps:
+            scenes[name] = steps
+    return scenes
+
+
+class PrewarmStatus:
+    """
+    Progress of the startup prewarm, per scene and step. Until begin() is
+    called (prewarm disabled) the server reports ready with no scenes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scenes: dict[str, dict] = {}
+        self.enabled = False
+        self.started: float | None = None
+        self.finished: float | None = None
+
+    def begin(self) -> None:
+        with self._lock:
+            self.enabled = True
+            self.started = time.time()
+            self.finished = None
+            self._scenes = {}
+
+    def plan(self, scenes: dict[str, list[str]]) -> None:
+        with self._lock:
+            self._scenes = {
+                name: {"status": "pending", "steps": {step: {"status": "pending"} for step in steps}}
+                for name, steps in scenes.items()
+            }
+
+    def start(self, scene: str, step: str) -> None:
+        with self._lock:
+            self._scenes[scene]["status"] = "warming"
+            self._scenes[scene]["steps"][step] = {"status": "warming"}
+
+    def done(self, scene: str, step: str, seconds: float, **info) -> None:
+        with self._lock:
+            self._scenes[scene]["steps"][step] = {"status": "ready", "seconds": round(seconds, 3), **info}
+
+    def fail(self, scene: str, step: str, seconds: float, error: str) -> None:
+        with self._lock:
+            self._scenes[scene]["steps"][step] = {"status": "failed", "seconds": round(seconds, 3), "error": error}
+
+    def finish_scene(self, scene: str) -> None:
+        with self._lock:
+            steps = self._scenes[scene]["steps"].values()
+            failed = any(step["status"] == "failed" for step in steps)
+            self._scenes[scene]["status"] = "failed" if failed else "ready"
+
+    def finish(self) -> None:
+        with self._lock:
+            self.finished = time.time()
+
+    def ready(self) -> bool:
+        with self._lock:
+            return self._ready()
+
+    def _ready(self) -> bool:
+        if not self.enabled:
+            return True
+        return self.finished is not None
+
+    def report(self) -> dict:
+        with self._lock:
+            elapsed = None
+            if self.started is not None:
+                elapsed = (self.finished or time.time()) - self.started
+            return {
+                "ready": self._ready(),
+                "prewarm": self.enabled,
+                "seconds": round(elapsed, 3) if elapsed is not None else None,
+                "scenes": {name: {**scene, "steps": dict(scene["steps"])} for name, scene in self._scenes.items()},
+            }
@@ -0,0 +1,94 @@
+import numpy as np
+
+from src.scripts._splat import BLOCK_ROWS, PLY_COLUMNS, valid_mask, _float_columns
+
+# -----------------------------------------------------------------------------
+# Importance pruning: keep the K splats that contribute most
+# -----------------------------------------------------------------------------
+# A splat's contribution is approximated view-independently by
+#     opacity * pi * sx * sy * (1 + reflectance_weight * refl)
+# i.e. its activated opacity times the area of its 2D footprint, optionally
+# boosted for reflective splats (they matter more in the deferred pass).
+# Rows the loader would drop (NaN, degenerate quaternion) score -inf.
+
+_OPC, _SX, _SY = PLY_COLUMNS.index("opacity"), PLY_COLUMNS.index("scale_0"), PLY_COLUMNS.index("scale_1")
+_REFL = PLY_COLUMNS.index("refl_strength")
+
+
+def _score_block(block: np.ndarray, reflectance_weight: float) -> np.ndarray:
+    from scipy.special import expit     # lazily: pruning only runs on cache builds
+
+    # block: (n, 28) float32 in PLY_COLUMNS order, not yet activated
+    log_area = np.clip(block[:, _SX], -20.0, 20.0) + np.clip(block[:, _SY], -20.0, 20.0)
+    score = expit(block[:, _OPC]) * np.float32(np.pi) * np.exp(log_area)
+    if reflectance_weight:
+        score *= 1.0 + np.float32(reflectance_weight) * expit(block[:, _REFL])
+    score[~valid_mask(block)] = -np.inf
+    return score.astype(np.float32, copy=False)
+
+
+def vertex_importance(v: np.ndarray, reflectance_weight: float = 0.0, block_rows: int = BLOCK_ROWS) -> np.ndarray:
+    """
+    (N,) float32 importance of every row of a structured PLY vertex array,
+    computed from the raw properties in row blocks (no full processing).
+    """
+    n = v.shape[0]
+    scores = np.empty(n, dtype=np.float32)
+    flat = _float_columns(v)
+    for start in range(0, n, block_rows):
+        stop = min(start + block_rows, n)
+        if flat is not None:
+            src, perm = flat
+            block = np.take(src[start:stop], perm, axis=1)
+        else:
+            from numpy.lib.recfunctions import structured_to_unstructured
+            block = structured_to_unstructured(v[start:stop][PLY_COLUMNS], dtype=np.float32)
+        scores[start:stop] = _score_block(block, reflectance_weight)
+    return scores
+
+
+def prune_target(valid: int, bytes_per_splat: int, max_splats: int = 0, max_bytes: int = 0) -> int:
+    """
+    Number of splats to keep: the tighter of a splat count and a payload
+    byte budget (0 = no limit on that axis), never more than `valid`.
+    """
+    keep = valid
+    if max_splats:
+        keep = min(keep, int(max_splats))
+    if max_bytes:
+        keep = min(keep, int(max_bytes) // int(bytes_per_splat))
+    return max(keep, 0)
+
+
+def select_rows(scores: np.ndarray, keep: int) -> np.ndarray:
+    """
+    Ascending row indices of the `keep` highest scores; ties go to the
+    earlier row, and rows scoring -inf are never selected.
+    """
+    keep = min(keep, int(np.count_nonzero(np.isfinite(scores))))
+    ranked = np.argsort(-scores, kind="stable")[:keep]
+    return np.sort(ranked)
+
+
+def prune_stats(scores: np.ndarray, rows: np.ndarray) -> dict:
+    """
+    What pruning kept and dropped, for the cache sidecar and /ply_variants.
+    """
+    finite = np.isfinite(scores)
+    kept = np.zeros(scores.shape[0], dtype=bool)
+    kept[rows] = True
+    dropped = scores[finite & ~kept]
+    total = float(scores[finite].sum(dtype=np.float64))
+    retained = float(scores[kept].sum(dtype=np.float64))
+    return {
+        "sourceSplats": int(scores.shape[0]),
+        "validSplats": int(np.count_nonzero(finite)),
+        "keptSplats": int(rows.shape[0]),
+        "droppedSplats": int(dropped.shape[0]),
+        "keptImportance": retained / total if total > 0 else 1.0,
+        "threshold": float(scores[rows].min()) if rows.shape[0] else None,
+        "droppedImportance": {
+            "max": float(dropped.max()) if dropped.shape[0] else None,
+            "median": float(np.median(dropped)) if dropped.shape[0] else None,
+        },
+    }
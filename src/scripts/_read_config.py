@@ -1,30 +1,131 @@
+import os
 import re
 import json
 
-with open("src/config.ts", "r") as f:
-    text = f.read()
+# -----------------------------------------------------------------------------
+# src/config.ts -> config dict, compiled once and cached as JSON
+# -----------------------------------------------------------------------------
+# config.ts is shared with the frontend and stays the single source. The
+# regex translation to JSON and the type checks run only when it changes:
+# the result is written to __pycache__/config.json with the source's
+# (mtime_ns, size), so every later import (each uvicorn worker, each
+# --reload) costs one stat() and a small json.loads.
 
-# Remove "export const CONFIG =" and "as const;"
-text = re.sub(r"export\s+const\s+CONFIG\s*=\s*", "", text)
-text = re.sub(r"\s*as\s+const\s*;", "", text)
+CONFIG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "config.ts"))
+COMPILED_PATH = os.path.join(os.path.dirname(__file__), "__pycache__", "config.json")
+COMPILED_VERSION = 1
 
-# Remove block comments /* ... */
-text = re.sub(r"/\*[\s\S]*?\*/", "", text)
+# backend keys and their types; `float` accepts integers too
+CONFIG_TYPES = {
+    "RAW_FLOAT_PER_SPLAT": int,
+    "PACKED_FLOAT_PER_SPLAT": int,
+    "PACKED_PIX_PER_SPLAT": int,
+    "INGEST_BLOCK_SPLATS": int,
+    "INGEST_WORKERS": int,
+    "MEMORY_CACHE_BYTES": int,
+    "STREAM_SLICE_BYTES": int,
+    "PRECOMPRESS_ENCODINGS": list,
+    "PRECOMPRESS_SHUFFLED": bool,
+    "PREFETCH_HORIZON_SEC": float,
+    "PREFETCH_RADIUS": float,
+    "PREFETCH_BUDGET_BYTES": int,
+    "PACKED_LAYOUT": str,
+    "SPATIAL_ORDER": str,
+    "BLOCK_BOUNDS_SPLATS": int,
+    "PRUNE_VARIANTS": dict,
+    "PRUNE_REFLECTANCE_WEIGHT": float,
+    "METRICS_ENABLED": bool,
+    "OFFLOAD_WORKERS": int,
+    "OFFLOAD_QUEUE": int,
+    "OFFLOAD_RETRY_AFTER_SEC": float,
+    "PREWARM": bool,
+    "PREWARM_SCENES": list,
+    "PREWARM_WORKERS": int,
+    "PREWARM_PIN": list,
+}
+REQUIRED_KEYS = ("RAW_FLOAT_PER_SPLAT", "PACKED_PIX_PER_SPLAT")
 
-# Remove single-line comments //
-text = re.sub(r"//.*", "", text)
 
-# Remove trailing commas before }
-text = re.sub(r",\s*}", "}", text)
+def parse_config(text: str) -> dict:
+    """
+    The CONFIG object literal of config.ts as a dict.
+    """
+    # Remove "export const CONFIG =" and "as const;"
+    text = re.sub(r"export\s+const\s+CONFIG\s*=\s*", "", text)
+    text = re.sub(r"\s*as\s+const\s*;", "", text)
 
-# Remove trailing commas before ]
-text = re.sub(r",\s*]", "]", text)
+    # Remove block comments /* ... */
+    text = re.sub(r"/\*[\s\S]*?\*/", "", text)
 
-# Convert single-quoted string literals to double-quoted JSON strings
-text = re.sub(r"'([^'\\]*(?:\\.[^'\\]*)*)'", r'"\1"', text)
+    # Remove single-line comments //
+    text = re.sub(r"//.*", "", text)
 
-# Quote keys to make valid JSON
-text = re.sub(r"(\w+)\s*:", r'"\1":', text)
+    # Remove trailing commas before }
+    text = re.sub(r",\s*}", "}", text)
 
-config = json.loads(text)
-print("Loaded config:", config)
\ No newline at end of file
+    # Remove trailing commas before ]
+    text = re.sub(r",\s*]", "]", text)
+
+    # Convert single-quoted string literals to double-quoted JSON strings
+    text = re.sub(r"'([^'\\]*(?:\\.[^'\\]*)*)'", r'"\1"', text)
+
+    # Quote keys to make valid JSON
+    text = re.sub(r"(\w+)\s*:", r'"\1":', text)
+
+    return json.loads(text)
+
+
+def _has_type(value, kind) -> bool:
+    if kind is float:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if kind is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, kind)
+
+
+def validate_config(config: dict) -> dict:
+    errors = [f"{key} is missing" for key in REQUIRED_KEYS if key not in config]
+    errors += [
+        f"{key} must be {kind.__name__}, got {config[key]!r}"
+        for key, kind in CONFIG_TYPES.items()
+        if key in config and not _has_type(config[key], kind)
+    ]
+    if errors:
+        raise ValueError("Invalid src/config.ts: " + "; ".join(errors))
+    return config
+
+
+def _source_key(path: str) -> list[int]:
+    st = os.stat(path)
+    return [COMPILED_VERSION, st.st_mtime_ns, st.st_size]
+
+
+def load_config(path: str = CONFIG_PATH, compiled_path: str = COMPILED_PATH) -> dict:
+    """
+    The validated config, from the compiled cache when it matches the
+    source, otherwise parsed and (best effort) recompiled.
+    """
+    source = _source_key(path)
+    try:
+        with open(compiled_path, "r", encoding="utf-8") as f:
+            compiled = json.load(f)
+        if compiled["source"] == source:
+            return compiled["config"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    with open(path, "r", encoding="utf-8") as f:
+        config = validate_config(parse_config(f.read()))
+    try:
+        # atomic: workers spawned together may all recompile
+        os.makedirs(os.path.dirname(compiled_path), exist_ok=True)
+        tmp = f"{compiled_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"source": source, "config": config}, f)
+        os.replace(tmp, compiled_path)
+    except OSError:
+        pass    # read-only checkout: parse on every start
+    return config
+
+
+config = load_config()
@@ -0,0 +1,613 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# Raw splat layout (RAW_FLOAT_PER_SPLAT = 28 float32 per row)
+# -----------------------------------------------------------------------------
+
+RAW_COLUMNS = [
+    "x", "y", "z", "opc", "sx", "sy",
+    "rot_0", "rot_1", "rot_2", "rot_3",
+    "f_dc_0", "f_dc_1", "f_dc_2",
+    "f_rest_0", "f_rest_1", "f_rest_2",
+    "f_rest_3", "f_rest_4", "f_rest_5",
+    "f_rest_6", "f_rest_7", "f_rest_8",
+    "refl", "rough", "metal",
+    "ori_r", "ori_g", "ori_b",
+]
+
+# PLY vertex property feeding each raw column
+PLY_COLUMNS = [
+    "x", "y", "z", "opacity", "scale_0", "scale_1",
+    "rot_0", "rot_1", "rot_2", "rot_3",
+    "f_dc_0", "f_dc_1", "f_dc_2",
+    "f_rest_0", "f_rest_1", "f_rest_2",
+    "f_rest_3", "f_rest_4", "f_rest_5",
+    "f_rest_6", "f_rest_7", "f_rest_8",
+    "refl_strength", "roughness", "metalness",
+    "ori_color_0", "ori_color_1", "ori_color_2",
+]
+
+SIGMOID_COLS = [3, 22, 23, 24, 25, 26, 27]  # opc, refl, rough, metal, ori_rgb
+SCALE_COLS = slice(4, 6)                    # sx, sy (log-space in the PLY)
+ROT_COLS = slice(6, 10)                     # rot_0..3 (w, x, y, z)
+SH1_COLS = slice(13, 22)
+
+# rows per block for the cache-blocked loops below
+BLOCK_ROWS = 1 << 14
+
+# -----------------------------------------------------------------------------
+# Row sharding
+# -----------------------------------------------------------------------------
+
+def resolve_workers(workers: int | None) -> int:
+    """
+    Worker count from config / CLI: 0 or None means one per CPU core.
+    """
+    return max(1, workers or os.cpu_count() or 1)
+
+
+def run_sharded(fn, n: int, workers: int = 1, min_rows: int = BLOCK_ROWS) -> None:
+    """
+    Call fn(start, stop) over disjoint, contiguous row shards covering
+    [0, n). With more than one worker the shards run on a thread pool;
+    NumPy releases the GIL inside its loops, so row-independent stages
+    scale across cores while each shard writes only its own output rows.
+    """
+    shards = max(1, min(workers, n // min_rows))
+    if shards == 1:
+        fn(0, n)
+        return
+
+    bounds = np.linspace(0, n, shards + 1).astype(np.int64)
+    with ThreadPoolExecutor(max_workers=shards) as pool:
+        futures = [pool.submit(fn, int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])]
+        for future in futures:
+            future.result()
+
+
+# -----------------------------------------------------------------------------
+# Filtering + activation
+# -----------------------------------------------------------------------------
+
+def valid_mask(block: np.ndarray) -> np.ndarray:
+    """
+    Rows kept by the loader for a (n, 28) float32 block in PLY_COLUMNS
+    order: no NaN in any property and a quaternion whose norm is in
+    (1e-8, 1e20).
+    """
+    bad = np.isnan(block).any(axis=1)
+
+    q = block[:, ROT_COLS]
+    norm = np.sqrt(q[:, 0] * q[:, 0] + q[:, 1] * q[:, 1] + q[:, 2] * q[:, 2] + q[:, 3] * q[:, 3])
+    bad |= norm <= 1e-8
+    bad |= norm >= 1e20
+    return ~bad
+
+
+def _activate(X: np.ndarray) -> None:
+    # scipy is only needed on cache-miss paths; importing it costs the
+    # server ~170 ms at startup
+    from scipy.special import expit
+
+    # clip log-scale inputs to prevent overflow, then exponentiate
+    scl = X[:, SCALE_COLS]
+    np.clip(scl, -20.0, 20.0, out=scl)
+    np.exp(scl, out=scl)
+
+    for j in SIGMOID_COLS:
+        expit(X[:, j], out=X[:, j])
+
+
+def _float_columns(v: np.ndarray) -> tuple[np.ndarray, list[int]] | None:
+    """
+    View a structured vertex array whose properties are all little-endian
+    float32 as a plain (N, n_props) array, plus the column order of
+    PLY_COLUMNS in it. Returns None for any other layout.
+    """
+    names = v.dtype.names
+    if any(v.dtype.fields[name][0] != np.dtype("<f4") for name in names):
+        return None
+    if v.dtype.itemsize != 4 * len(names) or not v.flags["C_CONTIGUOUS"]:
+        return None
+    return v.view(np.float32).reshape(v.shape[0], len(names)), [names.index(c) for c in PLY_COLUMNS]
+
+
+def process_vertices(v: np.ndarray, block_rows: int = BLOCK_ROWS) -> np.ndarray:
+    """
+    Filter a structured PLY vertex array and write activated values into a
+    preallocated (N, 28) float32 array in RAW_COLUMNS order.
+
+    The (usually memory-mapped) source is walked in row blocks: each block is
+    gathered straight into the output, masked once and activated in place
+    while it is still in cache. Rows dropped by the mask are trimmed off the
+    end in place.
+    """
+    n = v.shape[0]
+    ncols = len(RAW_COLUMNS)
+    X = np.empty((n, ncols), dtype=np.float32)
+    flat = _float_columns(v)
+
+    count = 0
+    for start in range(0, n, block_rows):
+        stop = min(start + block_rows, n)
+        out = X[count:count + stop - start]
+        if flat is not None:
+            src, perm = flat
+            np.take(src[start:stop], perm, axis=1, out=out)
+        else:
+            # mixed-type vertex properties only (pulls in numpy.ma)
+            from numpy.lib.recfunctions import structured_to_unstructured
+            out[:] = structured_to_unstructured(v[start:stop][PLY_COLUMNS], dtype=np.float32)
+
+        keep = valid_mask(out)
+        k = int(np.count_nonzero(keep))
+        if k < out.shape[0]:
+            out[:k] = out[keep]
+            out = out[:k]
+
+        _activate(out)
+        count += k
+
+    if count < n:
+        X.resize((count, ncols), refcheck=False)
+    return X
+
+
+# -----------------------------------------------------------------------------
+# Rigid / linear transform
+# -----------------------------------------------------------------------------
+
+def _orthonormal_basis(l: np.ndarray) -> np.ndarray:
+    """
+    Gram-Schmidt rotation part of a 3x3 linear map (used for SH1).
+    """
+    r0 = l[:, 0]
+    r0 = r0 / (np.linalg.norm(r0) + 1e-8)
+    r1 = l[:, 1] - r0 * np.dot(r0, l[:, 1])
+    r1 = r1 / (np.linalg.norm(r1) + 1e-8)
+    r2 = np.cross(r0, r1)
+    r2 = r2 / (np.linalg.norm(r2) + 1e-8)
+    return np.stack([r0, r1, r2], axis=1)
+
+
+def _mat3_apply(m: np.ndarray, a, b, c):
+    """
+    m @ [a, b, c] for column arrays a, b, c, written out per component so
+    results depend only on the row (no BLAS blocking).
+    """
+    return (
+        m[0, 0] * a + m[0, 1] * b + m[0, 2] * c,
+        m[1, 0] * a + m[1, 1] * b + m[1, 2] * c,
+        m[2, 0] * a + m[2, 1] * b + m[2, 2] * c,
+    )
+
+
+def transform_splats(
+    X: np.ndarray,
+    transform: np.ndarray,
+    block_rows: int = BLOCK_ROWS,
+    workers: int = 1,
+) -> None:
+    """
+    Apply a 4x4 transform in place to positions, rotation/scale and SH1 of
+    a (N, 28) raw splat array, one cache-sized row block at a time, with
+    row shards spread over `workers` threads.
+    """
+    t = np.asarray(transform, dtype=np.float32)
+    if t.shape != (4, 4):
+        raise ValueError("transform must be 4x4")
+    rot_l = _orthonormal_basis(t[:3, :3])
+
+    ncols = SH1_COLS.stop
+
+    def transform_rows(lo: int, hi: int) -> None:
+        for start in range(lo, hi, block_rows):
+            block = X[start:min(start + block_rows, hi)]
+            # column-major copy so every per-component op runs on contiguous data
+            cols = np.ascontiguousarray(block[:, :ncols].T)
+            _transform_block(cols.T, t, rot_l)
+            block[:, :ncols] = cols.T
+
+    run_sharded(transform_rows, X.shape[0], workers, block_rows)
+
+
+def _transform_block(X: np.ndarray, t: np.ndarray, rot_l: np.ndarray) -> None:
+    l = t[:3, :3]
+
+    # positions
+    nx, ny, nz = _mat3_apply(l, X[:, 0], X[:, 1], X[:, 2])
+    X[:, 0] = nx + t[0, 3]
+    X[:, 1] = ny + t[1, 3]
+    X[:, 2] = nz + t[2, 3]
+
+    # SH1: rotate each coefficient triplet by the rotation part of l
+    for k in range(3):
+        c = SH1_COLS.start + 3 * k
+        X[:, c], X[:, c + 1], X[:, c + 2] = _mat3_apply(rot_l, X[:, c], X[:, c + 1], X[:, c + 2])
+
+    # rotation * scale: rebuild the two scaled axes, transform, re-factor
+    sx, sy = X[:, 4], X[:, 5]
+    q = X[:, ROT_COLS]
+    norm = np.sqrt(q[:, 0] * q[:, 0] + q[:, 1] * q[:, 1] + q[:, 2] * q[:, 2] + q[:, 3] * q[:, 3])
+    norm[norm == 0] = 1.0
+    w, xq, yq, zq = q[:, 0] / norm, q[:, 1] / norm, q[:, 2] / norm, q[:, 3] / norm
+
+    xx, yy, zz = xq*xq, yq*yq, zq*zq
+    xy, xz, yz = xq*yq, xq*zq, yq*zq
+    wx, wy, wz = w*xq, w*yq, w*zq
+
+    c0 = _mat3_apply(l, (1 - 2*(yy + zz)) * sx, (2*(xy + wz)) * sx, (2*(xz - wy)) * sx)
+    c1 = _mat3_apply(l, (2*(xy - wz)) * sy, (1 - 2*(xx + zz)) * sy, (2*(yz + wx)) * sy)
+
+    sx_n = np.sqrt(c0[0]*c0[0] + c0[1]*c0[1] + c0[2]*c0[2])
+    sy_n = np.sqrt(c1[0]*c1[0] + c1[1]*c1[1] + c1[2]*c1[2])
+    sx_n[sx_n == 0] = 1.0
+    sy_n[sy_n == 0] = 1.0
+
+    r00, r10, r20 = c0[0] / sx_n, c0[1] / sx_n, c0[2] / sx_n
+    r01, r11, r21 = c1[0] / sy_n, c1[1] / sy_n, c1[2] / sy_n
+
+    # third axis = normalize(col0 x col1), then re-orthogonalize col1
+    r02 = r10*r21 - r20*r11
+    r12 = r20*r01 - r00*r21
+    r22 = r00*r11 - r10*r01
+    n2 = np.sqrt(r02*r02 + r12*r12 + r22*r22)
+    n2[n2 == 0] = 1.0
+    r02, r12, r22 = r02 / n2, r12 / n2, r22 / n2
+    r01 = r12*r20 - r22*r10
+    r11 = r22*r00 - r02*r20
+    r21 = r02*r10 - r12*r00
+
+    # rotation matrix -> quaternion (w, x, y, z); the four branches are
+    # selected per row instead of scattered through boolean indexing
+    trace = r00 + r11 + r22
+    m0 = trace > 0
+    m1 = (r00 > r11) & (r00 > r22) & (~m0)
+    m2 = (r11 > r22) & (~m0) & (~m1)
+    cases = [m0, m1, m2]
+
+    s = np.sqrt(np.select(cases, [
+        trace + 1.0,
+        1.0 + r00 - r11 - r22,
+        1.0 + r11 - r00 - r22,
+    ], 1.0 + r22 - r00 - r11)) * 2
+
+    h = 0.25 * s
+    a = (r21 - r12) / s
+    b = (r02 - r20) / s
+    c = (r10 - r01) / s
+    d = (r01 + r10) / s
+    e = (r02 + r20) / s
+    f = (r12 + r21) / s
+
+    X[:, 4] = sx_n
+    X[:, 5] = sy_n
+    X[:, 6] = np.select(cases, [h, a, b], c)
+    X[:, 7] = np.select(cases, [a, h, d], e)
+    X[:, 8] = np.select(cases, [b, d, h], f)
+    X[:, 9] = np.select(cases, [c, e, f], h)
+
+
+
+# -----------------------------------------------------------------------------
+# Texture packing (16 words / 4 RGBA32UI pixels per splat)
+# -----------------------------------------------------------------------------
+#   word  0-3  : pos.xyz, opacity                   float32
+#   word  4-6  : RS0..RS5 (rotation * scale)        half2
+#   word  7    : base color from SH0                RGBA8
+#   word  8-12 : SH1[0..8] (last half zero)         half2
+#   word 13    : origin color                       RGBA8
+#   word 14-15 : refl, rough, metal (last half zero) half2
+
+FLOATS_PER_PIX = 4
+PACKED_WORDS = 16
+SH_C0 = 0.28209479177387814
+
+
+def pack_half2(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Pack two float32 arrays into one uint32 array as IEEE-754 half2.
+    """
+    hx = x.astype(np.float16).view(np.uint16).astype(np.uint32)
+    hy = y.astype(np.float16).view(np.uint16).astype(np.uint32)
+    return hx | (hy << 16)
+
+
+def pack_half1(x: np.ndarray) -> np.ndarray:
+    """
+    Pack one float32 array into lower 16 bits of uint32 (upper bits zero).
+    """
+    return x.astype(np.float16).view(np.uint16).astype(np.uint32)
+
+
+class PackArena:
+    """
+    Scratch buffers for pack_splats, sized for one block of rows and reused
+    across calls so packing allocates a constant number of arrays.
+    """
+
+    def __init__(self, rows: int = BLOCK_ROWS):
+        self.rows = rows
+        self.q = np.empty((rows, 4), dtype=np.float32)      # normalized quaternion
+        self.norm = np.empty(rows, dtype=np.float32)
+        self.zero = np.empty(rows, dtype=bool)
+        self.prod = np.empty((9, rows), dtype=np.float32)   # xx yy zz xy xz yz wx wy wz
+        self.rs = np.empty((6, rows), dtype=np.float32)
+        self.color = np.empty((rows, 3), dtype=np.float32)
+
+    def view(self, n: int) -> "PackArena":
+        """
+        Arena restricted to the first n rows (n <= rows), without copying.
+        """
+        sub = PackArena.__new__(PackArena)
+        sub.rows = n
+        sub.q, sub.norm, sub.zero = self.q[:n], self.norm[:n], self.zero[:n]
+        sub.prod, sub.rs, sub.color = self.prod[:, :n], self.rs[:, :n], self.color[:n]
+        return sub
+
+
+_arenas = threading.local()
+
+
+def _thread_arena() -> PackArena:
+    arena = getattr(_arenas, "arena", None)
+    if arena is None:
+        arena = _arenas.arena = PackArena()
+    return arena
+
+
+def _pack_block(X: np.ndarray, tex_u32: np.ndarray, arena: PackArena) -> None:
+    """
+    Pack up to arena.rows rows of X into the matching texture rows. Every
+    intermediate lives in the arena; half fields are cast straight into the
+    float16 view of the output.
+    """
+    tex_f32 = tex_u32.view(np.float32)
+    tex_f16 = tex_u32.view(np.float16)
+    tex_u16 = tex_u32.view(np.uint16)
+    tex_u8 = tex_u32.view(np.uint8)
+
+    # pos.xyz + opacity
+    tex_f32[:, 0:4] = X[:, 0:4]
+
+    # rotation * scale -> half2 x3
+    q, norm, zero = arena.q, arena.norm, arena.zero
+    np.multiply(X[:, ROT_COLS], X[:, ROT_COLS], out=q)
+    np.add.reduce(q, axis=1, out=norm)
+    np.sqrt(norm, out=norm)
+    np.equal(norm, 0, out=zero)
+    np.putmask(norm, zero, 1.0)
+    np.divide(X[:, ROT_COLS], norm[:, None], out=q)
+    w, x, y, z = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+
+    xx, yy, zz, xy, xz, yz, wx, wy, wz = arena.prod
+    np.multiply(x, x, out=xx); np.multiply(y, y, out=yy); np.multiply(z, z, out=zz)
+    np.multiply(x, y, out=xy); np.multiply(x, z, out=xz); np.multiply(y, z, out=yz)
+    np.multiply(w, x, out=wx); np.multiply(w, y, out=wy); np.multiply(w, z, out=wz)
+
+    sx, sy = X[:, 4], X[:, 5]
+    rs = arena.rs
+    for i, (a, op, b, diag, s) in enumerate([
+        (yy, np.add,      zz, True,  sx),   # RS0 = (1 - 2*(yy + zz)) * sx
+        (xy, np.subtract, wz, False, sy),   # RS1 = (2*(xy - wz)) * sy
+        (xy, np.add,      wz, False, sx),   # RS2 = (2*(xy + wz)) * sx
+        (xx, np.add,      zz, True,  sy),   # RS3 = (1 - 2*(xx + zz)) * sy
+        (xz, np.subtract, wy, False, sx),   # RS4 = (2*(xz - wy)) * sx
+        (yz, np.add,      wx, False, sy),   # RS5 = (2*(yz + wx)) * sy
+    ]):
+        out = rs[i]
+        op(a, b, out=out)
+        np.multiply(out, 2, out=out)
+        if diag:
+            np.subtract(1, out, out=out)
+        np.multiply(out, s, out=out)
+
+    # one float32 -> float16 cast per field group, written in place
+    tex_f16[:, 8:14] = rs.T
+    tex_f16[:, 16:25] = X[:, SH1_COLS]
+    tex_f16[:, 28:31] = X[:, 22:25]
+    tex_u16[:, 25] = 0
+    tex_u16[:, 31] = 0
+
+    # base color from SH0 -> RGBA8
+    color = arena.color
+    np.multiply(X[:, 10:13], SH_C0, out=color)
+    np.add(color, 0.5, out=color)
+    _store_unorm8(color, tex_u8[:, 28:31])
+    tex_u8[:, 31] = 255
+
+    # origin color -> RGBA8
+    np.copyto(color, X[:, 25:28])
+    _store_unorm8(color, tex_u8[:, 52:55])
+    tex_u8[:, 55] = 255
+
+
+def _store_unorm8(color: np.ndarray, out: np.ndarray) -> None:
+    np.multiply(color, 255, out=color)
+    np.round(color, out=color)
+    np.clip(color, 0, 255, out=color)
+    out[...] = color
+
+
+def pack_splats(
+    X: np.ndarray,
+    pixels_per_splat: int,
+    workers: int = 1,
+) -> tuple[np.ndarray, int]:
+    """
+    Pack (N, 28) raw splats into the uint32 texture buffer
+    (N * pixels_per_splat * 4 words). Row shards run on `workers` threads,
+    each walking its slice of raw_data in arena-sized blocks.
+    """
+    vcount = X.shape[0]
+    width = pixels_per_splat * FLOATS_PER_PIX
+    if width < PACKED_WORDS:
+        raise ValueError(f"pixels_per_splat must be at least {PACKED_WORDS // FLOATS_PER_PIX}")
+
+    raw_data = np.empty(vcount * width, dtype=np.uint32)
+    tex_u32 = raw_data.reshape((vcount, width))
+    if width > PACKED_WORDS:
+        tex_u32[:, PACKED_WORDS:] = 0
+
+    def pack_rows(lo: int, hi: int) -> None:
+        arena = _thread_arena()
+        for start in range(lo, hi, arena.rows):
+            stop = min(start + arena.rows, hi)
+            _pack_block(X[start:stop], tex_u32[start:stop, :PACKED_WORDS], arena.view(stop - start))
+
+    run_sharded(pack_rows, vcount, workers)
+    return raw_data, vcount
+
+
+# -----------------------------------------------------------------------------
+# Compact texture packing (8 words / 2 RGBA32UI pixels per splat)
+# -----------------------------------------------------------------------------
+#   word 0   : pos.x, pos.y                      unorm16 over the bounds
+#   word 1   : pos.z unorm16, opacity unorm8, refl unorm8
+#   word 2   : base color RGB8, rough unorm8
+#   word 3   : origin color RGB8, metal unorm8
+#   word 4   : rotation, smallest-three quaternion: index of the dropped
+#              (largest) component in bits 0-1, the other three in
+#              10-bit steps over [-1/sqrt(2), 1/sqrt(2)] from bit 2
+#   word 5   : sx, sy                            half2
+#   word 6-7 : SH1[0..8] as snorm7 over [-SH1_RANGE, SH1_RANGE], coefficient
+#              k in bits 7k..7k+6 of the 64-bit pair (word 6 = low half)
+#
+# Positions are relative to bounds sent alongside the payload (chunk bounds
+# for chunks, a splat-bounds header for /ply).
+
+PACKINGS = ("full", "compact")
+COMPACT_PIX_PER_SPLAT = 2
+COMPACT_WORDS = 8
+SH1_RANGE = 1.0
+_QUAT_RANGE = np.float32(np.sqrt(0.5))
+
+
+def packing_pixels(packing: str, pixels_per_splat: int) -> int:
+    """
+    Texture pixels per splat of a packing mode ("full" keeps the configured
+    PACKED_PIX_PER_SPLAT).
+    """
+    if packing not in PACKINGS:
+        raise ValueError(f"Unknown packing: {packing}")
+    return COMPACT_PIX_PER_SPLAT if packing == "compact" else pixels_per_splat
+
+
+def _unorm(values: np.ndarray, bits: int) -> np.ndarray:
+    scale = (1 << bits) - 1
+    return np.clip(np.round(values * scale), 0, scale).astype(np.uint32)
+
+
+def _pack_compact_block(X: np.ndarray, lo: np.ndarray, hi: np.ndarray, out: np.ndarray) -> None:
+    # positions, normalized to the bounds
+    extent = hi - lo
+    rel = (X[:, 0:3] - lo) / np.where(extent > 0, extent, 1.0)
+    pos = _unorm(rel, 16)
+    out[:, 0] = pos[:, 0] | (pos[:, 1] << 16)
+    out[:, 1] = pos[:, 2] | (_unorm(X[:, 3], 8) << 16) | (_unorm(X[:, 22], 8) << 24)
+
+    base = _unorm(X[:, 10:13] * SH_C0 + 0.5, 8)
+    out[:, 2] = base[:, 0] | (base[:, 1] << 8) | (base[:, 2] << 16) | (_unorm(X[:, 23], 8) << 24)
+    ori = _unorm(X[:, 25:28], 8)
+    out[:, 3] = ori[:, 0] | (ori[:, 1] << 8) | (ori[:, 2] << 16) | (_unorm(X[:, 24], 8) << 24)
+
+    # smallest-three quaternion: drop the largest component (sign-fixed to
+    # be positive), keep the other three in order
+    q = X[:, ROT_COLS]
+    norm = np.sqrt((q * q).sum(axis=1, keepdims=True))
+    q = q / np.where(norm > 0, norm, 1.0)
+    largest = np.abs(q).argmax(axis=1)
+    rows = np.arange(q.shape[0])
+    q = q * np.where(q[rows, largest] < 0, -1.0, 1.0).astype(np.float32)[:, None]
+    keep = (largest[:, None] + np.arange(1, 4)) % 4
+    rest = _unorm((q[rows[:, None], keep] / _QUAT_RANGE + 1.0) * 0.5, 10)
+    out[:, 4] = largest.astype(np.uint32) | (rest[:, 0] << 2) | (rest[:, 1] << 12) | (rest[:, 2] << 22)
+
+    out[:, 5] = pack_half2(X[:, 4], X[:, 5])
+
+    sh = np.clip(np.round(X[:, SH1_COLS] / SH1_RANGE * 63), -63, 63).astype(np.int64) + 64
+    bits = (sh.astype(np.uint64) << (np.arange(9, dtype=np.uint64) * np.uint64(7))).sum(axis=1, dtype=np.uint64)
+    out[:, 6] = (bits & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+    out[:, 7] = (bits >> np.uint64(32)).astype(np.uint32)
+
+
+def pack_splats_compact(
+    X: np.ndarray,
+    lo,
+    hi,
+    workers: int = 1,
+) -> tuple[np.ndarray, int]:
+    """
+    Pack (N, 28) raw splats into the compact layout (N * 8 words).
+    `lo` / `hi` are the quantization bounds: (3,) for the whole array or
+    (N, 3) per row (e.g. each row's chunk bounds).
+    """
+    vcount = X.shape[0]
+    lo = np.asarray(lo, dtype=np.float32)
+    hi = np.asarray(hi, dtype=np.float32)
+    raw_data = np.empty(vcount * COMPACT_WORDS, dtype=np.uint32)
+    out = raw_data.reshape((vcount, COMPACT_WORDS))
+
+    def pack_rows(start: int, stop: int) -> None:
+        for a in range(start, stop, BLOCK_ROWS):
+            b = min(a + BLOCK_ROWS, stop)
+            block_lo = lo if lo.ndim == 1 else lo[a:b]
+            block_hi = hi if hi.ndim == 1 else hi[a:b]
+            _pack_compact_block(X[a:b], block_lo, block_hi, out[a:b])
+
+    run_sharded(pack_rows, vcount, workers)
+    return raw_data, vcount
+
+
+def unpack_compact_positions(raw_data: np.ndarray, lo, hi) -> np.ndarray:
+    """
+    (N, 3) float32 positions of a compact payload (the inverse of the
+    quantization in pack_splats_compact, up to one 16-bit step).
+    """
+    words = np.asarray(raw_data, dtype=np.uint32).reshape(-1, COMPACT_WORDS)
+    q = np.stack([words[:, 0] & 0xFFFF, words[:, 0] >> 16, words[:, 1] & 0xFFFF], axis=1)
+    lo = np.asarray(lo, dtype=np.float32)
+    hi = np.asarray(hi, dtype=np.float32)
+    return lo + q.astype(np.float32) / 65535.0 * (hi - lo)
+
+
+def packed_positions(raw_data: np.ndarray, pixels_per_splat: int, bounds=None) -> np.ndarray:
+    """
+    (N, 3) float32 positions of a packed payload: words 0-2 of each full
+    record, or the dequantized compact position when `bounds` is given.
+    """
+    if bounds is not None:
+        return unpack_compact_positions(raw_data, *bounds)
+    words = np.asarray(raw_data, dtype=np.uint32).reshape(-1, int(pixels_per_splat) * FLOATS_PER_PIX)
+    return words[:, :3].view(np.float32)
+
+
+def vertex_positions(v: np.ndarray) -> np.ndarray:
+    """
+    (N, 3) float32 x, y, z columns of a structured PLY vertex array.
+    """
+    return np.stack([np.asarray(v[c], dtype=np.float32) for c in ("x", "y", "z")], axis=1)
+
+
+def position_bounds(v: np.ndarray, transform: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (lo, hi) float32 box enclosing the positions of a structured PLY vertex
+    array after `transform`, without processing the other properties: the
+    corners of the source box are transformed, so the result is exact for
+    axis permutations / flips and conservative otherwise.
+    """
+    if v.shape[0] == 0:
+        return np.zeros(3, dtype=np.float32), np.zeros(3, dtype=np.float32)
+    lo = np.array([np.nanmin(v[c]) for c in ("x", "y", "z")], dtype=np.float64)
+    hi = np.array([np.nanmax(v[c]) for c in ("x", "y", "z")], dtype=np.float64)
+    if transform is None:
+        return lo.astype(np.float32), hi.astype(np.float32)
+
+    t = np.asarray(transform, dtype=np.float64)
+    pick = (np.arange(8)[:, None] >> np.arange(3)) & 1
+    corners = np.where(pick, hi, lo) @ t[:3, :3].T + t[:3, 3]
+    return corners.min(axis=0).astype(np.float32), corners.max(axis=0).astype(np.float32)
@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+
+from src.scripts._splat import PLY_COLUMNS
+
+# -----------------------------------------------------------------------------
+# Deterministic synthetic Ref-GS scenes (benchmarks, tests)
+# -----------------------------------------------------------------------------
+# The PLY has the 28 float vertex properties of a trained Ref-GS scene
+# (PLY_COLUMNS), with values in the ranges the loader expects: splats are
+# clustered around a few dozen surface patches, scales are log-space around
+# 2 cm, opacities / PBR terms are logits. A small fraction of rows is
+# invalid (NaN scale, zero quaternion) so the filtering path is exercised.
+#
+# Rows are generated in fixed-size blocks, each from its own seed sequence,
+# so a scene's bytes depend only on (n, seed).
+
+SYNTHETIC_BLOCK_ROWS = 1 << 20
+SYNTHETIC_CLUSTERS = 48
+SYNTHETIC_EXTENT = 50.0
+INVALID_FRACTION = 1e-3
+
+_COL = {name: i for i, name in enumerate(PLY_COLUMNS)}
+
+
+def ply_header(n: int) -> bytes:
+    props = "".join(f"property float {name}\n" for name in PLY_COLUMNS)
+    return f"ply\nformat binary_little_endian 1.0\nelement vertex {n}\n{props}end_header\n".encode("ascii")
+
+
+def synthetic_block(n: int, seed: int, block: int) -> np.ndarray:
+    """
+    (n, 28) float32 rows of block `block` in PLY_COLUMNS order.
+    """
+    scene_rng = np.random.default_rng([seed, 0])
+    centers = scene_rng.uniform(-SYNTHETIC_EXTENT, SYNTHETIC_EXTENT, (SYNTHETIC_CLUSTERS, 3))
+    spreads = scene_rng.uniform(1.0, 8.0, (SYNTHETIC_CLUSTERS, 3))
+
+    rng = np.random.default_rng([seed, block + 1])
+    rows = rng.standard_normal((n, len(PLY_COLUMNS)), dtype=np.float32)
+    cluster = rng.integers(0, SYNTHETIC_CLUSTERS, n)
+    rows[:, 0:3] = rows[:, 0:3] * spreads[cluster] + centers[cluster]
+    rows[:, _COL["opacity"]] = rows[:, _COL["opacity"]] * 2.0 + 1.0
+    rows[:, _COL["scale_0"]:_COL["scale_1"] + 1] = rows[:, _COL["scale_0"]:_COL["scale_1"] + 1] * 0.5 - 4.0
+
+    bad = rng.random(n) < INVALID_FRACTION
+    rows[bad & (rng.random(n) < 0.5), _COL["scale_1"]] = np.nan
+    rows[bad & (rng.random(n) < 0.5), _COL["rot_0"]:_COL["rot_3"] + 1] = 0.0
+    return rows
+
+
+def write_synthetic_ply(path: str, n: int, seed: int = 0) -> int:
+    """
+    Write an n-splat binary little-endian PLY. Returns the file size.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(ply_header(n))
+        for block, start in enumerate(range(0, n, SYNTHETIC_BLOCK_ROWS)):
+            f.write(synthetic_block(min(SYNTHETIC_BLOCK_ROWS, n - start), seed, block).tobytes())
+        size = f.tell()
+    os.replace(tmp, path)
+    return size
+
+
+def write_synthetic_map(path: str, size: int = 128, seed: int = 0) -> None:
+    """
+    A (6, size, size, 3) float32 cube map in the map1.npz format /map reads.
+    """
+    rng = np.random.default_rng([seed, 1 << 30])
+    u = np.linspace(0.0, 1.0, size, dtype=np.float32)
+    faces = np.empty((6, size, size, 3), dtype=np.float32)
+    for face in range(6):
+        tint = rng.uniform(0.2, 1.0, 3).astype(np.float32)
+        faces[face] = (u[:, None, None] * 0.5 + u[None, :, None] * 0.5) * tint
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez(path, faces)
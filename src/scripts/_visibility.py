@@ -0,0 +1,104 @@
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# Frustum / priority queries over (N, 2, 3) chunk bounds
+# -----------------------------------------------------------------------------
+# Matrices follow the client (three.js / OpenGL): clip = M @ [x, y, z, 1] with
+# NDC z in [-1, 1]. The bounds array holds (min, max) corners per chunk.
+
+def parse_matrix(values, order: str = "F") -> np.ndarray:
+    """
+    4x4 float64 matrix from 16 numbers; three.js Matrix4.elements are
+    column-major, hence order="F".
+    """
+    m = np.asarray(values, dtype=np.float64)
+    if m.size != 16:
+        raise ValueError("expected 16 matrix elements")
+    return m.reshape(4, 4, order=order)
+
+
+def frustum_planes(view_proj: np.ndarray) -> np.ndarray:
+    """
+    (6, 4) normalized planes (nx, ny, nz, d) with inside = n.p + d >= 0.
+    """
+    r = view_proj
+    planes = np.stack([
+        r[3] + r[0], r[3] - r[0],
+        r[3] + r[1], r[3] - r[1],
+        r[3] + r[2], r[3] - r[2],
+    ])
+    norm = np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+    return planes / np.maximum(norm, 1e-12)
+
+
+def boxes_in_frustum(bounds: np.ndarray, planes: np.ndarray) -> np.ndarray:
+    """
+    Conservative AABB test: a box is culled only when its corner furthest
+    along some plane normal is still outside that plane.
+    """
+    lo = bounds[:, 0].astype(np.float64)
+    hi = bounds[:, 1].astype(np.float64)
+    n = planes[:, :3]
+    # furthest corner per plane: max where the normal is positive, min otherwise
+    dist = hi @ np.maximum(n, 0).T + lo @ np.minimum(n, 0).T + planes[:, 3]
+    return (dist >= 0).all(axis=1)
+
+
+def box_distance_sq(bounds: np.ndarray, points) -> np.ndarray:
+    """
+    Squared distance from a point (3,) to each box -> (N,), or from each of
+    several points (K, 3) -> (K, N). Zero inside a box.
+    """
+    p = np.asarray(points, dtype=np.float64)[..., None, :]
+    d = np.maximum(np.maximum(bounds[:, 0] - p, p - bounds[:, 1]), 0.0)
+    return (d * d).sum(axis=-1)
+
+
+def projected_area(bounds: np.ndarray, view_proj: np.ndarray) -> np.ndarray:
+    """
+    NDC area of each box's projected 2D bounding rectangle, clipped to the
+    screen ([-1, 1]^2, so at most 4). Boxes crossing the near plane count
+    as covering the whole screen.
+    """
+    n = bounds.shape[0]
+    # 8 corners per box: bit k of the corner index picks min/max on axis k
+    pick = (np.arange(8)[:, None] >> np.arange(3)) & 1                 # (8, 3)
+    corners = np.where(pick[None], bounds[:, 1][:, None], bounds[:, 0][:, None])
+    homo = np.concatenate([corners, np.ones((n, 8, 1))], axis=2)      # (N, 8, 4)
+    clip = homo @ view_proj.T
+
+    w = clip[..., 3]
+    behind = (w <= 1e-6).any(axis=1)
+    ndc = clip[..., :2] / np.where(w > 1e-6, w, 1.0)[..., None]
+    lo = np.clip(ndc.min(axis=1), -1.0, 1.0)
+    hi = np.clip(ndc.max(axis=1), -1.0, 1.0)
+    area = np.prod(hi - lo, axis=1)
+    return np.where(behind, 4.0, area)
+
+
+def visible_order(
+    bounds: np.ndarray,
+    view_proj: np.ndarray,
+    camera=None,
+    order: str = "distance",
+    budget: int | None = None,
+) -> np.ndarray:
+    """
+    Row indices of the boxes inside the frustum, nearest (order="distance",
+    needs `camera`) or largest on screen (order="area") first, truncated
+    to `budget` rows.
+    """
+    rows = np.flatnonzero(boxes_in_frustum(bounds, frustum_planes(view_proj)))
+    if order == "distance":
+        if camera is None:
+            raise ValueError("distance ordering needs a camera position")
+        key = box_distance_sq(bounds[rows], camera)
+    elif order == "area":
+        key = -projected_area(bounds[rows], view_proj)
+    else:
+        raise ValueError(f"Unknown visibility order: {order}")
+
+    if budget is not None and budget < rows.size:
+        part = np.argpartition(key, budget)[:budget]
+        return rows[part[np.argsort(key[part], kind="stable")]]
+    return rows[np.argsort(key, kind="stable")]
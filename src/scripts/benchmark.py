@@ -0,0 +1,363 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import subprocess
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+# the scenes live in a res/ tree of their own, so the server and its
+# startup prewarm never see them
+BENCH_DIR = os.path.join(PROJECT_ROOT, "bench_data")
+sys.path.insert(0, PROJECT_ROOT)
+from src.scripts._synthetic import write_synthetic_map, write_synthetic_ply
+
+# -----------------------------------------------------------------------------
+# Synthetic-scene benchmark: ingest, packing, chunking and endpoints
+# -----------------------------------------------------------------------------
+# Every (scene, stage) runs in a fresh spawned process, so peak RSS is that
+# stage's own high-water mark and no cache survives from a previous stage.
+# The process works in BENCH_DIR, so "res/<scene>" is bench_data/res/<scene>.
+# Results are written as JSON (see RESULTS_VERSION) and can be compared
+# against an earlier run with --compare.
+
+RESULTS_VERSION = 1
+SIZES = {"100k": 100_000, "1m": 1_000_000, "5m": 5_000_000, "10m": 10_000_000}
+STAGES = ["load_ply", "pack_data", "separate_trunk", "ply", "load_chunk", "map", "cold_start"]
+CHUNK_MAX_SPLATS = 65536
+
+ROT_X_180 = np.array([
+    [1.0, 0.0, 0.0, 0.0],
+    [0.0, -1.0, 0.0, 0.0],
+    [0.0, 0.0, -1.0, 0.0],
+    [0.0, 0.0, 0.0, 1.0],
+], dtype=np.float32)
+
+
+def scene_name(label: str) -> str:
+    return f"bench_{label}"
+
+
+def ensure_scene(label: str, seed: int = 0, regenerate: bool = False) -> str:
+    """
+    Generate bench_data/res/bench_<label>/ (point_cloud.ply + map1.npz)
+    unless it is already there.
+    """
+    scene_dir = os.path.join(BENCH_DIR, "res", scene_name(label))
+    ply_path = os.path.join(scene_dir, "point_cloud.ply")
+    if regenerate and os.path.isdir(scene_dir):
+        shutil.rmtree(scene_dir)
+    if not os.path.exists(ply_path):
+        print(f"Generating {ply_path} ({SIZES[label]} splats)...")
+        write_synthetic_ply(ply_path, SIZES[label], seed)
+    if not os.path.exists(os.path.join(scene_dir, "map1.npz")):
+        write_synthetic_map(os.path.join(scene_dir, "map1.npz"), seed=seed)
+    return scene_dir
+
+
+def clear_packed_cache(scene_dir: str) -> None:
+    for name in os.listdir(scene_dir):
+        if name.startswith(("packed_", "map1_rgba")):
+            os.remove(os.path.join(scene_dir, name))
+
+# -----------------------------------------------------------------------------
+# Stages (run in the child process)
+# -----------------------------------------------------------------------------
+
+def _rss_bytes() -> int:
+    # current resident set size
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _peak_rss_bytes() -> int:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _client():
+    from fastapi.testclient import TestClient
+    from src.scripts.load_resource import app
+    return TestClient(app)
+
+
+def _stage_load_ply(scene: str) -> dict:
+    from src.scripts._read_config import config
+    from src.scripts._splat import resolve_workers
+    from src.scripts.load_resource import _load_ply
+    workers = resolve_workers(config.get('INGEST_WORKERS', 1))
+    t = time.perf_counter()
+    X = _load_ply(scene, ROT_X_180, workers, order=config.get('SPATIAL_ORDER', 'input'))
+    return {"wall_s": time.perf_counter() - t, "splats": int(X.shape[0]), "bytes": int(X.nbytes)}
+
+
+def _stage_pack_data(scene: str) -> dict:
+    from src.scripts._read_config import config
+    from src.scripts._splat import resolve_workers
+    from src.scripts.load_resource import _load_ply, _pack_data
+    workers = resolve_workers(config.get('INGEST_WORKERS', 1))
+    X = _load_ply(scene, ROT_X_180, workers)
+    t = time.perf_counter()
+    raw_data, vertex_count = _pack_data(X, config['PACKED_PIX_PER_SPLAT'], workers)
+    return {"wall_s": time.perf_counter() - t, "splats": int(vertex_count), "bytes": int(raw_data.nbytes)}
+
+
+def _stage_separate_trunk(scene: str) -> dict:
+    from src.scripts import separate_trunk
+    argv = sys.argv
+    sys.argv = ["separate_trunk.py", "--filename", scene, "--max_splats", str(CHUNK_MAX_SPLATS), "--force"]
+    try:
+        t = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            separate_trunk.main()
+        wall = time.perf_counter() - t
+    finally:
+        sys.argv = argv
+    chunks_dir = os.path.join("res", scene, "chunks")
+    with open(os.path.join(chunks_dir, "metadata.json")) as f:
+        metadata = json.load(f)
+    size = sum(os.path.getsize(os.path.join(chunks_dir, name)) for name in os.listdir(chunks_dir))
+    return {"wall_s": wall, "splats": int(metadata["total_vertex"]), "bytes": size,
+            "chunks": len(metadata["chunks"])}
+
+
+def _stage_ply(scene: str) -> dict:
+    clear_packed_cache(os.path.join("res", scene))
+    client = _client()
+    t = time.perf_counter()
+    cold = client.get("/ply", params={"filename": scene})
+    cold_s = time.perf_counter() - t
+    t = time.perf_counter()
+    warm = client.get("/ply", params={"filename": scene})
+    warm_s = time.perf_counter() - t
+    t = time.perf_counter()
+    gzip = client.get("/ply", params={"filename": scene}, headers={"Accept-Encoding": "gzip"})
+    gzip_s = time.perf_counter() - t
+    assert cold.status_code == warm.status_code == gzip.status_code == 200
+    return {
+        "wall_s": cold_s, "splats": int(cold.headers["n-vertex"]), "bytes": len(cold.content),
+        "warm_s": warm_s, "gzip_s": gzip_s, "gzip_bytes": int(gzip.headers.get("content-length", 0)),
+    }
+
+
+def _stage_load_chunk(scene: str) -> dict:
+    client = _client()
+    meta = client.get("/get_chunk_meta", params={"filename": scene})
+    if meta.status_code != 200:
+        raise RuntimeError(f"No chunks for {scene}; run the separate_trunk stage first")
+    ids = [chunk["id"] for chunk in meta.json()["chunks"]]
+    served = splats = 0
+    t = time.perf_counter()
+    for chunk_id in ids:
+        res = client.get("/load_chunk", params={"filename": scene, "chunk_id": chunk_id})
+        served += len(res.content)
+        splats += int(res.headers["n-vertex"])
+    wall = time.perf_counter() - t
+    return {"wall_s": wall, "splats": splats, "bytes": served, "requests": len(ids),
+            "per_request_ms": 1000 * wall / max(len(ids), 1)}
+
+
+def _stage_map(scene: str) -> dict:
+    clear_packed_cache(os.path.join("res", scene))
+    client = _client()
+    t = time.perf_counter()
+    cold = client.get("/map", params={"filename": scene})
+    cold_s = time.perf_counter() - t
+    t = time.perf_counter()
+    client.get("/map", params={"filename": scene})
+    return {"wall_s": cold_s, "bytes": len(cold.content), "warm_s": time.perf_counter() - t}
+
+
+# import-to-first-response of a fresh interpreter, as a uvicorn worker
+# spawn sees it; the request is sent to the ASGI app directly so no client
+# library is imported before the clock starts
+_COLD_START = r"""
+import sys, time, json, asyncio
+t0 = time.perf_counter()
+from src.scripts.load_resource import app
+t1 = time.perf_counter()
+
+async def get(path, query):
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": query.encode(), "headers": [], "client": ("127.0.0.1", 0),
+             "server": ("127.0.0.1", 8000)}
+    sent, requested = [], asyncio.Event()
+    async def receive():
+        if requested.is_set():
+            await asyncio.Event().wait()    # no disconnect while streaming
+        requested.set()
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        sent.append(message)
+    await app(scope, receive, send)
+    return sent[0]["status"], sum(len(m.get("body", b"")) for m in sent[1:])
+
+status, nbytes = asyncio.run(get("/map", "filename=" + sys.argv[1]))
+t2 = time.perf_counter()
+print(json.dumps({"import_s": t1 - t0, "first_response_s": t2 - t1, "status": status, "bytes": nbytes}))
+"""
+
+
+def _stage_cold_start(scene: str) -> dict:
+    t = time.perf_counter()
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [PROJECT_ROOT, os.environ.get("PYTHONPATH")]))}
+    out = subprocess.run([sys.executable, "-c", _COLD_START, scene], cwd=BENCH_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    process_s = time.perf_counter() - t
+    result = json.loads(out.strip().splitlines()[-1])
+    if result.pop("status") != 200:
+        raise RuntimeError(f"/map failed for {scene}")
+    return {"wall_s": result["import_s"] + result["first_response_s"], "process_s": process_s, **result}
+
+
+STAGE_FUNCS = {
+    "load_ply": _stage_load_ply,
+    "pack_data": _stage_pack_data,
+    "separate_trunk": _stage_separate_trunk,
+    "ply": _stage_ply,
+    "load_chunk": _stage_load_chunk,
+    "map": _stage_map,
+    "cold_start": _stage_cold_start,
+}
+
+
+def run_stage(stage: str, scene: str) -> dict:
+    """
+    Child-process entry point: one stage on one scene, with memory stats.
+    """
+    os.chdir(BENCH_DIR)
+    baseline = _rss_bytes()
+    result = STAGE_FUNCS[stage](scene)
+    return {**result, "peak_rss_bytes": _peak_rss_bytes(), "baseline_rss_bytes": baseline}
+
+# -----------------------------------------------------------------------------
+# Results
+# -----------------------------------------------------------------------------
+
+def _git(*args: str) -> str | None:
+    try:
+        return subprocess.run(["git", *args], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    from src.scripts._read_config import config
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "cpus": os.cpu_count(),
+        },
+        "config": {key: config.get(key) for key in (
+            "INGEST_BLOCK_SPLATS", "INGEST_WORKERS", "MEMORY_CACHE_BYTES", "PRECOMPRESS_ENCODINGS",
+            "PRECOMPRESS_SHUFFLED", "PACKED_LAYOUT", "SPATIAL_ORDER",
+        )},
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[dict]:
+    """
+    Per (scene, stage) wall-time and peak-RSS ratios current / baseline;
+    rows slower than `threshold` are flagged as regressions.
+    """
+    before = {(r["scene"], r["stage"]): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        old = before.get((r["scene"], r["stage"]))
+        if old is None or "error" in r or "error" in old:
+            continue
+        time_ratio = r["wall_s"] / old["wall_s"] if old["wall_s"] > 0 else float("inf")
+        rss_ratio = r["peak_rss_bytes"] / old["peak_rss_bytes"] if old["peak_rss_bytes"] else float("inf")
+        rows.append({
+            "scene": r["scene"], "stage": r["stage"],
+            "wall_s": (old["wall_s"], r["wall_s"]), "time_ratio": time_ratio,
+            "rss_ratio": rss_ratio, "regression": time_ratio > threshold,
+        })
+    return rows
+
+
+def print_results(results: list[dict], header: bool = True) -> None:
+    if header:
+        print(f"{'scene':<12} {'stage':<15} {'wall s':>9} {'peak RSS MB':>12} {'bytes':>14}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['scene']:<12} {r['stage']:<15} ERROR {r['error']}")
+            continue
+        print(f"{r['scene']:<12} {r['stage']:<15} {r['wall_s']:>9.3f} {r['peak_rss_bytes'] / 2**20:>12.1f} {r.get('bytes', 0):>14}")
+
+
+def print_comparison(rows: list[dict]) -> None:
+    print(f"{'scene':<12} {'stage':<15} {'before s':>9} {'after s':>9} {'time x':>7} {'RSS x':>7}")
+    for row in rows:
+        flag = "  <- regression" if row["regression"] else ""
+        print(f"{row['scene']:<12} {row['stage']:<15} {row['wall_s'][0]:>9.3f} {row['wall_s'][1]:>9.3f} "
+              f"{row['time_ratio']:>7.2f} {row['rss_ratio']:>7.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingest, packing, chunking and endpoints on synthetic scenes")
+    parser.add_argument("--sizes", default="100k,1m", help=f"Comma-separated scene sizes from {sorted(SIZES)}")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages, run in this order")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic scene seed")
+    parser.add_argument("--regenerate", action="store_true", help="Rewrite the synthetic scenes")
+    parser.add_argument("--output", default=None, help="Results JSON (default bench_results/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Time ratio above which a stage counts as a regression (exit status 1)")
+    args = parser.parse_args()
+
+    labels = [s for s in args.sizes.split(",") if s]
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = [s for s in labels if s not in SIZES] + [s for s in stages if s not in STAGE_FUNCS]
+    if unknown:
+        parser.error(f"Unknown sizes / stages: {', '.join(unknown)}")
+
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    print_results([])
+    for label in labels:
+        ensure_scene(label, args.seed, args.regenerate)
+        for stage in stages:
+            record = {"scene": scene_name(label), "size": label, "stage": stage}
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                try:
+                    record.update(pool.submit(run_stage, stage, scene_name(label)).result())
+                except Exception as e:
+                    record["error"] = f"{type(e).__name__}: {e}"
+            results.append(record)
+            print_results([record], header=False)
+
+    report = {"version": RESULTS_VERSION, **environment(), "results": results}
+    output = args.output or os.path.join(PROJECT_ROOT, "bench_results", f"{(report['commit'] or 'unknown')[:12]}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            rows = compare(json.load(f), report, args.threshold)
+        print_comparison(rows)
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    # Example usage: python src/scripts/benchmark.py --sizes 100k,1m
+    #            or: python src/scripts/benchmark.py --sizes 5m --stages ply,load_chunk --compare bench_results/<sha>.json
+    main()
@@ -1,7 +1,12 @@
+import os
+import sys
 import numpy as np
 import open3d as o3d
 from plyfile import PlyData, PlyElement
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.scripts._ply import read_ply_header, read_ply_vertices
+
 # ----------------------------
 # Parameters
 # ----------------------------
@@ -24,8 +29,8 @@ scene.add_triangles(mesh_t)
 # ----------------------------
 # Load GS PLY (ALL properties)
 # ----------------------------
-ply = PlyData.read(gs_ply_path)
-vertex = ply["vertex"]
+header = read_ply_header(gs_ply_path)
+vertex = read_ply_vertices(gs_ply_path)
 
 # Extract XYZ
 points = np.stack([vertex["x"], vertex["y"], vertex["z"]], axis=1)
@@ -42,17 +47,8 @@ print(f"Keeping {mask.sum()} / {len(mask)} Gaussians")
 # ----------------------------
 # Filter ALL vertex properties
 # ----------------------------
-filtered_vertex_data = {}
-for name in vertex.data.dtype.names:
-    filtered_vertex_data[name] = vertex[name][mask]
-
-# Rebuild structured array
-filtered_vertex = np.empty(
-    mask.sum(),
-    dtype=vertex.data.dtype
-)
-for name in filtered_vertex_data:
-    filtered_vertex[name] = filtered_vertex_data[name]
+# one gather over the structured records copies only the kept rows
+filtered_vertex = np.asarray(vertex[mask])
 
 # ----------------------------
 # Write filtered PLY
@@ -61,6 +57,6 @@ filtered_elem = PlyElement.describe(filtered_vertex, "vertex")
 
 PlyData(
     [filtered_elem],
-    text=ply.text,
-    byte_order=ply.byte_order
+    text=header.format == "ascii",
+    byte_order=header.byte_order
 ).write(out_path)
\ No newline at end of file
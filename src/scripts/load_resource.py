@@ -1,230 +1,112 @@
-from fastapi import FastAPI, Query
-from fastapi.responses import Response, JSONResponse
+from fastapi import BackgroundTasks, FastAPI, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import HTTPException
 
 import numpy as np
-import pandas as pd
-from scipy.special import expit
-from plyfile import PlyData
 import os
-import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+from src.scripts._ply import read_ply_vertices
+from src.scripts._http import frame_header, frame_padding, make_etag, negotiate_encoding, payload_response
+from src.scripts._encoding import available_encodings, encoded_path, shuffle_header
+from src.scripts._cache import (
+    ByteLRU, array_digest, block_bounds_path, source_fingerprint,
+    packed_cache_paths, packed_data_path, read_packed_cache, write_packed_cache,
+)
+from src.scripts._morton import BlockBoundsBuilder, check_order, morton_order, read_block_bounds
+from src.scripts._manifest import ChunkManifest, ManifestCache
+from src.scripts._visibility import parse_matrix, visible_order
+from src.scripts._prefetch import plan_prefetch
+from src.scripts._offload import OffloadPool, Saturated
+from src.scripts._prewarm import PrewarmStatus, discover_scenes
+from src.scripts._metrics import NULL_TIMER, StageTimer, request_registry
+from src.scripts._prune import prune_stats, prune_target, select_rows, vertex_importance
+from src.scripts._splat import (
+    process_vertices, transform_splats, pack_splats, pack_splats_compact, packing_pixels,
+    packed_positions, position_bounds, resolve_workers, vertex_positions,
+)
 
 # -----------------------------------------------------------------------------
 # FastAPI setup
 # -----------------------------------------------------------------------------
 
-app = FastAPI()
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    # caches are warmed in the background; /ready reports when they are
+    from src.scripts._read_config import config
+    task = None
+    if config.get('PREWARM', False):
+        _prewarm_status.begin()
+        task = asyncio.create_task(_prewarm(config))
+    yield
+    if task is not None:
+        task.cancel()
+
+
+app = FastAPI(lifespan=_lifespan)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["GET"],
     allow_headers=["*"],
-    expose_headers=["n-vertex", "n-channels", 'width', "dtype"],
+    expose_headers=["n-vertex", "n-channels", 'width', "dtype", "chunk-id",
+                    "accept-ranges", "content-range", "content-length", "etag",
+                    "content-encoding", "splat-layout", "n-chunks", "frame-encoding",
+                    "splat-packing", "splat-bounds", "n-blocks", "block-splats", "splat-variant",
+                    "server-timing"],
 )
 
 # -----------------------------------------------------------------------------
-# Half packing utilities (CASE 2: TRUE BIT PACKING)
+# PLY loading
 # -----------------------------------------------------------------------------
 
-def pack_half2(x: np.ndarray, y: np.ndarray) -> np.ndarray:
-    """
-    Pack two float32 arrays into one uint32 array as IEEE-754 half2.
-    """
-    hx = x.astype(np.float16).view(np.uint16).astype(np.uint32)
-    hy = y.astype(np.float16).view(np.uint16).astype(np.uint32)
-    return hx | (hy << 16)
-
-
-def pack_half1(x: np.ndarray) -> np.ndarray:
+def _source_rows(v: np.ndarray, rows: np.ndarray | None, order: str) -> np.ndarray | None:
     """
-    Pack one float32 array into lower 16 bits of uint32 (upper bits zero).
+    PLY rows to load, in output order: `rows` (ascending, e.g. kept by
+    pruning; None = all) permuted into Morton order of their untransformed
+    positions when order="morton". None means every row, as stored.
     """
-    return x.astype(np.float16).view(np.uint16).astype(np.uint32)
+    if check_order(order) != "morton":
+        return rows
+    positions = vertex_positions(v)
+    if rows is not None:
+        positions = positions[rows]
+    perm = morton_order(positions)
+    return perm if rows is None else rows[perm]
 
 
-# -----------------------------------------------------------------------------
-# PLY loading
-# -----------------------------------------------------------------------------
-
 def _load_ply(
     filename: str,
     transform: np.ndarray | None = None,
+    workers: int = 1,
+    order: str = "input",
+    rows: np.ndarray | None = None,
+    timer=NULL_TIMER,
 ) -> np.ndarray:
     path = os.path.abspath(f"res/{filename}/point_cloud.ply")
 
-    ply = PlyData.read(path)
-    v = ply["vertex"].data
-
-    # Build a DataFrame for convenient filtering + clipping
-    df = pd.DataFrame({
-        "x": v["x"], "y": v["y"], "z": v["z"],
-        "opacity": v["opacity"],
-        "scale_0": v["scale_0"], "scale_1": v["scale_1"],
-        "rot_0": v["rot_0"], "rot_1": v["rot_1"], "rot_2": v["rot_2"], "rot_3": v["rot_3"],
-        "refl_strength": v["refl_strength"], "roughness": v["roughness"], "metalness": v["metalness"],
-        "ori_color_0": v["ori_color_0"], "ori_color_1": v["ori_color_1"], "ori_color_2": v["ori_color_2"],
-        "f_dc_0": v["f_dc_0"], "f_dc_1": v["f_dc_1"], "f_dc_2": v["f_dc_2"],
-        "f_rest_0": v["f_rest_0"], "f_rest_1": v["f_rest_1"], "f_rest_2": v["f_rest_2"],
-        "f_rest_3": v["f_rest_3"], "f_rest_4": v["f_rest_4"], "f_rest_5": v["f_rest_5"],
-        "f_rest_6": v["f_rest_6"], "f_rest_7": v["f_rest_7"], "f_rest_8": v["f_rest_8"],
-    })
-
-    # drop rows with NaN scales
-    df = df.dropna() 
-    q = df[["rot_0", "rot_1", "rot_2", "rot_3"]].to_numpy()
-    norm = np.linalg.norm(q, axis=-1)
-    df = df[(norm > 1e-8) & (norm < 1e20)]
+    # memory-mapped structured view; columns are read without copying
+    v = read_ply_vertices(path)
+    with timer.stage("order"):
+        rows = _source_rows(v, rows, order)
 
-    # clip log-scale inputs to prevent overflow, then compute and clamp final scales
-    clipped_scl = df[["scale_0", "scale_1"]].clip(-20.0, 20.0)
-    df[["sx", "sy"]] = np.exp(clipped_scl.to_numpy())
-
-    # derived fields
-    color_keys_in = ["opacity", "refl_strength", "roughness", "metalness",
-                     "ori_color_0", "ori_color_1", "ori_color_2"]
-    color_key_out = ["opc", "refl", "rough", "metal", "ori_r", "ori_g", "ori_b"]
-    df[color_key_out] = expit(df[color_keys_in].to_numpy())
+    with timer.stage("read"):
+        if rows is not None:
+            v = v[rows]
+        # one validity mask (NaN, quaternion norm), applied once while filling
+        # the (N, RAW_FLOAT_PER_SPLAT) output; activations are computed in place
+        X = process_vertices(v)
 
     if transform is not None:
-        # working arrays for transform
-        pos = df[["x", "y", "z"]].to_numpy()
-        sx = df["sx"].to_numpy()
-        sy = df["sy"].to_numpy()
-        q = df[["rot_0", "rot_1", "rot_2", "rot_3"]].to_numpy()
-        qw, qx, qy, qz = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
-        sh1 = df[[
-            "f_rest_0", "f_rest_1", "f_rest_2",
-            "f_rest_3", "f_rest_4", "f_rest_5",
-            "f_rest_6", "f_rest_7", "f_rest_8",
-        ]].to_numpy()
-
-        t = np.asarray(transform, dtype=np.float32)
-        if t.shape != (4, 4):
-            raise ValueError("transform must be 4x4")
-        
-        # apply transformation to positions
-        pos = np.concatenate([pos, np.ones((pos.shape[0], 1), dtype=np.float32)], axis=1)
-        pos_transformed = pos @ t.T 
-
-        # apply transformation to scales
-
-        # apply rotation to SHH coefficients
-        l = t[:3, :3]
-        r0 = l[:, 0]
-        r0 = r0 / (np.linalg.norm(r0) + 1e-8)
-        r1 = l[:, 1] - r0 * np.dot(r0, l[:, 1])
-        r1 = r1 / (np.linalg.norm(r1) + 1e-8)
-        r2 = np.cross(r0, r1)
-        r2 = r2 / (np.linalg.norm(r2) + 1e-8)
-        rot_l = np.stack([r0, r1, r2], axis=1)
-
-        sh1_triplets = sh1.reshape(-1, 3, 3)
-        sh1 = (sh1_triplets @ rot_l.T).reshape(-1, 9)
-
-        # apply rotation to quaterions
-        norm = np.linalg.norm(q, axis=-1)
-        norm[norm == 0] = 1.0
-        w, xq, yq, zq = qw/norm, qx/norm, qy/norm, qz/norm
-
-        xx, yy, zz = xq*xq, yq*yq, zq*zq
-        xy, xz, yz = xq*yq, xq*zq, yq*zq
-        wx, wy, wz = w*xq, w*yq, w*zq
-
-        r00 = 1 - 2*(yy + zz)
-        r01 = 2*(xy - wz)
-        r10 = 2*(xy + wz)
-        r11 = 1 - 2*(xx + zz)
-        r20 = 2*(xz - wy)
-        r21 = 2*(yz + wx)
-
-        col0 = np.stack([r00 * sx, r10 * sx, r20 * sx], axis=1)
-        col1 = np.stack([r01 * sy, r11 * sy, r21 * sy], axis=1)
-
-        col0 = col0 @ l.T
-        col1 = col1 @ l.T
-
-        sx = np.linalg.norm(col0, axis=1)
-        sy = np.linalg.norm(col1, axis=1)
-        sx[sx == 0] = 1.0
-        sy[sy == 0] = 1.0
-
-        r0n = col0 / sx[:, None]
-        r1n = col1 / sy[:, None]
-        r2n = np.cross(r0n, r1n)
-        r2n_norm = np.linalg.norm(r2n, axis=1)
-        r2n_norm[r2n_norm == 0] = 1.0
-        r2n = r2n / r2n_norm[:, None]
-        r1n = np.cross(r2n, r0n)
-
-        r00n = r0n[:, 0]; r01n = r1n[:, 0]; r02n = r2n[:, 0]
-        r10n = r0n[:, 1]; r11n = r1n[:, 1]; r12n = r2n[:, 1]
-        r20n = r0n[:, 2]; r21n = r1n[:, 2]; r22n = r2n[:, 2]
-
-        trace = r00n + r11n + r22n
-        qw2 = np.zeros_like(trace)
-        qx2 = np.zeros_like(trace)
-        qy2 = np.zeros_like(trace)
-        qz2 = np.zeros_like(trace)
-
-        m0 = trace > 0
-        s0 = np.sqrt(trace[m0] + 1.0) * 2
-        qw2[m0] = 0.25 * s0
-        qx2[m0] = (r21n[m0] - r12n[m0]) / s0
-        qy2[m0] = (r02n[m0] - r20n[m0]) / s0
-        qz2[m0] = (r10n[m0] - r01n[m0]) / s0
-
-        m1 = (r00n > r11n) & (r00n > r22n) & (~m0)
-        s1 = np.sqrt(1.0 + r00n[m1] - r11n[m1] - r22n[m1]) * 2
-        qw2[m1] = (r21n[m1] - r12n[m1]) / s1
-        qx2[m1] = 0.25 * s1
-        qy2[m1] = (r01n[m1] + r10n[m1]) / s1
-        qz2[m1] = (r02n[m1] + r20n[m1]) / s1
-
-        m2 = (r11n > r22n) & (~m0) & (~m1)
-        s2 = np.sqrt(1.0 + r11n[m2] - r00n[m2] - r22n[m2]) * 2
-        qw2[m2] = (r02n[m2] - r20n[m2]) / s2
-        qx2[m2] = (r01n[m2] + r10n[m2]) / s2
-        qy2[m2] = 0.25 * s2
-        qz2[m2] = (r12n[m2] + r21n[m2]) / s2
-
-        m3 = (~m0) & (~m1) & (~m2)
-        s3 = np.sqrt(1.0 + r22n[m3] - r00n[m3] - r11n[m3]) * 2
-        qw2[m3] = (r10n[m3] - r01n[m3]) / s3
-        qx2[m3] = (r02n[m3] + r20n[m3]) / s3
-        qy2[m3] = (r12n[m3] + r21n[m3]) / s3
-        qz2[m3] = 0.25 * s3
-
-        # write transformed values back to df
-        df[["x", "y", "z"]] = pos_transformed[:, :3]
-        df["sx"] = sx
-        df["sy"] = sy
-        df["rot_0"] = qw2
-        df["rot_1"] = qx2
-        df["rot_2"] = qy2
-        df["rot_3"] = qz2
-        df[[
-            "f_rest_0", "f_rest_1", "f_rest_2",
-            "f_rest_3", "f_rest_4", "f_rest_5",
-            "f_rest_6", "f_rest_7", "f_rest_8",
-        ]] = sh1
-
-    # final filtering based on computed fields
-    #df = df[(df["sx"] > 1e-2) & (df["sy"] > 1e-2) & (df["opc"] > 1e-2)]
-
-    # return in the same layout expected downstream
-    out_cols = [
-        "x", "y", "z", "opc", "sx", "sy",
-        "rot_0", "rot_1", "rot_2", "rot_3",
-        "f_dc_0", "f_dc_1", "f_dc_2",
-        "f_rest_0", "f_rest_1", "f_rest_2",
-        "f_rest_3", "f_rest_4", "f_rest_5",
-        "f_rest_6", "f_rest_7", "f_rest_8",
-        "refl", "rough", "metal",
-        "ori_r", "ori_g", "ori_b",
-    ]
-    return df[out_cols].to_numpy(dtype=np.float32)
+        with timer.stage("transform"):
+            transform_splats(X, transform, workers=workers)
+
+    return X
 
 
 # -----------------------------------------------------------------------------
@@ -234,241 +116,1028 @@ def _load_ply(
 def _pack_data(
     X: np.ndarray,
     pixels_per_splat,
+    workers: int = 1,
+    bounds: tuple[np.ndarray, np.ndarray] | None = None,
 ) -> tuple[np.ndarray, int]:
     """
     Pack splat data into uint32 texture buffer.
-    Layout is identical to original code.
+    Layout is identical to original code (see _splat.pack_splats); with
+    `bounds` (lo, hi), the compact layout quantized to them instead.
     """
-    vcount = X.shape[0]
-    FLOATS_PER_PIX = 4
+    if bounds is not None:
+        return pack_splats_compact(X, *bounds, workers=workers)
+    return pack_splats(X, pixels_per_splat, workers)
 
-    raw_data = np.zeros(vcount * pixels_per_splat * FLOATS_PER_PIX, dtype=np.uint32)
-    tex_u32 = raw_data.reshape((vcount, pixels_per_splat * FLOATS_PER_PIX))
-    tex_f32 = raw_data.view(np.float32).reshape((vcount, pixels_per_splat * FLOATS_PER_PIX))
-    tex_u8 = raw_data.view(np.uint8).reshape((vcount, pixels_per_splat * FLOATS_PER_PIX * 4))
 
-    # -------------------------------------------------------------------------
-    # pos.xyz + opacity
-    # -------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+# Pruned variants
+# -----------------------------------------------------------------------------
 
-    tex_f32[:, 0:4] = X[:, 0:4]
+def _prune_spec(config, variant: str | None) -> dict | None:
+    """
+    PRUNE_VARIANTS entry of a /ply variant, with the scoring weight it is
+    built with (part of the cache inputs). None for the full scene.
+    """
+    if variant is None:
+        return None
+    spec = config.get('PRUNE_VARIANTS', {}).get(variant)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown variant: {variant}")
+    return {
+        "maxSplats": int(spec.get('maxSplats', 0)),
+        "maxBytes": int(spec.get('maxBytes', 0)),
+        "reflectanceWeight": float(config.get('PRUNE_REFLECTANCE_WEIGHT', 0.0)),
+    }
+
+
+def _prune_rows(filename: str, spec: dict, bytes_per_splat: int, timer=NULL_TIMER) -> tuple[np.ndarray, dict]:
+    """
+    Ascending PLY rows kept by a variant's budget, and the pruning stats.
+    """
+    with timer.stage("prune"):
+        v = read_ply_vertices(os.path.abspath(f"res/{filename}/point_cloud.ply"))
+        scores = vertex_importance(v, spec["reflectanceWeight"])
+        keep = prune_target(int(np.count_nonzero(np.isfinite(scores))), bytes_per_splat, spec["maxSplats"], spec["maxBytes"])
+        rows = select_rows(scores, keep)
+        return rows, prune_stats(scores, rows)
 
-    # -------------------------------------------------------------------------
-    # Rotation * Scale (RS) → half2
-    # -------------------------------------------------------------------------
 
-    sx = X[:, 4]
-    sy = X[:, 5]
-    q = X[:, 6:10]
-    qw, qx, qy, qz = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+# -----------------------------------------------------------------------------
+# Out-of-core ingest
+# -----------------------------------------------------------------------------
+
+def _iter_packed_blocks(
+    filename: str,
+    transform: np.ndarray | None,
+    pixels_per_splat: int,
+    block_rows: int,
+    workers: int = 1,
+    bounds: tuple[np.ndarray, np.ndarray] | None = None,
+    order: str = "input",
+    rows: np.ndarray | None = None,
+    timer=NULL_TIMER,
+):
+    """
+    Yield (raw_data, vertexCount) for consecutive row blocks of the PLY.
+    Every stage is row-independent, so concatenating the blocks gives the
+    same bytes as _pack_data(_load_ply(...)) on the whole scene.
+
+    With a row selection or order="morton" the blocks are consecutive runs
+    of the selected rows in output order, gathered from the mapped PLY;
+    only the (N, 3) positions and the row indices are held for the whole
+    scene.
+    """
+    path = os.path.abspath(f"res/{filename}/point_cloud.ply")
+    v = read_ply_vertices(path)
+    with timer.stage("order"):
+        rows = _source_rows(v, rows, order)
+
+    for start in range(0, v.shape[0] if rows is None else rows.shape[0], block_rows):
+        with timer.stage("read"):
+            block = v[start:start + block_rows] if rows is None else v[rows[start:start + block_rows]]
+            X = process_vertices(block)
+        if transform is not None:
+            with timer.stage("transform"):
+                transform_splats(X, transform, workers=workers)
+        with timer.stage("pack"):
+            packed = _pack_data(X, pixels_per_splat, workers, bounds)
+        yield packed
+
 
-    norm = np.linalg.norm(q, axis=-1)
-    norm[norm == 0] = 1.0
-    w, x, y, z = qw/norm, qx/norm, qy/norm, qz/norm
+def _load_map(
+    filename: str,
+    transform: np.ndarray | None = None,
+) -> np.ndarray:
+    path = os.path.abspath(f"res/{filename}/map1.npz")
+    map = np.load(path)['arr_0']
 
-    xx, yy, zz = x*x, y*y, z*z
-    xy, xz, yz = x*y, x*z, y*z
-    wx, wy, wz = w*x, w*y, w*z
+    assert map.dtype == np.float32
+    assert map.shape[1] == map.shape[2]
 
-    RS0 = (1 - 2*(yy + zz)) * sx
-    RS1 = (2*(xy - wz))     * sy
-    RS2 = (2*(xy + wz))     * sx
-    RS3 = (1 - 2*(xx + zz)) * sy
-    RS4 = (2*(xz - wy))     * sx
-    RS5 = (2*(yz + wx))     * sy
+    if map.shape[-1] == 3:
+        alpha = np.ones((*map.shape[:3], 1), dtype=np.float32)
+        map = np.concatenate([map, alpha], axis=-1)
 
-    tex_u32[:, 4] = pack_half2(RS0, RS1)
-    tex_u32[:, 5] = pack_half2(RS2, RS3)
-    tex_u32[:, 6] = pack_half2(RS4, RS5)
+    return map
 
-    # -------------------------------------------------------------------------
-    # Base color from SH0 → RGBA8
-    # -------------------------------------------------------------------------
 
-    C0 = 0.28209479177387814
-    base = 0.5 + C0 * X[:, 10:13]
-    base_u8 = np.clip(np.round(base * 255), 0, 255).astype(np.uint8)
+_manifests = ManifestCache("res")
 
-    off = 7 * 4
-    tex_u8[:, off + 0] = base_u8[:, 0]
-    tex_u8[:, off + 1] = base_u8[:, 1]
-    tex_u8[:, off + 2] = base_u8[:, 2]
-    tex_u8[:, off + 3] = 255
 
-    # -------------------------------------------------------------------------
-    # SH1 (9 floats → 5 half2)
-    # -------------------------------------------------------------------------
+def _chunk_manifest(filename: str) -> ChunkManifest:
+    try:
+        return _manifests.get(filename)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
-    sh1 = X[:, 13:22]
 
-    tex_u32[:,  8] = pack_half2(sh1[:, 0], sh1[:, 1])
-    tex_u32[:,  9] = pack_half2(sh1[:, 2], sh1[:, 3])
-    tex_u32[:, 10] = pack_half2(sh1[:, 4], sh1[:, 5])
-    tex_u32[:, 11] = pack_half2(sh1[:, 6], sh1[:, 7])
-    tex_u32[:, 12] = pack_half1(sh1[:, 8])
+async def _chunk_manifest_async(filename: str) -> ChunkManifest:
+    # a changed or not yet loaded metadata.json is parsed on the offload
+    # pool (the same job as the prewarm "chunks" step), not the event loop
+    try:
+        manifest = _manifests.current(filename)
+        if manifest is None:
+            manifest = await _offload(("manifest", filename), _manifests.get, filename)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return manifest
 
-    # -------------------------------------------------------------------------
-    # Origin color RGB8
-    # -------------------------------------------------------------------------
 
-    ori = X[:, 25:28]
-    ori_u8 = np.clip(np.round(ori * 255), 0, 255).astype(np.uint8)
+# -----------------------------------------------------------------------------
+# In-memory payload cache
+# -----------------------------------------------------------------------------
 
-    off = 13 * 4
-    tex_u8[:, off + 0] = ori_u8[:, 0]
-    tex_u8[:, off + 1] = ori_u8[:, 1]
-    tex_u8[:, off + 2] = ori_u8[:, 2]
-    tex_u8[:, off + 3] = 255
+_memory_cache: ByteLRU | None = None
 
-    # -------------------------------------------------------------------------
-    # PBR (refl, rough, metal)
-    # -------------------------------------------------------------------------
 
-    tex_u32[:, 14] = pack_half2(X[:, 22], X[:, 23])
-    tex_u32[:, 15] = pack_half1(X[:, 24])
+def _get_memory_cache() -> ByteLRU:
+    global _memory_cache
+    if _memory_cache is None:
+        from src.scripts._read_config import config
+        _memory_cache = ByteLRU(config.get('MEMORY_CACHE_BYTES', 0))
+    return _memory_cache
 
-    return raw_data, vcount
 
-def _load_map(
-    filename: str,
-    transform: np.ndarray | None = None,
-) -> np.ndarray:
-    path = os.path.abspath(f"res/{filename}/map1.npz")
-    map = np.load(path)['arr_0']
+# -----------------------------------------------------------------------------
+# Offload pool: blocking work of the async endpoints
+# -----------------------------------------------------------------------------
 
-    assert map.dtype == np.float32
-    assert map.shape[1] == map.shape[2]
+_offload_pool: OffloadPool | None = None
 
-    if map.shape[-1] == 3:
-        alpha = np.ones((*map.shape[:3], 1), dtype=np.float32)
-        map = np.concatenate([map, alpha], axis=-1)
 
-    return map
+def _get_offload_pool() -> OffloadPool:
+    global _offload_pool
+    if _offload_pool is None:
+        from src.scripts._read_config import config
+        _offload_pool = OffloadPool(
+            resolve_workers(config.get('OFFLOAD_WORKERS', 0)),
+            config.get('OFFLOAD_QUEUE', 16),
+            config.get('OFFLOAD_RETRY_AFTER_SEC', 2.0),
+        )
+    return _offload_pool
 
 
-def _load_chunks_metadata(filename: str) -> dict:
-    metadata_path = os.path.abspath(f"res/{filename}/chunks/metadata.json")
-    if not os.path.exists(metadata_path):
-        raise FileNotFoundError(f"Chunk metadata not found: {metadata_path}")
-    with open(metadata_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+async def _offload(key, fn, *args):
+    """
+    fn(*args) on the offload pool, coalesced with the in-flight job of the
+    same key; 503 + Retry-After when the pool is saturated.
+    """
+    try:
+        return await _get_offload_pool().run(key, fn, *args)
+    except Saturated as e:
+        raise HTTPException(status_code=503, detail="Server busy, retry later", headers={"Retry-After": e.header()})
+
+
+async def _offload_waiting(key, fn, *args):
+    """
+    _offload for work that cannot answer 503 (the startup prewarm, frames
+    of a response already started): a saturated pool is retried after its
+    Retry-After instead of failing.
+    """
+    pool = _get_offload_pool()
+    while True:
+        try:
+            return await pool.run(key, fn, *args)
+        except Saturated as e:
+            await asyncio.sleep(e.retry_after)
+
+
+def _timed_job(enabled: bool, fn, *args):
+    # the job's own timer: requests joining it only read it once it is done
+    timer = StageTimer() if enabled else NULL_TIMER
+    return fn(*args, timer=timer), timer
+
+
+async def _offload_timed(key, timer, fn, *args):
+    """
+    _offload of fn(*args, timer=...) timed into a job-local timer, whose
+    stages are merged into the request's `timer` when the job is done.
+    """
+    result, job_timer = await _offload(key, _timed_job, timer.enabled, fn, *args)
+    timer.merge(job_timer)
+    return result
+
+
+def _source_version(path: str) -> tuple[int, int]:
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"Resource not found: {os.path.basename(path)}")
+    source = source_fingerprint(path)
+    return source["mtime_ns"], source["size"]
+
+
+def _variant_size(meta: dict, layout: str, encoding: str) -> int:
+    if encoding == "identity":
+        return meta["nbytes"]
+    return meta["variants"][layout][encoding]
+
+
+def _precompress_encodings(config) -> list[str]:
+    return available_encodings(config.get('PRECOMPRESS_ENCODINGS', ['gzip']))
 
 
 # -----------------------------------------------------------------------------
-# API endpoint
+# Request metrics (Server-Timing, /metrics)
 # -----------------------------------------------------------------------------
 
-@app.get("/ply")
-def load_ply(filename: str = Query(...)):
-    USE_CACHE = True
+_metrics = request_registry()
 
-    from src.scripts._read_config import config
-    rot_x_180 = np.array([
-        [1.0, 0.0, 0.0, 0.0],
-        [0.0, -1.0, 0.0, 0.0],
-        [0.0, 0.0, -1.0, 0.0],
-        [0.0, 0.0, 0.0, 1.0],
-    ], dtype=np.float32)
+
+def _new_timer(config):
+    # NULL_TIMER records nothing; its stages cost one method call each
+    return StageTimer() if config.get('METRICS_ENABLED', False) else NULL_TIMER
+
+
+def _finish_timer(timer, endpoint: str, nbytes: int) -> dict:
+    """
+    Record a finished request into the registry and return its
+    Server-Timing header (empty when metrics are disabled).
+    """
+    if not timer.enabled:
+        return {}
+    _metrics.observe("splat_request_seconds", timer.total(), endpoint=endpoint)
+    for stage, seconds in timer.stages.items():
+        _metrics.observe("splat_stage_seconds", seconds, endpoint=endpoint, stage=stage)
+    _metrics.observe("splat_response_bytes", nbytes, endpoint=endpoint)
+    if timer.cache is not None:
+        _metrics.inc("splat_cache_requests_total", endpoint=endpoint, result=timer.cache)
+    return {"Server-Timing": timer.header()}
+
+
+def _packing_headers(packing: str, bounds=None) -> dict:
+    headers = {"splat-packing": packing}
+    if bounds is not None:
+        headers["splat-bounds"] = ",".join(repr(float(v)) for v in (*bounds[0], *bounds[1]))
+    return headers
+
+
+def _block_headers(blocks: dict | None) -> dict:
+    # advertises /block_bounds for this payload
+    if not blocks:
+        return {}
+    return {"n-blocks": str(blocks["count"]), "block-splats": str(blocks["splats"])}
+
+
+def _encoding_headers(encoding: str, shuffle_stride: int | None = None) -> dict:
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    if shuffle_stride is not None:
+        headers["splat-layout"] = shuffle_header(shuffle_stride)
+    return headers
+
+
+# -----------------------------------------------------------------------------
+# Packed /ply payloads
+# -----------------------------------------------------------------------------
+
+_ROT_X_180 = np.array([
+    [1.0, 0.0, 0.0, 0.0],
+    [0.0, -1.0, 0.0, 0.0],
+    [0.0, 0.0, -1.0, 0.0],
+    [0.0, 0.0, 0.0, 1.0],
+], dtype=np.float32)
+
+
+@dataclass
+class _PackedScene:
+    """
+    Everything the packed /ply bytes of a scene (variant) depend on; a
+    change in any of them invalidates both the in-memory entries and the
+    cache file.
+    """
+    filename: str
+    variant: str | None
+    packing: str
+    pixels_per_splat: int
+    order: str
+    block_splats: int
+    prune: dict | None
+    cache_dir: str
+    bin_path: str
+    meta_path: str
+    source: tuple[int, int]
+    transform_hash: str
+    encodings: list[str]
+    shuffled: bool
+
+    @property
+    def version(self) -> tuple:
+        return (*self.source, self.transform_hash)
+
+    @property
+    def stride(self) -> int:
+        return self.pixels_per_splat * 16
+
+    def identity(self, layout: str, encoding: str) -> tuple:
+        return (self.filename, "ply", self.pixels_per_splat, self.variant, layout, encoding)
+
+    def path(self, meta: dict, layout: str, encoding: str) -> str:
+        # files of the generation `meta` describes, stable across rebuilds
+        data_path = packed_data_path(self.bin_path, meta)
+        if encoding == "identity":
+            return data_path
+        return encoded_path(data_path, encoding, layout == "shuffled")
+
+
+def _packed_scene(config, filename: str, variant: str | None = None) -> _PackedScene:
+    packing = config.get('PACKED_LAYOUT', 'full')
+    pixels_per_splat = packing_pixels(packing, config['PACKED_PIX_PER_SPLAT'])
     cache_dir = os.path.abspath(f"res/{filename}")
-    cache_path = os.path.join(cache_dir, f"packed_{config['PACKED_PIX_PER_SPLAT']}.npz")
+    bin_path, meta_path = packed_cache_paths(cache_dir, pixels_per_splat, variant)
+    return _PackedScene(
+        filename=filename,
+        variant=variant,
+        packing=packing,
+        pixels_per_splat=pixels_per_splat,
+        order=check_order(config.get('SPATIAL_ORDER', 'input')),
+        block_splats=int(config.get('BLOCK_BOUNDS_SPLATS', 0)),
+        prune=_prune_spec(config, variant),
+        cache_dir=cache_dir,
+        bin_path=bin_path,
+        meta_path=meta_path,
+        source=_source_version(os.path.join(cache_dir, "point_cloud.ply")),
+        transform_hash=array_digest(_ROT_X_180),
+        encodings=_precompress_encodings(config),
+        shuffled=bool(config.get('PRECOMPRESS_SHUFFLED', False)),
+    )
+
 
-    if os.path.exists(cache_path) and USE_CACHE:
-        cached = np.load(cache_path)
-        raw_data = cached["raw_data"]
-        vertexCount = int(cached["vertexCount"])
+def _build_packed(config, scene: _PackedScene, timer=NULL_TIMER) -> tuple[dict, str]:
+    """
+    The scene's cache sidecar, building the cache first when it is missing
+    or stale, and whether it came from 'disk' or a 'build'. Runs once per
+    cache file however many requests wait for it (see _offload).
+    """
+    inputs = {"source": list(scene.source), "transform": scene.transform_hash, "packing": scene.packing,
+              "order": scene.order, "blockSplats": scene.block_splats, "prune": scene.prune}
+    expect = {**inputs, "encodings": scene.encodings, "shuffle": scene.shuffled}
+    with timer.stage("cache"):
+        meta = read_packed_cache(scene.bin_path, scene.meta_path, expect)
+    if meta is not None:
+        return meta, "disk"
+
+    filename, pixels_per_splat = scene.filename, scene.pixels_per_splat
+    block_rows = config.get('INGEST_BLOCK_SPLATS', 0)
+    workers = resolve_workers(config.get('INGEST_WORKERS', 1))
+    rows, extra = None, {}
+    if scene.prune is not None:
+        rows, extra["pruneStats"] = _prune_rows(filename, scene.prune, scene.stride, timer)
+    bounds = None
+    if scene.packing == "compact":
+        # quantization box, known before any block is packed
+        with timer.stage("bounds"):
+            bounds = position_bounds(read_ply_vertices(os.path.join(scene.cache_dir, "point_cloud.ply")), _ROT_X_180)
+    if block_rows:
+        # bounded-memory build: filter -> transform -> pack per row block
+        blocks = _iter_packed_blocks(
+            filename, _ROT_X_180, pixels_per_splat, block_rows, workers, bounds, scene.order, rows, timer,
+        )
     else:
         X = _load_ply(
             filename,
-            transform=rot_x_180,
+            transform=_ROT_X_180,
+            workers=workers,
+            order=scene.order,
+            rows=rows,
+            timer=timer,
         )
-        raw_data, vertexCount = _pack_data(X, config['PACKED_PIX_PER_SPLAT'])
-        np.savez(cache_path, raw_data=raw_data, vertexCount=np.int32(vertexCount))
+        with timer.stage("pack"):
+            blocks = [_pack_data(X, pixels_per_splat, workers, bounds)]
+    if bounds is not None:
+        extra["bounds"] = [b.tolist() for b in bounds]
+    boxes = None
+    if scene.block_splats:
+        # boxes of the transformed (as served) positions
+        boxes = BlockBoundsBuilder(scene.block_splats, lambda raw: packed_positions(raw, pixels_per_splat, bounds))
+    meta = write_packed_cache(
+        scene.bin_path, scene.meta_path, blocks, pixels_per_splat,
+        encodings=scene.encodings, shuffle=scene.shuffled, block_bounds=boxes, timer=timer, **inputs, **extra,
+    )
+    return meta, "build"
 
-    return Response(
-        raw_data.tobytes(),
-        media_type="application/octet-stream",
-        headers={
-            "n-vertex": str(vertexCount),
-            "n-channels": str(16),
-            "dtype": "float32"
-        })
 
+def _read_packed_body(scene: _PackedScene, meta: dict, layout: str, encoding: str, timer=NULL_TIMER) -> bytes:
+    # one payload variant from the cache files into the memory cache
+    with timer.stage("body"):
+        with open(scene.path(meta, layout, encoding), "rb") as f:
+            body = f.read()
+    _get_memory_cache().put(scene.identity(layout, encoding), scene.version, (body, meta), len(body))
+    return body
 
-@app.get("/map")
-def load_map(filename: str = Query(...)):
 
+# -----------------------------------------------------------------------------
+# API endpoint
+# -----------------------------------------------------------------------------
+
+@app.get("/ply")
+async def load_ply(
+    request: Request,
+    filename: str = Query(...),
+    shuffle: bool = Query(False),
+    variant: str | None = Query(None, description="pruned variant from PRUNE_VARIANTS, e.g. 'mobile'"),
+):
+    from src.scripts._read_config import config
+    timer = _new_timer(config)
+    scene = _packed_scene(config, filename, variant)
+    version = scene.version
+
+    # shuffled variants only exist compressed; a client that accepts none
+    # of the codings gets the plain layout
+    layout = "shuffled" if shuffle and scene.shuffled else "packed"
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), scene.encodings)
+    if encoding == "identity":
+        layout = "packed"
+    identity = scene.identity(layout, encoding)
+
+    memory_cache = _get_memory_cache()
+    hit = memory_cache.get(identity, version)
+    if hit is not None:
+        body, meta = hit
+        timer.cache_result("memory")
+    else:
+        with timer.stage("offload"):
+            meta, where = await _offload_timed(("ply", scene.bin_path, *version), timer, _build_packed, config, scene)
+        timer.cache_result(where)
+
+        body = None
+        if _variant_size(meta, layout, encoding) <= memory_cache.budget:
+            with timer.stage("offload"):
+                body = await _offload_timed((*identity, *version), timer, _read_packed_body, scene, meta, layout, encoding)
+
+    # bodies larger than the memory budget are streamed from the file;
+    # compressed bodies have no record boundaries to align slices to
+    size = _variant_size(meta, layout, encoding)
+    stride = scene.stride
+    return payload_response(
+        request,
+        size,
+        make_etag("ply", *identity, *version),
+        headers={
+            "n-vertex": str(meta["vertexCount"]),
+            "n-channels": str(scene.pixels_per_splat * 4),
+            "dtype": "float32",
+            **_packing_headers(scene.packing, meta.get("bounds")),
+            **_block_headers(meta.get("blocks")),
+            **({"splat-variant": variant} if variant else {}),
+            **_encoding_headers(encoding, stride if layout == "shuffled" else None),
+            **_finish_timer(timer, "ply", size),
+        },
+        body=body,
+        path=scene.path(meta, layout, encoding),
+        align=stride if encoding == "identity" else 1,
+        slice_bytes=config.get('STREAM_SLICE_BYTES', 1 << 22),
+    )
+
+
+@app.get("/ply_variants")
+def ply_variants(filename: str = Query(...)):
+    """
+    Pruned /ply variants of a scene (PRUNE_VARIANTS) with their budgets
+    and, once built, what pruning kept and dropped.
+    """
     from src.scripts._read_config import config
-    map = _load_map(
-        filename,
+    cache_dir = os.path.abspath(f"res/{filename}")
+    source = _source_version(os.path.join(cache_dir, "point_cloud.ply"))
+    pixels_per_splat = packing_pixels(config.get('PACKED_LAYOUT', 'full'), config['PACKED_PIX_PER_SPLAT'])
+
+    variants = {}
+    for name in config.get('PRUNE_VARIANTS', {}):
+        meta = read_packed_cache(*packed_cache_paths(cache_dir, pixels_per_splat, name), {"source": list(source)})
+        variants[name] = {
+            **_prune_spec(config, name),
+            "built": meta is not None,
+            **({"stats": meta["pruneStats"]} if meta is not None and "pruneStats" in meta else {}),
+        }
+    return JSONResponse({"variants": variants})
+
+
+# map1.npz as served: RGBA float32 texels (one 16-byte pixel each) in a
+# packed-style cache, res/<scene>/map1_rgba.json + map1_rgba.<G>.bin and
+# its precompressed variants, so /map never compresses per request
+
+def _map_cache_paths(filename: str) -> tuple[str, str]:
+    stem = os.path.abspath(f"res/{filename}/map1_rgba")
+    return stem + ".bin", stem + ".json"
+
+
+def _map_identity(filename: str, encoding: str) -> tuple:
+    return (filename, "map", "map1", encoding)
+
+
+def _build_map(filename: str, version, encodings: list[str], timer=NULL_TIMER) -> tuple[dict, str]:
+    """
+    Sidecar of the scene's map cache, building it first when it is missing
+    or stale, and whether it came from 'disk' or a 'build'.
+    """
+    bin_path, meta_path = _map_cache_paths(filename)
+    expect = {"source": list(version), "encodings": encodings}
+    with timer.stage("cache"):
+        meta = read_packed_cache(bin_path, meta_path, expect)
+    if meta is not None:
+        return meta, "disk"
+    with timer.stage("load"):
+        map = np.ascontiguousarray(_load_map(filename), dtype=np.float32)
+    texels = map.size // 4
+    meta = write_packed_cache(
+        bin_path, meta_path, [(map.reshape(-1).view(np.uint32), texels)], 1,
+        encodings=encodings, timer=timer, source=list(version), width=int(map.shape[1]),
     )
-    map = np.ascontiguousarray(map, dtype=np.float32)
+    return meta, "build"
 
-    return Response(
-        map.tobytes(),
-        media_type="application/octet-stream",
+
+def _map_path(filename: str, meta: dict, encoding: str) -> str:
+    data_path = packed_data_path(_map_cache_paths(filename)[0], meta)
+    return data_path if encoding == "identity" else encoded_path(data_path, encoding)
+
+
+def _read_map_body(filename: str, version, meta: dict, encoding: str, timer=NULL_TIMER) -> bytes:
+    # one stored map variant into the memory cache
+    with timer.stage("body"):
+        with open(_map_path(filename, meta, encoding), "rb") as f:
+            body = f.read()
+    _get_memory_cache().put(_map_identity(filename, encoding), version, (body, meta), len(body))
+    return body
+
+
+@app.get("/map")
+async def load_map(request: Request, filename: str = Query(...)):
+    from src.scripts._read_config import config
+    timer = _new_timer(config)
+    version = _source_version(os.path.abspath(f"res/{filename}/map1.npz"))
+    encodings = _precompress_encodings(config)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), encodings)
+    identity = _map_identity(filename, encoding)
+
+    memory_cache = _get_memory_cache()
+    hit = memory_cache.get(identity, version)
+    if hit is not None:
+        body, meta = hit
+        timer.cache_result("memory")
+    else:
+        with timer.stage("offload"):
+            meta, where = await _offload_timed(("map", filename, *version), timer, _build_map, filename, version, encodings)
+        timer.cache_result(where)
+
+        body = None
+        if _variant_size(meta, "packed", encoding) <= memory_cache.budget:
+            with timer.stage("offload"):
+                body = await _offload_timed((*identity, *version), timer, _read_map_body, filename, version, meta, encoding)
+
+    # slices end on whole texel rows of a cube face (RGBA float32); bodies
+    # over the memory budget are streamed from the stored file
+    size = _variant_size(meta, "packed", encoding)
+    width = meta["width"]
+    return payload_response(
+        request,
+        size,
+        make_etag(*identity, *version),
         headers={
-            "width": str(map.shape[1])
-        })
+            "width": str(width),
+            **_encoding_headers(encoding),
+            **_finish_timer(timer, "map", size),
+        },
+        body=body,
+        path=_map_path(filename, meta, encoding),
+        align=width * 16 if encoding == "identity" else 1,
+        slice_bytes=config.get('STREAM_SLICE_BYTES', 1 << 22),
+    )
 
 
-@app.get("/get_chunk_meta")
-def get_chunk_meta(
-    filename: str = Query(...),
-):
-    metadata = _load_chunks_metadata(filename)
-    chunks = metadata.get("chunks", [])
-
-    chunk_entries = []
-    for chunk in chunks:
-        entry = {
-            "id": chunk["id"],
-            "file": chunk["file"],
-            "bounds": chunk["bounds"],
-            "vertexCount": int(chunk["vertexCount"]),
-        }
+@app.get("/cache_stats")
+def cache_stats():
+    return JSONResponse(_get_memory_cache().stats())
 
-        chunk_entries.append(entry)
 
-    return JSONResponse({
-        "scene": filename,
-        "trunk_size": metadata.get("trunk_size"),
-        "total_vertex": metadata.get("total_vertex"),
-        "chunks": chunk_entries,
-    })
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus text exposition of the request histograms and cache
+    counters, plus the memory cache and offload pool state at scrape time
+    (sizes as gauges, counts since start as counters).
+    """
+    from src.scripts._read_config import config
+    if not config.get('METRICS_ENABLED', False):
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED)")
+    stats = _get_memory_cache().stats()
+    gauges = {
+        "splat_memory_cache_bytes": ("Bytes held by the in-memory payload cache", stats["bytes"]),
+        "splat_memory_cache_budget_bytes": ("MEMORY_CACHE_BYTES", stats["budget"]),
+        "splat_memory_cache_entries": ("Entries in the in-memory payload cache", stats["entries"]),
+    }
+    totals = {
+        "splat_memory_cache_hits_total": ("In-memory cache hits since start", stats["hits"]),
+        "splat_memory_cache_misses_total": ("In-memory cache misses since start", stats["misses"]),
+        "splat_memory_cache_evictions_total": ("In-memory cache evictions since start", stats["evictions"]),
+    }
+    if _offload_pool is not None:
+        pool = _offload_pool.stats()
+        gauges.update({
+            "splat_offload_pending": ("Offload jobs queued or running", pool["pending"]),
+            "splat_offload_limit": ("Offload jobs admitted before 503", pool["limit"]),
+        })
+        totals.update({
+            "splat_offload_joined_total": ("Requests that joined an in-flight job since start", pool["joined"]),
+            "splat_offload_rejected_total": ("Requests refused with 503 since start", pool["rejected"]),
+        })
+    return PlainTextResponse(_metrics.render(gauges, totals), media_type="text/plain; version=0.0.4")
 
 
-@app.get("/load_chunk")
-def load_chunk(
+@app.get("/get_chunk_meta")
+def get_chunk_meta(
     filename: str = Query(...),
-    chunk_id: str = Query(...),
 ):
-    metadata = _load_chunks_metadata(filename)
-    chunks = metadata.get("chunks", [])
+    # serialized once per metadata.json version
+    return Response(_chunk_manifest(filename).meta_body, media_type="application/json")
 
-    chunk_meta = next((chunk for chunk in chunks if chunk.get("id") == chunk_id), None)
+
+def _chunk_entry(manifest: ChunkManifest, chunk_id: str) -> tuple[dict, str | None]:
+    chunk_meta = manifest.entry(chunk_id)
     if chunk_meta is None:
         raise HTTPException(status_code=404, detail=f"Chunk not found: {chunk_id}")
 
-    chunk_file = chunk_meta.get("file")
-    chunk_path = os.path.abspath(f"res/{filename}/chunks/{chunk_file}")
+    if manifest.archive is not None:
+        # archived chunks are slices of the mapped data file; no path to check
+        if chunk_id not in manifest.archive:
+            raise HTTPException(status_code=404, detail=f"Chunk not in archive: {chunk_id}")
+        return chunk_meta, None
+
+    chunk_file = chunk_meta["file"]
+    chunk_path = manifest.chunk_path(chunk_meta)
 
     if not os.path.exists(chunk_path):
         raise HTTPException(status_code=404, detail=f"Chunk file not found: {chunk_file}")
+    return chunk_meta, chunk_path
 
-    npz = np.load(chunk_path)
-    raw_data = np.ascontiguousarray(npz["raw_data"])
-    vertex_count = int(chunk_meta.get("vertexCount", 0))
 
-    return Response(
-        raw_data.tobytes(),
-        media_type="application/octet-stream",
+def _chunk_stride(manifest: ChunkManifest, config) -> int:
+    # bytes per splat of the scene's chunk payloads
+    return packing_pixels(manifest.packing, config['PACKED_PIX_PER_SPLAT']) * 16
+
+
+def _chunk_body(
+    filename: str,
+    manifest: ChunkManifest,
+    chunk_id: str,
+    chunk_path: str | None,
+    layout: str = "packed",
+    encoding: str = "identity",
+    timer=NULL_TIMER,
+    load: bool = True,
+):
+    """
+    (identity, version, body) of one stored chunk payload: the raw words
+    (encoding "identity") or a variant separate_trunk.py precompressed.
+    Archived payloads are zero-copy memoryviews of the mappings, versioned
+    with the manifest; files are read once into the memory cache (with
+    `load` False, a payload not in memory yet has body None).
+    """
+    identity = (filename, "chunk", chunk_id, layout, encoding)
+    archive = manifest.payload_archive(layout, encoding)
+    if archive is not None:
+        timer.cache_result("archive")
+        return identity, manifest.version, archive.payload(chunk_id)
+
+    if encoding != "identity":
+        chunk_path = manifest.variant_path(manifest.entry(chunk_id), layout, encoding)
+    version = _source_version(chunk_path)
+    memory_cache = _get_memory_cache()
+    body = memory_cache.get(identity, version)
+    timer.cache_result("memory" if body is not None else "disk")
+    if body is None and load:
+        with timer.stage("body"):
+            if encoding == "identity":
+                with np.load(chunk_path) as npz:
+                    body = np.ascontiguousarray(npz["raw_data"]).tobytes()
+            else:
+                with open(chunk_path, "rb") as f:
+                    body = f.read()
+        memory_cache.put(identity, version, body, len(body))
+    return identity, version, body
+
+
+@app.get("/load_chunk")
+async def load_chunk(
+    request: Request,
+    filename: str = Query(...),
+    chunk_id: str = Query(...),
+    shuffle: bool = Query(False),
+):
+    from src.scripts._read_config import config
+    timer = _new_timer(config)
+    with timer.stage("manifest"):
+        manifest = await _chunk_manifest_async(filename)
+        chunk_meta, chunk_path = _chunk_entry(manifest, chunk_id)
+
+    # only the codings the build stored are offered; nothing is compressed here
+    stride = _chunk_stride(manifest, config)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), manifest.encodings)
+    layout = "shuffled" if shuffle and manifest.shuffled and encoding != "identity" else "packed"
+    identity, version, body = _chunk_body(
+        filename, manifest, chunk_id, chunk_path, layout, encoding, timer, load=False,
+    )
+    if body is None:
+        with timer.stage("offload"):
+            _, _, body = await _offload_timed(
+                (*identity, *version), timer, _chunk_body, filename, manifest, chunk_id, chunk_path, layout, encoding,
+            )
+    vertex_count = chunk_meta["vertexCount"]
+    shuffle_stride = stride if layout == "shuffled" else None
+
+    return payload_response(
+        request,
+        len(body),
+        make_etag(*identity, *version),
         headers={
             "n-vertex": str(vertex_count),
-            "n-channels": str(16),
+            "n-channels": str(stride // 4),
             "dtype": "float32",
             "chunk-id": str(chunk_id),
+            **_packing_headers(
+                manifest.packing,
+                (chunk_meta["bounds"]["min"], chunk_meta["bounds"]["max"]) if manifest.packing == "compact" else None,
+            ),
+            **_encoding_headers(encoding, shuffle_stride),
+            **_finish_timer(timer, "load_chunk", len(body)),
         },
+        body=body,
+        align=stride if encoding == "identity" else 1,
+        slice_bytes=config.get('STREAM_SLICE_BYTES', 1 << 22),
+    )
+
+
+@app.get("/load_chunks")
+async def load_chunks(
+    request: Request,
+    filename: str = Query(...),
+    chunk_ids: str = Query(..., description="comma-separated chunk ids"),
+    frame_encodings: str | None = Query(
+        None, description="comma-separated codings the client can decode per frame, e.g. 'gzip'",
+    ),
+):
+    """
+    Several chunks in one framed stream (see _http.frame_header), in the
+    order requested. Unknown ids fail the request up front; each frame is
+    sent as soon as its chunk is read, so the client can upload early
+    chunks while later ones are still loading.
+
+    Frames carry the chunk payloads as separate_trunk.py stored them, in
+    one coding negotiated from Accept-Encoding among the stored ones the
+    client lists in `frame_encodings` (the stream itself is not
+    content-coded, so the client decodes each frame on its own). The
+    choice is returned in the frame-encoding header.
+
+    Payloads not in memory are read on the offload pool like /load_chunk's.
+    The first read decides admission (503 + Retry-After before anything is
+    sent); once the stream has started, later reads wait for the pool.
+    """
+    manifest = await _chunk_manifest_async(filename)
+    ids = list(dict.fromkeys(i for i in chunk_ids.split(",") if i))
+    entries = [(chunk_id, *_chunk_entry(manifest, chunk_id)) for chunk_id in ids]
+    decodable = set(frame_encodings.split(",")) if frame_encodings else set()
+    encoding = negotiate_encoding(
+        request.headers.get("accept-encoding"), [enc for enc in manifest.encodings if enc in decodable],
+    )
+
+    async def read(chunk_id: str, chunk_path: str | None, offload) -> bytes:
+        identity, version, body = _chunk_body(
+            filename, manifest, chunk_id, chunk_path, "packed", encoding, load=False,
+        )
+        if body is None:
+            (_, _, body), _ = await offload(
+                (*identity, *version), _timed_job, False, _chunk_body, filename, manifest, chunk_id, chunk_path,
+                "packed", encoding,
+            )
+        return body
+
+    first = await read(entries[0][0], entries[0][2], _offload) if entries else None
+
+    async def frames():
+        for row, (chunk_id, chunk_meta, chunk_path) in enumerate(entries):
+            body = first if row == 0 else await read(chunk_id, chunk_path, _offload_waiting)
+            yield frame_header(chunk_id, chunk_meta["vertexCount"], len(body))
+            yield body
+            yield frame_padding(len(body))
+
+    return StreamingResponse(
+        frames(),
+        headers={"n-chunks": str(len(entries)), "frame-encoding": encoding, "Vary": "Accept-Encoding"},
+        media_type="application/octet-stream",
+    )
+
+
+def _parse_floats(value: str, name: str, count: int) -> list[float]:
+    try:
+        values = [float(x) for x in value.split(",")]
+    except ValueError:
+        values = []
+    if len(values) != count:
+        raise HTTPException(status_code=422, detail=f"{name} must be {count} comma-separated numbers")
+    return values
+
+
+@app.get("/visible_chunks")
+def visible_chunks(
+    filename: str = Query(...),
+    view_proj: str = Query(..., description="16 comma-separated numbers, column-major (three.js Matrix4.elements)"),
+    camera: str | None = Query(None, description="camera position x,y,z"),
+    order: str | None = Query(None, description="'distance' (default with camera) or 'area'"),
+    budget: int | None = Query(None, ge=1, description="maximum number of chunk ids"),
+):
+    """
+    Ids of the chunks whose bounds intersect the view frustum, highest
+    priority first, tested in one vectorized pass over the manifest bounds.
+    """
+    manifest = _chunk_manifest(filename)
+    matrix = parse_matrix(_parse_floats(view_proj, "view_proj", 16))
+    position = _parse_floats(camera, "camera", 3) if camera else None
+    order = order or ("distance" if position is not None else "area")
+    if order not in ("distance", "area") or (order == "distance" and position is None):
+        raise HTTPException(status_code=422, detail=f"Unsupported order: {order}")
+
+    rows = visible_order(manifest.bounds, matrix, position, order, budget)
+    return JSONResponse({
+        "ids": [manifest.ids[row] for row in rows],
+        "vertexCount": manifest.vertex_counts[rows].tolist(),
+    })
+
+
+def _warm_chunks(filename: str, manifest: ChunkManifest, ids: list[str]) -> None:
+    for chunk_id in ids:
+        if manifest.archive is not None:
+            manifest.archive.warm(chunk_id)
+            continue
+        entry = manifest.entry(chunk_id)
+        path = manifest.chunk_path(entry)
+        if os.path.exists(path):
+            _chunk_body(filename, manifest, chunk_id, path)
+
+
+@app.get("/prefetch_chunks")
+def prefetch_chunks(
+    background_tasks: BackgroundTasks,
+    filename: str = Query(...),
+    position: str = Query(..., description="camera position x,y,z"),
+    velocity: str = Query("0,0,0", description="camera velocity x,y,z per second"),
+    heading: str | None = Query(None, description="view direction x,y,z"),
+    horizon: float | None = Query(None, gt=0, description="seconds to extrapolate"),
+    budget: int | None = Query(None, ge=0, description="byte budget"),
+    warm: bool = Query(True, description="load the planned chunks into the memory cache"),
+):
+    """
+    Chunks along the extrapolated camera path, most urgent first, within a
+    byte budget. With `warm`, their payloads are read into the memory cache
+    after the response is sent (archived chunks are paged in instead), so
+    the /load_chunks that follows is served from memory.
+    """
+    from src.scripts._read_config import config
+    manifest = _chunk_manifest(filename)
+    chunk_bytes = manifest.vertex_counts * _chunk_stride(manifest, config)
+
+    rows = plan_prefetch(
+        manifest.bounds,
+        chunk_bytes,
+        _parse_floats(position, "position", 3),
+        _parse_floats(velocity, "velocity", 3),
+        _parse_floats(heading, "heading", 3) if heading else None,
+        horizon=horizon or config.get('PREFETCH_HORIZON_SEC', 2.0),
+        radius=config.get('PREFETCH_RADIUS', 4.0),
+        budget_bytes=config.get('PREFETCH_BUDGET_BYTES', 1 << 26) if budget is None else budget,
     )
+    ids = [manifest.ids[row] for row in rows]
+    if warm and ids:
+        background_tasks.add_task(_warm_chunks, filename, manifest, ids)
+
+    return JSONResponse({
+        "ids": ids,
+        "bytes": int(chunk_bytes[rows].sum()),
+    })
+
+
+@app.get("/block_bounds")
+def block_bounds(
+    filename: str = Query(...),
+    chunk_id: str | None = Query(None, description="a chunk of the scene instead of the /ply payload"),
+    variant: str | None = Query(None, description="pruned /ply variant"),
+):
+    """
+    (min, max) float32 boxes of consecutive runs of `block-splats` splats
+    of the /ply payload or of one chunk, in payload order, so a client can
+    cull whole blocks before testing splats. Recorded at build time: /ply
+    with BLOCK_BOUNDS_SPLATS, chunks with separate_trunk.py --block_splats.
+    """
+    from src.scripts._read_config import config
+    if chunk_id is not None:
+        manifest = _chunk_manifest(filename)
+        chunk_meta, _ = _chunk_entry(manifest, chunk_id)
+        if manifest.block_bounds is None or "blocks" not in chunk_meta:
+            raise HTTPException(status_code=404, detail=f"No block bounds recorded for {filename}")
+        start, count = chunk_meta["blocks"]
+        boxes = manifest.block_bounds[start:start + count]
+        block_splats = manifest.block_splats
+    else:
+        cache_dir = os.path.abspath(f"res/{filename}")
+        pixels_per_splat = packing_pixels(config.get('PACKED_LAYOUT', 'full'), config['PACKED_PIX_PER_SPLAT'])
+        _prune_spec(config, variant)
+        bin_path, meta_path = packed_cache_paths(cache_dir, pixels_per_splat, variant)
+        source = _source_version(os.path.join(cache_dir, "point_cloud.ply"))
+        meta = read_packed_cache(bin_path, meta_path, {"source": list(source)})
+        if meta is None or "blocks" not in meta:
+            raise HTTPException(status_code=404, detail=f"No block bounds recorded for {filename}; request /ply first")
+        boxes = read_block_bounds(block_bounds_path(packed_data_path(bin_path, meta)))
+        block_splats = meta["blocks"]["splats"]
+
+    return Response(
+        np.ascontiguousarray(boxes, dtype="<f4").tobytes(),
+        headers={"n-blocks": str(boxes.shape[0]), "block-splats": str(block_splats), "dtype": "float32"},
+        media_type="application/octet-stream",
+    )
+
+
+# -----------------------------------------------------------------------------
+# Startup prewarm and readiness
+# -----------------------------------------------------------------------------
+
+_prewarm_status = PrewarmStatus()
+
+
+async def _prewarm_step(config, name: str, step: str, pin: bool) -> dict:
+    memory_cache = _get_memory_cache()
+    if step == "ply":
+        info = {}
+        for variant in [None, *config.get('PRUNE_VARIANTS', {})]:
+            scene = _packed_scene(config, name, variant)
+            (meta, where), _ = await _offload_waiting(
+                ("ply", scene.bin_path, *scene.version), _timed_job, False, _build_packed, config, scene,
+            )
+            info[variant or "full"] = where
+            if pin and variant is None:
+                # the payload a browser negotiates: the preferred precompressed coding
+                encoding = scene.encodings[0] if scene.encodings else "identity"
+                identity = scene.identity("packed", encoding)
+                memory_cache.pin(identity)
+                await _offload_waiting(
+                    (*identity, *scene.version), _timed_job, False, _read_packed_body, scene, meta, "packed", encoding,
+                )
+        return info
+    if step == "chunks":
+        manifest = await _offload_waiting(("manifest", name), _manifests.get, name)
+        return {"chunks": len(manifest.ids)}
+    version = _source_version(os.path.abspath(f"res/{name}/map1.npz"))
+    encodings = _precompress_encodings(config)
+    (meta, where), _ = await _offload_waiting(("map", name, *version), _timed_job, False, _build_map, name, version, encodings)
+    if pin:
+        encoding = encodings[0] if encodings else "identity"
+        identity = _map_identity(name, encoding)
+        memory_cache.pin(identity)
+        await _offload_waiting((*identity, *version), _timed_job, False, _read_map_body, name, version, meta, encoding)
+    return {"map": where}
+
+
+async def _prewarm_scene(config, name: str, steps: list[str], pin: bool) -> None:
+    for step in steps:
+        _prewarm_status.start(name, step)
+        start = time.perf_counter()
+        try:
+            info = await _prewarm_step(config, name, step, pin)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else f"{type(e).__name__}: {e}"
+            _prewarm_status.fail(name, step, time.perf_counter() - start, str(detail))
+            continue
+        _prewarm_status.done(name, step, time.perf_counter() - start, **info)
+    _prewarm_status.finish_scene(name)
+
+
+async def _prewarm(config) -> None:
+    """
+    Validate or build the caches of every scene under res/ (PREWARM_SCENES,
+    if set), PREWARM_WORKERS scenes at a time, pinning PREWARM_PIN scenes
+    in the memory cache.
+    """
+    scenes = discover_scenes("res", config.get('PREWARM_SCENES') or None)
+    _prewarm_status.plan(scenes)
+    pinned = set(config.get('PREWARM_PIN', []))
+    semaphore = asyncio.Semaphore(max(1, int(config.get('PREWARM_WORKERS', 1))))
+
+    async def warm(name: str) -> None:
+        async with semaphore:
+            await _prewarm_scene(config, name, scenes[name], name in pinned)
+
+    try:
+        await asyncio.gather(*(warm(name) for name in scenes))
+    finally:
+        _prewarm_status.finish()
+
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness for the load balancer: 200 once the startup prewarm has
+    finished (failed scenes are listed, not waited for), 503 before.
+    """
+    report = _prewarm_status.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
 
 
 # -----------------------------------------------------------------------------
@@ -1,252 +1,337 @@
 
+import io
 import os
 import sys
+import hashlib
 import numpy as np
-import pandas as pd
-from plyfile import PlyData
-from scipy.special import expit
 import json
 import argparse
-
-# -----------------------------------------------------------------------------
-# Half packing utilities
-# -----------------------------------------------------------------------------
-
-def pack_half2(x: np.ndarray, y: np.ndarray) -> np.ndarray:
-    hx = x.astype(np.float16).view(np.uint16).astype(np.uint32)
-    hy = y.astype(np.float16).view(np.uint16).astype(np.uint32)
-    return hx | (hy << 16)
-
-def pack_half1(x: np.ndarray) -> np.ndarray:
-    return x.astype(np.float16).view(np.uint16).astype(np.uint32)
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.scripts._ply import read_ply_vertices
+from src.scripts._archive import ARCHIVE_DATA, archive_paths, archive_variant, update_archive
+from src.scripts._cache import array_digest, atomic_write_bytes, source_fingerprint
+from src.scripts._encoding import ENCODING_SUFFIX, available_encodings, encode_bytes, shuffle_bytes
+from src.scripts._manifest import chunk_variants, variant_file
+from src.scripts._morton import BLOCK_BOUNDS_FILE, SPATIAL_ORDERS, block_bounds, morton_order
+from src.scripts._partition import Cell, grid_partition, octree_partition
+from src.scripts._splat import (
+    process_vertices, transform_splats, pack_splats, pack_splats_compact, packing_pixels, resolve_workers,
+)
 
 # -----------------------------------------------------------------------------
 # PLY loading & processing
 # -----------------------------------------------------------------------------
 
-def load_ply_process(filename: str, transform: np.ndarray | None = None) -> pd.DataFrame:
+def load_ply_process(filename: str, transform: np.ndarray | None = None, workers: int = 1) -> np.ndarray:
     path = os.path.abspath(f"res/{filename}/point_cloud.ply")
     print(f"Loading {path}...")
-    ply = PlyData.read(path)
-    v = ply["vertex"].data
-
-    df = pd.DataFrame({
-        "x": v["x"], "y": v["y"], "z": v["z"],
-        "opacity": v["opacity"],
-        "scale_0": v["scale_0"], "scale_1": v["scale_1"],
-        "rot_0": v["rot_0"], "rot_1": v["rot_1"], "rot_2": v["rot_2"], "rot_3": v["rot_3"],
-        "refl_strength": v["refl_strength"], "roughness": v["roughness"], "metalness": v["metalness"],
-        "ori_color_0": v["ori_color_0"], "ori_color_1": v["ori_color_1"], "ori_color_2": v["ori_color_2"],
-        "f_dc_0": v["f_dc_0"], "f_dc_1": v["f_dc_1"], "f_dc_2": v["f_dc_2"],
-        "f_rest_0": v["f_rest_0"], "f_rest_1": v["f_rest_1"], "f_rest_2": v["f_rest_2"],
-        "f_rest_3": v["f_rest_3"], "f_rest_4": v["f_rest_4"], "f_rest_5": v["f_rest_5"],
-        "f_rest_6": v["f_rest_6"], "f_rest_7": v["f_rest_7"], "f_rest_8": v["f_rest_8"],
-    })
+    v = read_ply_vertices(path)
 
-    df = df.dropna()
-    q = df[["rot_0", "rot_1", "rot_2", "rot_3"]].to_numpy()
-    norm = np.linalg.norm(q, axis=-1)
-    df = df[(norm > 1e-8) & (norm < 1e20)]
+    X = process_vertices(v)
+    if transform is not None:
+        transform_splats(X, transform, workers=workers)
 
-    clipped_scl = df[["scale_0", "scale_1"]].clip(-20.0, 20.0)
-    df[["sx", "sy"]] = np.exp(clipped_scl.to_numpy())
+    return X
 
-    color_keys_in = ["opacity", "refl_strength", "roughness", "metalness",
-                     "ori_color_0", "ori_color_1", "ori_color_2"]
-    color_key_out = ["opc", "refl", "rough", "metal", "ori_r", "ori_g", "ori_b"]
-    df[color_key_out] = expit(df[color_keys_in].to_numpy())
+# -----------------------------------------------------------------------------
+# Packer
+# -----------------------------------------------------------------------------
 
-    if transform is not None:
-        pos = df[["x", "y", "z"]].to_numpy()
-        sx = df["sx"].to_numpy()
-        sy = df["sy"].to_numpy()
-        q = df[["rot_0", "rot_1", "rot_2", "rot_3"]].to_numpy()
-        qw, qx, qy, qz = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
-        sh1 = df[[
-            "f_rest_0", "f_rest_1", "f_rest_2",
-            "f_rest_3", "f_rest_4", "f_rest_5",
-            "f_rest_6", "f_rest_7", "f_rest_8",
-        ]].to_numpy()
-
-        t = np.asarray(transform, dtype=np.float32)
-        pos = np.concatenate([pos, np.ones((pos.shape[0], 1), dtype=np.float32)], axis=1)
-        pos_transformed = pos @ t.T
-
-        l = t[:3, :3]
-        r0 = l[:, 0]; r0 = r0 / (np.linalg.norm(r0) + 1e-8)
-        r1 = l[:, 1] - r0 * np.dot(r0, l[:, 1]); r1 = r1 / (np.linalg.norm(r1) + 1e-8)
-        r2 = np.cross(r0, r1); r2 = r2 / (np.linalg.norm(r2) + 1e-8)
-        rot_l = np.stack([r0, r1, r2], axis=1)
-
-        sh1_triplets = sh1.reshape(-1, 3, 3)
-        sh1 = (sh1_triplets @ rot_l.T).reshape(-1, 9)
-
-        norm = np.linalg.norm(q, axis=-1)
-        norm[norm == 0] = 1.0
-        w, xq, yq, zq = qw/norm, qx/norm, qy/norm, qz/norm
-
-        xx, yy, zz = xq*xq, yq*yq, zq*zq
-        xy, xz, yz = xq*yq, xq*zq, yq*zq
-        wx, wy, wz = w*xq, w*yq, w*zq
-
-        r00 = 1 - 2*(yy + zz); r01 = 2*(xy - wz); r10 = 2*(xy + wz)
-        r11 = 1 - 2*(xx + zz); r20 = 2*(xz - wy); r21 = 2*(yz + wx)
-
-        col0 = np.stack([r00 * sx, r10 * sx, r20 * sx], axis=1)
-        col1 = np.stack([r01 * sy, r11 * sy, r21 * sy], axis=1)
-        col0 = col0 @ l.T
-        col1 = col1 @ l.T
-
-        sx = np.linalg.norm(col0, axis=1)
-        sy = np.linalg.norm(col1, axis=1)
-        sx[sx == 0] = 1.0
-        sy[sy == 0] = 1.0
-
-        r0n = col0 / sx[:, None]
-        r1n = col1 / sy[:, None]
-        r2n = np.cross(r0n, r1n)
-        r2n_norm = np.linalg.norm(r2n, axis=1)
-        r2n_norm[r2n_norm == 0] = 1.0
-        r2n = r2n / r2n_norm[:, None]
-        r1n = np.cross(r2n, r0n)
-
-        r00n = r0n[:, 0]; r01n = r1n[:, 0]; r02n = r2n[:, 0]
-        r10n = r0n[:, 1]; r11n = r1n[:, 1]; r12n = r2n[:, 1]
-        r20n = r0n[:, 2]; r21n = r1n[:, 2]; r22n = r2n[:, 2]
-
-        trace = r00n + r11n + r22n
-        qw2 = np.zeros_like(trace)
-        qx2 = np.zeros_like(trace)
-        qy2 = np.zeros_like(trace)
-        qz2 = np.zeros_like(trace)
-
-        m0 = trace > 0
-        s0 = np.sqrt(trace[m0] + 1.0) * 2
-        qw2[m0] = 0.25 * s0
-        qx2[m0] = (r21n[m0] - r12n[m0]) / s0
-        qy2[m0] = (r02n[m0] - r20n[m0]) / s0
-        qz2[m0] = (r10n[m0] - r01n[m0]) / s0
-
-        m1 = (r00n > r11n) & (r00n > r22n) & (~m0)
-        s1 = np.sqrt(1.0 + r00n[m1] - r11n[m1] - r22n[m1]) * 2
-        qw2[m1] = (r21n[m1] - r12n[m1]) / s1
-        qx2[m1] = 0.25 * s1
-        qy2[m1] = (r01n[m1] + r10n[m1]) / s1
-        qz2[m1] = (r02n[m1] + r20n[m1]) / s1
-
-        m2 = (r11n > r22n) & (~m0) & (~m1)
-        s2 = np.sqrt(1.0 + r11n[m2] - r00n[m2] - r22n[m2]) * 2
-        qw2[m2] = (r02n[m2] - r20n[m2]) / s2
-        qx2[m2] = (r01n[m2] + r10n[m2]) / s2
-        qy2[m2] = 0.25 * s2
-        qz2[m2] = (r12n[m2] + r21n[m2]) / s2
-
-        m3 = (~m0) & (~m1) & (~m2)
-        s3 = np.sqrt(1.0 + r22n[m3] - r00n[m3] - r11n[m3]) * 2
-        qw2[m3] = (r10n[m3] - r01n[m3]) / s3
-        qx2[m3] = (r02n[m3] + r20n[m3]) / s3
-        qy2[m3] = (r12n[m3] + r21n[m3]) / s3
-        qz2[m3] = 0.25 * s3
-
-        df[["x", "y", "z"]] = pos_transformed[:, :3]
-        df["sx"] = sx
-        df["sy"] = sy
-        df["rot_0"] = qw2
-        df["rot_1"] = qx2
-        df["rot_2"] = qy2
-        df["rot_3"] = qz2
-        df[[
-            "f_rest_0", "f_rest_1", "f_rest_2",
-            "f_rest_3", "f_rest_4", "f_rest_5",
-            "f_rest_6", "f_rest_7", "f_rest_8",
-        ]] = sh1
-
-    return df
+def pack_data(X: np.ndarray, pixels_per_splat: int, workers: int = 1) -> tuple[np.ndarray, int]:
+    return pack_splats(X, pixels_per_splat, workers)
+
+
+def cell_packer(X: np.ndarray, cells: list[Cell], packing: str, pixels_per_splat: int):
+    """
+    pack(i): the payload words of cell i, packed from its own rows (compact
+    rows quantized to the cell bounds, so a chunk decodes with the bounds
+    listed in metadata.json). Builds call it only for chunks they write.
+    """
+    def pack(i: int) -> np.ndarray:
+        cell = cells[i]
+        if packing == "compact":
+            words, _ = pack_splats_compact(X[cell.rows], cell.lo, cell.hi)
+        else:
+            words, _ = pack_data(X[cell.rows], pixels_per_splat)
+        return words
+    return pack
+
+
+def cell_block_bounds(X: np.ndarray, cells: list[Cell], block_splats: int) -> list[np.ndarray]:
+    """
+    Per cell, the (min, max) boxes of consecutive runs of block_splats rows
+    in chunk payload order.
+    """
+    return [block_bounds(X[cell.rows, :3], block_splats) for cell in cells]
 
 # -----------------------------------------------------------------------------
-# Packer
+# Chunk writing
+# -----------------------------------------------------------------------------
+
+def _npz_bytes(**arrays) -> bytes:
+    """
+    np.savez output, built in memory so the file gets one write (np.savez
+    on a path issues many small writes and seeks).
+    """
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+
+def _encode_chunk(chunk: np.ndarray, layout: str, encoding: str, stride: int) -> bytes:
+    # one stored /load_chunk variant: the payload compressed on its own
+    data = shuffle_bytes(chunk, stride) if layout == "shuffled" else chunk
+    return encode_bytes(data, encoding)
+
+
+def cell_digest(X: np.ndarray, cell: Cell, params: bytes = b"") -> str:
+    # the build parameters, the cell bounds and its source rows (transformed
+    # and ordered, not yet packed), so unchanged cells are never packed
+    bounds = np.stack([cell.lo, cell.hi]).astype(np.float32)
+    return hashlib.sha1(params + bounds.tobytes() + X[cell.rows].tobytes()).hexdigest()
+
+
+def _rows_as_payload(X: np.ndarray, cells: list[Cell]):
+    # pack() for rows that already are payload words
+    return lambda i: X[cells[i].rows]
+
+
+def _chunk_entry(cell: Cell, chunk_filename: str) -> dict:
+    entry = {
+        "id": cell.id,
+        "file": chunk_filename,
+        "bounds": {
+            "min": [float(v) for v in cell.lo],
+            "max": [float(v) for v in cell.hi]
+        },
+        "vertexCount": int(cell.rows.size)
+    }
+    if cell.parent is not None:
+        entry["depth"] = cell.depth
+        entry["parent"] = cell.parent
+    return entry
+
+
+def write_chunks(
+    X: np.ndarray,
+    cells: list[Cell],
+    output_dir: str,
+    pixels_per_splat: int,
+    workers: int = 1,
+    params: bytes = b"",
+    previous: dict | None = None,
+    variants=(),
+    pack=None,
+) -> tuple[list[dict], dict[str, str], int]:
+    """
+    Write one .npz per cell of the scene rows `X`, plus one file per
+    (layout, encoding) of `variants` (see _manifest.chunk_variants) holding
+    the payload precompressed, so /load_chunk never compresses. `pack(i)`
+    gives the payload words of cell i (see cell_packer; by default the rows
+    of X already are payload words).
+
+    Each chunk is keyed by cell_digest, a hash of the build parameters and
+    its source rows. Chunks whose hash matches `previous` (id -> hash from
+    the last build) and whose files still exist are neither packed nor
+    written. The rest are packed and written from a thread pool (packing,
+    the writes and the compression release the GIL, so this runs in
+    parallel). Returns the metadata entries, the new id -> hash map and the
+    number of chunks written.
+    """
+    pack = pack or _rows_as_payload(X, cells)
+    previous = previous or {}
+    stride = pixels_per_splat * 16
+
+    def write(i: int) -> tuple[dict, str, bool]:
+        cell = cells[i]
+        chunk_filename = f"{cell.id}.npz"
+        save_path = os.path.join(output_dir, chunk_filename)
+        variant_paths = {v: os.path.join(output_dir, variant_file(cell.id, *v)) for v in variants}
+        digest = cell_digest(X, cell, params)
+        changed = previous.get(cell.id) != digest or not all(
+            os.path.exists(path) for path in (save_path, *variant_paths.values())
+        )
+        if changed:
+            chunk = pack(i).reshape(-1)
+            # renamed into place, so a server reading the old file never
+            # sees a truncated zip
+            atomic_write_bytes(save_path, _npz_bytes(raw_data=chunk, vertexCount=int(cell.rows.size)))
+            for (layout, encoding), path in variant_paths.items():
+                atomic_write_bytes(path, _encode_chunk(chunk, layout, encoding, stride))
+        return _chunk_entry(cell, chunk_filename), digest, changed
+
+    if workers <= 1:
+        results = [write(i) for i in range(len(cells))]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(write, range(len(cells))))
+
+    chunks_meta = [entry for entry, _, _ in results]
+    hashes = {entry["id"]: digest for entry, digest, _ in results}
+    return chunks_meta, hashes, sum(changed for _, _, changed in results)
+
+
+def write_chunk_archive(
+    X: np.ndarray,
+    cells: list[Cell],
+    output_dir: str,
+    pixels_per_splat: int,
+    params: bytes = b"",
+    variants=(),
+    workers: int = 1,
+    rewrite: bool = False,
+    pack=None,
+) -> tuple[list[dict], dict[str, str], int]:
+    """
+    Write all cells into the single-file archive (see _archive.py), hashed
+    and packed like write_chunks, and every (layout, encoding) of `variants`
+    into its own variant archive of precompressed payloads. The hashes are
+    kept in the archive indexes, so only changed or new chunks are packed,
+    compressed and appended; unchanged payloads are not rewritten (all are
+    with `rewrite`). Returns the metadata entries, the id -> hash map and
+    the number of chunks written.
+    """
+    pack = pack or _rows_as_payload(X, cells)
+    stride = pixels_per_splat * 16
+    # chunks packed for the main archive, kept for the variant archives
+    packed = {}
+
+    def chunk(i: int) -> np.ndarray:
+        words = packed.get(i)
+        if words is None:
+            words = pack(i).reshape(-1)
+            if variants:
+                packed[i] = words
+        return words
+
+    hashes = {cell.id: cell_digest(X, cell, params) for cell in cells}
+    bounds = [np.stack([cell.lo, cell.hi]) for cell in cells]
+    chunks = [(cell.id, lambda i=i: chunk(i), cell.rows.size, bounds[i]) for i, cell in enumerate(cells)]
+    written = update_archive(output_dir, chunks, hashes.values(), workers=workers, rewrite=rewrite)
+    for layout, encoding in variants:
+        encoded = [
+            (cell.id, lambda i=i: _encode_chunk(chunk(i), layout, encoding, stride), cell.rows.size, bounds[i])
+            for i, cell in enumerate(cells)
+        ]
+        update_archive(
+            output_dir, encoded, hashes.values(), archive_variant(encoding, layout == "shuffled"), workers, rewrite,
+        )
+
+    chunks_meta = [_chunk_entry(cell, ARCHIVE_DATA) for cell in cells]
+    return chunks_meta, hashes, written
+
+
+def remove_orphans(output_dir: str, keep: set[str]) -> int:
+    """
+    Delete chunk files, stored variants and archives left over from
+    earlier builds.
+    """
+    variant_suffixes = tuple(ENCODING_SUFFIX.values())
+    removed = 0
+    for name in os.listdir(output_dir):
+        chunk_file = (
+            name.endswith((".npz", *variant_suffixes))
+            or (name.startswith("chunks.") and name.endswith((".bin", ".idx")))
+            or name == BLOCK_BOUNDS_FILE
+        )
+        if chunk_file and name not in keep:
+            os.remove(os.path.join(output_dir, name))
+            removed += 1
+    return removed
+
+# -----------------------------------------------------------------------------
+# Build manifest
 # -----------------------------------------------------------------------------
+#   res/<scene>/chunks/build_manifest.json
+#     {"version", "source": {mtime_ns, size}, "params": {...}, "chunks": {id: hash}}
+# A changed PLY is still parsed, transformed, ordered and partitioned as a
+# whole (any row may have moved to another cell); chunk hashes (cell_digest)
+# are taken on the source rows of each cell, so only changed chunks are
+# packed, compressed and written.
+
+BUILD_MANIFEST_VERSION = 3
+
+
+def read_build_manifest(path: str) -> dict | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != BUILD_MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def is_up_to_date(manifest: dict | None, output_dir: str, source: dict, params: dict) -> bool:
+    """
+    True when the last build used the same PLY and parameters and all of
+    its outputs are still there, so the PLY does not need to be parsed.
+    """
+    if manifest is None or manifest.get("source") != source or manifest.get("params") != params:
+        return False
+    if not os.path.exists(os.path.join(output_dir, "metadata.json")):
+        return False
+    if params.get("block_splats") and not os.path.exists(os.path.join(output_dir, BLOCK_BOUNDS_FILE)):
+        return False
+    return all(os.path.exists(path) for path in _output_files(output_dir, params, manifest["chunks"]))
+
+
+def _output_files(output_dir: str, params: dict, chunk_ids) -> list[str]:
+    # the chunk files (or archives) and stored variants a build produces
+    variants = chunk_variants(params.get("encodings", []), params.get("shuffled", False))
+    if params.get("layout") == "archive":
+        paths = list(archive_paths(output_dir))
+        for layout, encoding in variants:
+            paths += archive_paths(output_dir, archive_variant(encoding, layout == "shuffled"))
+        return paths
+    return [
+        os.path.join(output_dir, name)
+        for chunk_id in chunk_ids
+        for name in (f"{chunk_id}.npz", *(variant_file(chunk_id, *v) for v in variants))
+    ]
 
-def pack_data(df: pd.DataFrame, pixels_per_splat: int) -> tuple[np.ndarray, int]:
-    X = df[[
-        "x", "y", "z", "opc", "sx", "sy",
-        "rot_0", "rot_1", "rot_2", "rot_3",
-        "f_dc_0", "f_dc_1", "f_dc_2",
-        "f_rest_0", "f_rest_1", "f_rest_2",
-        "f_rest_3", "f_rest_4", "f_rest_5",
-        "f_rest_6", "f_rest_7", "f_rest_8",
-        "refl", "rough", "metal",
-        "ori_r", "ori_g", "ori_b",
-    ]].to_numpy(dtype=np.float32)
-
-    vcount = X.shape[0]
-    FLOATS_PER_PIX = 4
-    raw_data = np.zeros(vcount * pixels_per_splat * FLOATS_PER_PIX, dtype=np.uint32)
-    tex_u32 = raw_data.reshape((vcount, pixels_per_splat * FLOATS_PER_PIX))
-    tex_f32 = raw_data.view(np.float32).reshape((vcount, pixels_per_splat * FLOATS_PER_PIX))
-    tex_u8 = raw_data.view(np.uint8).reshape((vcount, pixels_per_splat * FLOATS_PER_PIX * 4))
-
-    # pos + opacity
-    tex_f32[:, 0:4] = X[:, 0:4]
-
-    # scale + rot -> packing
-    sx = X[:, 4]; sy = X[:, 5]
-    q = X[:, 6:10]
-    qw, qx, qy, qz = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
-    norm = np.linalg.norm(q, axis=-1); norm[norm == 0] = 1.0
-    w, x, y, z = qw/norm, qx/norm, qy/norm, qz/norm
-    xx, yy, zz = x*x, y*y, z*z
-    xy, xz, yz = x*y, x*z, y*z
-    wx, wy, wz = w*x, w*y, w*z
-    RS0 = (1 - 2*(yy + zz)) * sx
-    RS1 = (2*(xy - wz)) * sy
-    RS2 = (2*(xy + wz)) * sx
-    RS3 = (1 - 2*(xx + zz)) * sy
-    RS4 = (2*(xz - wy)) * sx
-    RS5 = (2*(yz + wx)) * sy
-    tex_u32[:, 4] = pack_half2(RS0, RS1)
-    tex_u32[:, 5] = pack_half2(RS2, RS3)
-    tex_u32[:, 6] = pack_half2(RS4, RS5)
-
-    # Base color SH0
-    C0 = 0.28209479177387814
-    base = 0.5 + C0 * X[:, 10:13]
-    base_u8 = np.clip(np.round(base * 255), 0, 255).astype(np.uint8)
-    off = 7 * 4
-    tex_u8[:, off + 0] = base_u8[:, 0]
-    tex_u8[:, off + 1] = base_u8[:, 1]
-    tex_u8[:, off + 2] = base_u8[:, 2]
-    tex_u8[:, off + 3] = 255
-
-    # SH1
-    sh1 = X[:, 13:22]
-    tex_u32[:,  8] = pack_half2(sh1[:, 0], sh1[:, 1])
-    tex_u32[:,  9] = pack_half2(sh1[:, 2], sh1[:, 3])
-    tex_u32[:, 10] = pack_half2(sh1[:, 4], sh1[:, 5])
-    tex_u32[:, 11] = pack_half2(sh1[:, 6], sh1[:, 7])
-    tex_u32[:, 12] = pack_half1(sh1[:, 8])
-
-    # Ori color
-    ori = X[:, 25:28]
-    ori_u8 = np.clip(np.round(ori * 255), 0, 255).astype(np.uint8)
-    off = 13 * 4
-    tex_u8[:, off + 0] = ori_u8[:, 0]
-    tex_u8[:, off + 1] = ori_u8[:, 1]
-    tex_u8[:, off + 2] = ori_u8[:, 2]
-    tex_u8[:, off + 3] = 255
-
-    # PBR
-    tex_u32[:, 14] = pack_half2(X[:, 22], X[:, 23])
-    tex_u32[:, 15] = pack_half1(X[:, 24])
-
-    return raw_data, vcount
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--filename", type=str, required=True, help="Name of the scene (folder in res/)")
     parser.add_argument("--trunk_size", type=float, default=2.0, help="Size of each trunk cube")
+    parser.add_argument("--max_splats", type=int, default=0,
+                        help="Octree mode: split cells until each holds at most this many splats (0 = uniform grid)")
+    parser.add_argument("--min_splats", type=int, default=None,
+                        help="Octree mode: merge sibling cells smaller than this (default max_splats / 8)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Threads for transform, packing and chunk writing (0 = one per CPU core)")
+    parser.add_argument("--layout", choices=["archive", "files"], default="archive",
+                        help="One chunks.bin + chunks.idx archive, or one .npz file per chunk")
+    parser.add_argument("--packing", choices=["full", "compact"], default="full",
+                        help="Splat layout of the chunk payloads (compact: 32 bytes per splat, quantized to chunk bounds)")
+    parser.add_argument("--order", choices=SPATIAL_ORDERS, default="input",
+                        help="Splat order before partitioning (input: as in the PLY; morton: Z-order, so every chunk is spatially coherent)")
+    parser.add_argument("--block_splats", type=int, default=1024,
+                        help="Record a bounding box per run of this many splats of each chunk (0 = none)")
+    parser.add_argument("--encodings", type=str, default=None,
+                        help="Comma-separated content codings stored per chunk (default PRECOMPRESS_ENCODINGS; '' = none)")
+    parser.add_argument("--shuffled", action=argparse.BooleanOptionalAction, default=None,
+                        help="Also store byte-shuffled variants (default PRECOMPRESS_SHUFFLED)")
+    parser.add_argument("--force", action="store_true",
+                        help="Rewrite every chunk, ignoring the build manifest (by default a changed PLY is still "
+                             "parsed and partitioned in full, but only chunks whose rows changed are packed and written)")
     args = parser.parse_args()
 
+    from src.scripts._read_config import config
+    # unavailable codings (no brotli / zstandard package) are skipped, as
+    # the server does
+    encodings = available_encodings(
+        args.encodings.split(",") if args.encodings is not None else config.get('PRECOMPRESS_ENCODINGS', ['gzip'])
+    )
+    shuffled = bool(encodings) and (
+        args.shuffled if args.shuffled is not None else bool(config.get('PRECOMPRESS_SHUFFLED', False))
+    )
+    variants = chunk_variants(encodings, shuffled)
+
     filename = args.filename
     trunk_size = args.trunk_size
 
@@ -257,64 +342,121 @@ def main():
         [0.0, 0.0, 0.0, 1.0],
     ], dtype=np.float32)
 
-    df = load_ply_process(filename, transform=rot_x_180)
-    
-    # Determine bounds
-    min_x, max_x = df["x"].min(), df["x"].max()
-    min_y, max_y = df["y"].min(), df["y"].max()
-    min_z, max_z = df["z"].min(), df["z"].max()
+    # the same pixels per splat as /ply, so the two can never disagree
+    PACKED_PIX_PER_SPLAT = packing_pixels(args.packing, config['PACKED_PIX_PER_SPLAT'])
 
-    print(f"Scene bounds: ({min_x:.2f}, {min_y:.2f}, {min_z:.2f}) -> ({max_x:.2f}, {max_y:.2f}, {max_z:.2f})")
+    output_dir = f"res/{filename}/chunks"
+    os.makedirs(output_dir, exist_ok=True)
 
-    # Align strict grid
-    start_x = np.floor(min_x / trunk_size) * trunk_size
-    start_y = np.floor(min_y / trunk_size) * trunk_size
-    start_z = np.floor(min_z / trunk_size) * trunk_size
+    # everything a chunk file depends on besides its own rows
+    if args.max_splats > 0:
+        params = {"partition": "octree", "max_splats": args.max_splats, "min_splats": args.min_splats}
+    else:
+        params = {"partition": "grid", "trunk_size": trunk_size}
+    params.update({
+        "pixelsPerSplat": PACKED_PIX_PER_SPLAT,
+        "transform": array_digest(rot_x_180),
+        "layout": args.layout,
+        "packing": args.packing,
+        "order": args.order,
+        "block_splats": args.block_splats,
+        "encodings": encodings,
+        "shuffled": shuffled,
+    })
 
-    # Assign each point to a chunk index
-    df["cx"] = np.floor((df["x"] - start_x) / trunk_size).astype(int)
-    df["cy"] = np.floor((df["y"] - start_y) / trunk_size).astype(int)
-    df["cz"] = np.floor((df["z"] - start_z) / trunk_size).astype(int)
+    build_path = os.path.join(output_dir, "build_manifest.json")
+    source = source_fingerprint(os.path.abspath(f"res/{filename}/point_cloud.ply"))
+    previous = None if args.force else read_build_manifest(build_path)
+    if is_up_to_date(previous, output_dir, source, params):
+        print(f"Chunks are up to date ({len(previous['chunks'])} chunks in {output_dir})")
+        return
 
-    output_dir = f"res/{filename}/chunks"
-    os.makedirs(output_dir, exist_ok=True)
+    workers = resolve_workers(args.workers)
+    X = load_ply_process(filename, transform=rot_x_180, workers=workers)
 
-    grouped = df.groupby(["cx", "cy", "cz"])
-    chunks_meta = []
-
-    PACKED_PIX_PER_SPLAT = 4 # Default from config
-
-    for (cx, cy, cz), chunk_df in grouped:
-        if len(chunk_df) == 0:
-            continue
-        
-        chunk_min_x = start_x + cx * trunk_size
-        chunk_min_y = start_y + cy * trunk_size
-        chunk_min_z = start_z + cz * trunk_size
-        
-        # Pack
-        raw_data, vcount = pack_data(chunk_df, PACKED_PIX_PER_SPLAT)
-        
-        chunk_filename = f"{cx}_{cy}_{cz}.npz"
-        save_path = os.path.join(output_dir, chunk_filename)
-        np.savez(save_path, raw_data=raw_data, vertexCount=vcount)
-        
-        chunks_meta.append({
-            "id": f"{cx}_{cy}_{cz}",
-            "file": chunk_filename,
-            "bounds": {
-                "min": [chunk_min_x, chunk_min_y, chunk_min_z],
-                "max": [chunk_min_x + trunk_size, chunk_min_y + trunk_size, chunk_min_z + trunk_size]
-            },
-            "vertexCount": int(vcount)
-        })
+    # Determine bounds
+    min_x, min_y, min_z = (float(v) for v in X[:, :3].min(axis=0))
+    max_x, max_y, max_z = (float(v) for v in X[:, :3].max(axis=0))
+
+    print(f"Scene bounds: ({min_x:.2f}, {min_y:.2f}, {min_z:.2f}) -> ({max_x:.2f}, {max_y:.2f}, {max_z:.2f})")
+
+    if args.order == "morton":
+        # partitioning is stable, so every cell keeps its rows in Z-order
+        X = X[morton_order(X[:, :3])]
+
+    if args.max_splats > 0:
+        cells, nodes = octree_partition(X[:, :3], args.max_splats, args.min_splats)
+        # trunk_size is the edge of the root cube in octree mode
+        root = next((node for node in nodes if node["id"] == "r"), None)
+        extra = {
+            "partition": "octree",
+            "max_splats": args.max_splats,
+            "nodes": nodes,
+        }
+        if root is not None:
+            trunk_size = root["bounds"]["max"][0] - root["bounds"]["min"][0]
+    else:
+        cells = grid_partition(X[:, :3], trunk_size)
+        extra = {"partition": "grid"}
+
+    # chunks are hashed on their source rows; only changed ones are packed
+    total_vertex = int(len(X))
+    boxes = cell_block_bounds(X, cells, args.block_splats) if args.block_splats > 0 else None
+    pack = cell_packer(X, cells, args.packing, PACKED_PIX_PER_SPLAT)
+    params_key = json.dumps(params, sort_keys=True).encode("utf-8")
+    previous_chunks = (previous or {}).get("chunks")
+    if args.layout == "archive":
+        chunks_meta, hashes, written = write_chunk_archive(
+            X, cells, output_dir, PACKED_PIX_PER_SPLAT, params=params_key, variants=variants, workers=workers,
+            rewrite=args.force, pack=pack,
+        )
+    else:
+        chunks_meta, hashes, written = write_chunks(
+            X, cells, output_dir, PACKED_PIX_PER_SPLAT, workers, params=params_key, previous=previous_chunks,
+            variants=variants, pack=pack,
+        )
+    del X, pack
+    keep = {os.path.basename(path) for path in _output_files(output_dir, params, hashes)}
+    if boxes is not None:
+        first = 0
+        for entry, cell_boxes in zip(chunks_meta, boxes):
+            entry["blocks"] = [first, int(cell_boxes.shape[0])]
+            first += cell_boxes.shape[0]
+        all_boxes = np.concatenate(boxes) if boxes else np.zeros((0, 2, 3), dtype=np.float32)
+        atomic_write_bytes(os.path.join(output_dir, BLOCK_BOUNDS_FILE), all_boxes.astype("<f4").tobytes())
+        keep.add(BLOCK_BOUNDS_FILE)
 
     # Save metadata
-    with open(os.path.join(output_dir, "metadata.json"), "w") as f:
-        json.dump({"chunks": chunks_meta, "trunk_size": trunk_size, "total_vertex": int(len(df))}, f, indent=2)
+    # compact dumps() goes through the C encoder; indent=2 fell back to the
+    # pure-Python one and took seconds on scenes with tens of thousands of chunks
+    metadata = {
+        "chunks": chunks_meta,
+        "trunk_size": trunk_size,
+        "total_vertex": total_vertex,
+        "layout": args.layout,
+        "packing": args.packing,
+        "order": args.order,
+        "encodings": encodings,
+        "shuffled": shuffled,
+        **({"block_splats": args.block_splats} if boxes is not None else {}),
+        **extra,
+    }
+    atomic_write_bytes(os.path.join(output_dir, "metadata.json"), json.dumps(metadata).encode("utf-8"))
+    atomic_write_bytes(build_path, json.dumps({
+        "version": BUILD_MANIFEST_VERSION,
+        "source": source,
+        "params": params,
+        "chunks": hashes,
+    }).encode("utf-8"))
+    # only once metadata.json names the new files: a server holding the old
+    # manifest reloads it on its next request instead of reading deleted ones
+    removed = remove_orphans(output_dir, keep)
 
     print(f"Segmented into {len(chunks_meta)} chunks. Saved to {output_dir}")
+    print(f"  {written} written, {len(chunks_meta) - written} unchanged, {removed} orphaned files removed")
 
 if __name__ == "__main__":
     # Example usage: python src/scripts/separate_trunk.py --filename classroom --trunk_size 32.0
+    #            or: python src/scripts/separate_trunk.py --filename classroom --trunk_size 32.0 --layout files
+    #            or: python src/scripts/separate_trunk.py --filename classroom --max_splats 65536
     main()
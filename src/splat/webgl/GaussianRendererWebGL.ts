@@ -1,5 +1,6 @@
 import * as THREE from 'three'
 import { GaussianSplatManager } from './GaussianSplatManager'
+import { CompactBounds } from './GaussianSplatWebGL'
 import { DeferredWebGL } from './DeferredWebGL'
 import { CONFIG } from "../../config.js"
 
@@ -16,12 +17,16 @@ export class GaussianRendererWebGL {
     return this.manager.mesh
   }
 
-  setBuffer(buffer: ArrayBuffer, vertexCount: number) {
-    this.manager.setBuffer(buffer, vertexCount)
+  setBuffer(buffer: ArrayBuffer, vertexCount: number, compact: CompactBounds | null = null) {
+    this.manager.setBuffer(buffer, vertexCount, compact)
   }
 
-  addSplatBuffer(buffer: ArrayBuffer, vertexCount: number) {
-    return this.manager.addSplatBuffer(buffer, vertexCount)
+  addSplatBuffer(buffer: ArrayBuffer, vertexCount: number, compact: CompactBounds | null = null) {
+    return this.manager.addSplatBuffer(buffer, vertexCount, compact)
+  }
+
+  setBlockBounds(bounds: ArrayBuffer, blockSplats: number) {
+    this.manager.setBlockBounds(bounds, blockSplats)
   }
 
   initChunkStreaming(sceneName: string, serverBaseUrl?: string) {
@@ -1,5 +1,5 @@
 import * as THREE from 'three'
-import { GaussianSplatWebGL } from './GaussianSplatWebGL'
+import { CompactBounds, GaussianSplatWebGL } from './GaussianSplatWebGL'
 import { CONFIG } from '../../config'
 
 export type GBufferEntry = {
@@ -17,6 +17,9 @@ type ChunkData = {
   file: string
   bounds: ChunkBounds
   vertexCount: number
+  // octree builds only
+  depth?: number
+  parent?: string
 }
 
 type ChunkMetaResponse = {
@@ -24,6 +27,18 @@ type ChunkMetaResponse = {
   trunk_size: number
   total_vertex: number
   chunks: ChunkData[]
+  // 'compact' payloads are quantized to their chunk bounds
+  packing?: 'full' | 'compact'
+}
+
+type VisibleChunksResponse = {
+  ids: string[]
+  vertexCount: number[]
+}
+
+type PrefetchChunksResponse = {
+  ids: string[]
+  bytes: number
 }
 
 type RuntimeChunk = ChunkData & {
@@ -31,10 +46,26 @@ type RuntimeChunk = ChunkData & {
   center: THREE.Vector3
 }
 
+// /load_chunks frame header: id byte length, vertex count, data byte length
+// (uint32 little endian), followed by the id and the data, each padded to
+// 4 bytes
+const CHUNK_FRAME_HEADER_BYTES = 12
+
+// frame codings this browser can undo itself (DecompressionStream has no br
+// or zstd); the server sends the frames precompressed in one of them
+const CHUNK_FRAME_ENCODINGS = typeof DecompressionStream === 'undefined' ? [] : ['gzip']
+
+async function decodeChunkFrame(data: Uint8Array, encoding: string): Promise<ArrayBuffer> {
+  if (encoding === 'identity') return data.slice().buffer
+  const stream = new Blob([data]).stream().pipeThrough(new DecompressionStream(encoding as CompressionFormat))
+  return new Response(stream).arrayBuffer()
+}
+
 export class GaussianSplatManager {
   splats: GaussianSplatWebGL[] = []
   group: THREE.Group = new THREE.Group()
   runtimeChunks: RuntimeChunk[] = []
+  runtimeChunkById: Map<string, RuntimeChunk> = new Map<string, RuntimeChunk>()
   loadedChunkIds: Set<string> = new Set<string>()
   loadingChunkIds: Set<string> = new Set<string>()
   chunkStreamingEnabled = false
@@ -44,8 +75,12 @@ export class GaussianSplatManager {
   maxChunksPerSweep = 4
   chunkServerBaseUrl = 'http://localhost:8000'
   chunkSceneName = ''
+  chunkPacking: 'full' | 'compact' = 'full'
   frustum = new THREE.Frustum()
   frustumMatrix = new THREE.Matrix4()
+  lastCameraPosition = new THREE.Vector3()
+  lastCameraTime = 0
+  cameraVelocity = new THREE.Vector3()
 
   get mesh(): THREE.Group {
     return this.group
@@ -58,18 +93,22 @@ export class GaussianSplatManager {
     return splat
   }
 
-  addSplatBuffer(buffer: ArrayBuffer, vertexCount: number): GaussianSplatWebGL {
+  addSplatBuffer(buffer: ArrayBuffer, vertexCount: number, compact: CompactBounds | null = null): GaussianSplatWebGL {
     const splat = this.addSplat(vertexCount)
-    splat.setBuffer(buffer, vertexCount)
+    splat.setBuffer(buffer, vertexCount, compact)
     return splat
   }
 
-  setBuffer(buffer: ArrayBuffer, vertexCount: number) {
+  setBuffer(buffer: ArrayBuffer, vertexCount: number, compact: CompactBounds | null = null) {
     if (this.splats.length === 0) {
-      this.addSplatBuffer(buffer, vertexCount)
+      this.addSplatBuffer(buffer, vertexCount, compact)
       return
     }
-    this.splats[0].setBuffer(buffer, vertexCount)
+    this.splats[0].setBuffer(buffer, vertexCount, compact)
+  }
+
+  setBlockBounds(bounds: ArrayBuffer, blockSplats: number) {
+    this.splats[0]?.setBlockBounds(bounds, blockSplats)
   }
 
   toRuntimeChunk(chunk: ChunkData): RuntimeChunk {
@@ -93,6 +132,78 @@ export class GaussianSplatManager {
       .slice(0, Math.max(1, CONFIG.MAX_VISIBLE_TRUNKS))
   }
 
+  addChunkBuffer(chunk: RuntimeChunk, buffer: ArrayBuffer, headerVertexCount: number) {
+    const vertexCount = Number.isFinite(headerVertexCount) && headerVertexCount > 0
+      ? Math.floor(headerVertexCount)
+      : chunk.vertexCount
+
+    const compact = this.chunkPacking === 'compact' ? chunk.bounds : null
+    const splat = this.addSplatBuffer(buffer, vertexCount, compact)
+    if (splat?.mesh) {
+      splat.mesh.userData.trunkCenter = chunk.center.clone()
+    }
+
+    this.loadedChunkIds.add(chunk.id)
+  }
+
+  async queryVisibleChunks(camera: THREE.PerspectiveCamera): Promise<RuntimeChunk[]> {
+    this.frustumMatrix.multiplyMatrices(camera.projectionMatrix, camera.matrixWorldInverse)
+    const params = new URLSearchParams({
+      filename: this.chunkSceneName,
+      view_proj: this.frustumMatrix.elements.join(','),
+      camera: camera.position.toArray().join(','),
+      budget: String(Math.max(1, CONFIG.MAX_VISIBLE_TRUNKS)),
+    })
+
+    const visibleRes = await fetch(`${this.chunkServerBaseUrl}/visible_chunks?${params.toString()}`)
+    if (!visibleRes.ok) throw new Error(`Failed to query visible chunks for ${this.chunkSceneName}`)
+
+    const payload = (await visibleRes.json()) as VisibleChunksResponse
+    return payload.ids
+      .map((id) => this.runtimeChunkById.get(id))
+      .filter((chunk): chunk is RuntimeChunk => chunk !== undefined)
+  }
+
+  async collectCoveredChunks(camera: THREE.PerspectiveCamera): Promise<RuntimeChunk[]> {
+    if (CONFIG.USE_SERVER_CHUNK_VISIBILITY) {
+      try {
+        const visible = await this.queryVisibleChunks(camera)
+        if (visible.length > 0) return visible
+      } catch (err) {
+        console.warn('Server visibility query failed, testing chunks locally', err)
+      }
+    }
+    // also the fallback when nothing is in view: nearest chunks first
+    return this.collectCameraCoveredChunks(camera)
+  }
+
+  updateCameraVelocity(camera: THREE.PerspectiveCamera) {
+    const now = performance.now()
+    const dt = (now - this.lastCameraTime) / 1000
+    if (this.lastCameraTime > 0 && dt > 0) {
+      this.cameraVelocity.subVectors(camera.position, this.lastCameraPosition).divideScalar(dt)
+    }
+    this.lastCameraPosition.copy(camera.position)
+    this.lastCameraTime = now
+  }
+
+  async queryPrefetchChunks(camera: THREE.PerspectiveCamera): Promise<RuntimeChunk[]> {
+    const params = new URLSearchParams({
+      filename: this.chunkSceneName,
+      position: camera.position.toArray().join(','),
+      velocity: this.cameraVelocity.toArray().join(','),
+      heading: camera.getWorldDirection(new THREE.Vector3()).toArray().join(','),
+    })
+
+    const prefetchRes = await fetch(`${this.chunkServerBaseUrl}/prefetch_chunks?${params.toString()}`)
+    if (!prefetchRes.ok) throw new Error(`Failed to plan chunk prefetch for ${this.chunkSceneName}`)
+
+    const payload = (await prefetchRes.json()) as PrefetchChunksResponse
+    return payload.ids
+      .map((id) => this.runtimeChunkById.get(id))
+      .filter((chunk): chunk is RuntimeChunk => chunk !== undefined)
+  }
+
   async fetchChunkById(chunk: RuntimeChunk): Promise<void> {
     if (this.loadedChunkIds.has(chunk.id) || this.loadingChunkIds.has(chunk.id)) return
 
@@ -104,34 +215,94 @@ export class GaussianSplatManager {
       if (!chunkRes.ok) throw new Error(`Failed to fetch chunk ${chunk.id}`)
 
       const buffer = await chunkRes.arrayBuffer()
-      const headerVertexCount = Number(chunkRes.headers.get('n-vertex'))
-      const vertexCount = Number.isFinite(headerVertexCount) && headerVertexCount > 0
-        ? Math.floor(headerVertexCount)
-        : chunk.vertexCount
-
-      const splat = this.addSplatBuffer(buffer, vertexCount)
-      if (splat?.mesh) {
-        splat.mesh.userData.trunkCenter = chunk.center.clone()
-      }
-
-      this.loadedChunkIds.add(chunk.id)
+      this.addChunkBuffer(chunk, buffer, Number(chunkRes.headers.get('n-vertex')))
     } finally {
       this.loadingChunkIds.delete(chunk.id)
     }
   }
 
+  async fetchChunks(chunks: RuntimeChunk[]): Promise<void> {
+    const pending = chunks.filter((chunk) => !this.loadedChunkIds.has(chunk.id) && !this.loadingChunkIds.has(chunk.id))
+    if (pending.length === 0) return
+
+    const byId = new Map(pending.map((chunk) => [chunk.id, chunk]))
+    for (const chunk of pending) this.loadingChunkIds.add(chunk.id)
+
+    try {
+      const ids = pending.map((chunk) => chunk.id).join(',')
+      const chunkRes = await fetch(
+        `${this.chunkServerBaseUrl}/load_chunks?filename=${encodeURIComponent(this.chunkSceneName)}&chunk_ids=${encodeURIComponent(ids)}` +
+          `&frame_encodings=${CHUNK_FRAME_ENCODINGS.join(',')}`,
+      )
+      if (!chunkRes.ok || !chunkRes.body) throw new Error(`Failed to fetch chunks ${ids}`)
+      const frameEncoding = chunkRes.headers.get('frame-encoding') ?? 'identity'
+
+      // frames are added as soon as they are complete, not when the whole
+      // batch has arrived
+      const reader = chunkRes.body.getReader()
+      const decoder = new TextDecoder()
+      let pendingBytes = new Uint8Array(0)
+
+      for (;;) {
+        const { done, value } = await reader.read()
+        if (value) {
+          const merged = new Uint8Array(pendingBytes.length + value.length)
+          merged.set(pendingBytes)
+          merged.set(value, pendingBytes.length)
+          pendingBytes = merged
+        }
+
+        let offset = 0
+        while (pendingBytes.length - offset >= CHUNK_FRAME_HEADER_BYTES) {
+          const header = new DataView(pendingBytes.buffer, pendingBytes.byteOffset + offset, CHUNK_FRAME_HEADER_BYTES)
+          const idBytes = header.getUint32(0, true)
+          const vertexCount = header.getUint32(4, true)
+          const dataBytes = header.getUint32(8, true)
+          const dataStart = offset + CHUNK_FRAME_HEADER_BYTES + Math.ceil(idBytes / 4) * 4
+          const frameEnd = dataStart + Math.ceil(dataBytes / 4) * 4
+          if (pendingBytes.length < frameEnd) break
+
+          const idStart = offset + CHUNK_FRAME_HEADER_BYTES
+          const chunk = byId.get(decoder.decode(pendingBytes.subarray(idStart, idStart + idBytes)))
+          if (chunk) {
+            const buffer = await decodeChunkFrame(pendingBytes.subarray(dataStart, dataStart + dataBytes), frameEncoding)
+            this.addChunkBuffer(chunk, buffer, vertexCount)
+          }
+          offset = frameEnd
+        }
+        pendingBytes = pendingBytes.slice(offset)
+
+        if (done) break
+      }
+    } finally {
+      for (const chunk of pending) this.loadingChunkIds.delete(chunk.id)
+    }
+  }
+
   async sweepAndLoadCoveredChunks(camera: THREE.PerspectiveCamera): Promise<void> {
     if (!this.chunkStreamingEnabled || this.chunkSweepInFlight || this.runtimeChunks.length === 0) return
 
     this.chunkSweepInFlight = true
     try {
-      const covered = this.collectCameraCoveredChunks(camera)
-      const pending = covered
-        .filter((chunk) => !this.loadedChunkIds.has(chunk.id) && !this.loadingChunkIds.has(chunk.id))
-        .slice(0, this.maxChunksPerSweep)
+      this.updateCameraVelocity(camera)
+      const isPending = (chunk: RuntimeChunk) => !this.loadedChunkIds.has(chunk.id) && !this.loadingChunkIds.has(chunk.id)
+
+      const covered = await this.collectCoveredChunks(camera)
+      let pending = covered.filter(isPending).slice(0, this.maxChunksPerSweep)
+
+      // everything in view is loaded: spend the sweep on chunks ahead of
+      // the camera path instead of waiting for them to pop in
+      if (pending.length === 0 && CONFIG.USE_CHUNK_PREFETCH) {
+        try {
+          const planned = await this.queryPrefetchChunks(camera)
+          pending = planned.filter(isPending).slice(0, this.maxChunksPerSweep)
+        } catch (err) {
+          console.warn('Chunk prefetch planning failed', err)
+        }
+      }
 
       if (pending.length > 0) {
-        await Promise.all(pending.map((chunk) => this.fetchChunkById(chunk)))
+        await this.fetchChunks(pending)
       }
     } finally {
       this.chunkSweepInFlight = false
@@ -142,6 +313,7 @@ export class GaussianSplatManager {
     this.chunkSceneName = sceneName
     this.chunkServerBaseUrl = serverBaseUrl
     this.runtimeChunks = []
+    this.runtimeChunkById.clear()
     this.loadedChunkIds.clear()
     this.loadingChunkIds.clear()
     this.chunkStreamingEnabled = false
@@ -156,7 +328,9 @@ export class GaussianSplatManager {
       throw new Error('No scene chunks loaded')
     }
 
+    this.chunkPacking = chunkPayload.packing ?? 'full'
     this.runtimeChunks = chunkPayload.chunks.map((chunk) => this.toRuntimeChunk(chunk))
+    this.runtimeChunkById = new Map(this.runtimeChunks.map((chunk) => [chunk.id, chunk]))
     this.chunkStreamingEnabled = true
   }
 
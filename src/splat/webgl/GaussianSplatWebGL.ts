@@ -4,6 +4,19 @@ import frag from './shaders/splat.frag?raw'
 // pure forward splat (deferred is handled separately)
 import { CONFIG } from "../../config.js";
 
+// Quantization bounds of a compact payload (splat-packing: compact): the
+// scene box from the splat-bounds header for /ply, the chunk box for chunks
+export type CompactBounds = {
+  min: ArrayLike<number>
+  max: ArrayLike<number>
+}
+
+export function parseSplatBounds(value: string | null): CompactBounds | null {
+  const values = (value ?? '').split(',').map(Number)
+  if (values.length !== 6 || values.some((v) => !Number.isFinite(v))) return null
+  return { min: values.slice(0, 3), max: values.slice(3, 6) }
+}
+
 export class GaussianSplatWebGL {
   mesh: THREE.Mesh
   forwardMaterial: THREE.RawShaderMaterial
@@ -43,6 +56,8 @@ export class GaussianSplatWebGL {
         projection: { value: new THREE.Matrix4() },
         view: { value: new THREE.Matrix4() },
         focal: { value: new THREE.Vector3(1, 1, 1) },
+        u_boundsMin: { value: new THREE.Vector3() },
+        u_boundsMax: { value: new THREE.Vector3() },
         u_alphaEpsilon: { value: CONFIG.ALPHA_DISCARD_EPSILON },
       }
     })
@@ -124,9 +139,33 @@ export class GaussianSplatWebGL {
     this.idx_buffer = texture
   }
 
-  setBuffer(buffer: ArrayBuffer, vertexCount: number) {
+  setBuffer(buffer: ArrayBuffer, vertexCount: number, compact: CompactBounds | null = null) {
+    if (!this.worker) return
+    this.setCompactLayout(compact)
+    const bounds = compact ? { min: Array.from(compact.min), max: Array.from(compact.max) } : null
+    this.worker.postMessage({ buffer, vertexCount, compact: bounds }, [buffer])
+  }
+
+  setBlockBounds(bounds: ArrayBuffer, blockSplats: number) {
+    // (min, max) float32 box per run of blockSplats splats of the current
+    // buffer; the worker culls whole blocks before testing splats
     if (!this.worker) return
-    this.worker.postMessage({ buffer, vertexCount }, [buffer])
+    this.worker.postMessage({ blockBounds: bounds, blockSplats }, [bounds])
+  }
+
+  setCompactLayout(compact: CompactBounds | null) {
+    // the compact layout is decoded in the vertex shader (COMPACT_LAYOUT)
+    const mat = this.forwardMaterial
+    const defines = { ...(mat.defines ?? {}) }
+    if (compact) {
+      defines.COMPACT_LAYOUT = 1
+      mat.uniforms.u_boundsMin.value.fromArray(Array.from(compact.min))
+      mat.uniforms.u_boundsMax.value.fromArray(Array.from(compact.max))
+    } else {
+      delete defines.COMPACT_LAYOUT
+    }
+    mat.defines = defines
+    mat.needsUpdate = true
   }
 
   updateUniforms(viewMatrix: Float32Array, projectionMatrix: Float32Array, fx: number, fy: number, fz: number) {
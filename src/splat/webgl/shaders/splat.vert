@@ -47,6 +47,56 @@ mat3 unpackRS(vec3 v)
                           u3.x, u3.y, 0.0));
 }
 
+#ifdef COMPACT_LAYOUT
+// compact layout (8 words / 2 pixels per splat, see src/scripts/_splat.py);
+// positions are unorm16 offsets within these bounds
+uniform vec3 u_boundsMin;
+uniform vec3 u_boundsMax;
+
+const float SH1_RANGE = 1.0;
+
+vec4 unpackUnorm8x4(uint bits)
+{
+    return vec4(bits & 0xFFu, (bits >> 8) & 0xFFu, (bits >> 16) & 0xFFu, bits >> 24) / 255.0;
+}
+
+vec4 unpackQuatSmallest3(uint bits)
+{
+    // three kept components in 10-bit steps over [-1/sqrt(2), 1/sqrt(2)]
+    // follow the dropped (largest, positive) one in w, x, y, z order
+    int largest = int(bits & 3u);
+    vec3 rest = (vec3((bits >> 2) & 0x3FFu, (bits >> 12) & 0x3FFu, (bits >> 22) & 0x3FFu) / 1023.0 * 2.0 - 1.0)
+        * 0.70710678;
+    float big = sqrt(max(0.0, 1.0 - dot(rest, rest)));
+    vec4 q;
+    q[largest] = big;
+    q[(largest + 1) & 3] = rest.x;
+    q[(largest + 2) & 3] = rest.y;
+    q[(largest + 3) & 3] = rest.z;
+    return q;
+}
+
+mat3 compactRS(uint quatBits, uint scaleBits)
+{
+    vec4 q = unpackQuatSmallest3(quatBits);     // w, x, y, z
+    vec2 s = unpackHalf2x16(scaleBits);
+    float w = q.x, x = q.y, y = q.z, z = q.w;
+    // rotation columns scaled by sx / sy; the third axis is flat (same as unpackRS)
+    vec3 col0 = vec3(1.0 - 2.0 * (y * y + z * z), 2.0 * (x * y + w * z), 2.0 * (x * z - w * y)) * s.x;
+    vec3 col1 = vec3(2.0 * (x * y - w * z), 1.0 - 2.0 * (x * x + z * z), 2.0 * (y * z + w * x)) * s.y;
+    return mat3(col0, col1, vec3(0.0));
+}
+
+float sh1Coefficient(uint lo, uint hi, int k)
+{
+    uint v;
+    if (k < 4) v = lo >> uint(7 * k);
+    else if (k == 4) v = (lo >> 28) | (hi << 4);
+    else v = hi >> uint(7 * k - 32);
+    return (float(v & 0x7Fu) - 64.0) / 63.0 * SH1_RANGE;
+}
+#endif
+
 vec3 evalSh1(vec3 baseColor, vec3 dir, vec3 c1, vec3 c2, vec3 c3) {
     // first-order SH basis (approx): C1 * [x,y,z]
     float C1 = 0.4886025119;
@@ -69,6 +119,30 @@ void main()
 {
     // load transform
     int id = int(texelFetch(idx_buffer, ivec2(gl_InstanceID % 1024, gl_InstanceID / 1024), 0).r);
+    vec3 center3;
+    float opacity;
+    mat3 RS;
+    vec3 baseColor, c1, c2, c3, oriColor, pbr;
+#ifdef COMPACT_LAYOUT
+    int row = (id % 1024) * 2;
+    int col = id / 1024;
+    uvec4 w0 = floatBitsToUint(texelFetch(u_data, ivec2(row  , col), 0));
+    uvec4 w1 = floatBitsToUint(texelFetch(u_data, ivec2(row+1, col), 0));
+
+    vec3 q = vec3(w0.x & 0xFFFFu, w0.x >> 16, w0.y & 0xFFFFu) / 65535.0;
+    center3 = mix(u_boundsMin, u_boundsMax, q);
+    vec4 opcRefl = unpackUnorm8x4(w0.y);
+    vec4 baseRough = unpackUnorm8x4(w0.z);
+    vec4 oriMetal = unpackUnorm8x4(w0.w);
+    opacity = opcRefl.z;
+    RS = compactRS(w1.x, w1.y);
+    baseColor = baseRough.rgb;
+    c1 = vec3(sh1Coefficient(w1.z, w1.w, 0), sh1Coefficient(w1.z, w1.w, 1), sh1Coefficient(w1.z, w1.w, 2));
+    c2 = vec3(sh1Coefficient(w1.z, w1.w, 3), sh1Coefficient(w1.z, w1.w, 4), sh1Coefficient(w1.z, w1.w, 5));
+    c3 = vec3(sh1Coefficient(w1.z, w1.w, 6), sh1Coefficient(w1.z, w1.w, 7), sh1Coefficient(w1.z, w1.w, 8));
+    oriColor = oriMetal.rgb;
+    pbr = vec3(opcRefl.w, baseRough.w, oriMetal.w);
+#else
     int row = (id % 1024) * 4;
     int col = id / 1024;
     vec4 pix0 = texelFetch(u_data, ivec2(row  , col), 0);
@@ -76,14 +150,38 @@ void main()
     vec4 pix2 = texelFetch(u_data, ivec2(row+2, col), 0);
     vec4 pix3 = texelFetch(u_data, ivec2(row+3, col), 0);
 
-    vec4 pos_view = view * vec4(pix0.xyz, 1.0); // relative position to camera
+    center3 = pix0.xyz;
+    opacity = pix0.a;
+    RS = unpackRS(pix1.xyz);
+
+    // base color packed as RGB8 in pix1.a
+    baseColor = unpackF32ToRGB8(pix1.a).rgb;
+
+    // unpack SH1 (9 half floats) from pix2/pix3
+    vec2 sh01 = unpackF32ToHalf2(pix2.x);
+    vec2 sh23 = unpackF32ToHalf2(pix2.y);
+    vec2 sh45 = unpackF32ToHalf2(pix2.z);
+    vec2 sh67 = unpackF32ToHalf2(pix2.w);
+    vec2 sh89 = unpackF32ToHalf2(pix3.x);
+
+    c1 = vec3(sh01.x, sh01.y, sh23.x); // r1,g1,b1
+    c2 = vec3(sh23.y, sh45.x, sh45.y); // r2,g2,b2
+    c3 = vec3(sh67.x, sh67.y, sh89.x); // r3,g3,b3
+
+    // New packed attributes (stored in pix3.yzw)
+    oriColor = unpackF32ToRGB8(pix3.y).rgb;
+    vec2 rr = unpackF32ToHalf2(pix3.z); // refl, roughness
+    vec2 m0 = unpackF32ToHalf2(pix3.w); // metalness, pad
+    pbr = vec3(rr.x, rr.y, m0.x);
+#endif
+
+    vec4 pos_view = view * vec4(center3, 1.0); // relative position to camera
     vec4 pos_proj = projection * pos_view;
 
-    vWorldPos = pix0.xyz;
+    vWorldPos = center3;
     float tan_a = focal.y / focal.z;
     float r = focal.x / focal.y;
 
-    mat3 RS = unpackRS(pix1.xyz);
     // Extract first two columns of RS and compute normal (third column is zero)
     vec3 rs_col1 = RS[0];
     vec3 rs_col2 = RS[1];
@@ -130,9 +228,9 @@ void main()
     gl_Position = vec4(center + position.x * ax_1 * scale + position.y * ax_2 * scale, 0.0, 1.0);
 
     // axis correction --------------------------------------------------
-    vec4 pos_1_proj = projection * view * vec4(rs_col1 + pix0.xyz, 1.0);
+    vec4 pos_1_proj = projection * view * vec4(rs_col1 + center3, 1.0);
     vec2 ax_1_proj = vec2(pos_1_proj) / pos_1_proj.w - center;
-    vec4 pos_2_proj = projection * view * vec4(rs_col2 + pix0.xyz, 1.0);
+    vec4 pos_2_proj = projection * view * vec4(rs_col2 + center3, 1.0);
     vec2 ax_2_proj = vec2(pos_2_proj) / pos_2_proj.w - center;
 
     mat2 X = mat2(ax_1_proj, ax_2_proj);
@@ -144,27 +242,10 @@ void main()
 
     vPosition = vec2(position);
 
-    // base color packed as RGB8 in pix1.a
-    vec3 baseColor = unpackF32ToRGB8(pix1.a).rgb;
-
-    // unpack SH1 (9 half floats) from pix2/pix3
-    vec2 sh01 = unpackF32ToHalf2(pix2.x);
-    vec2 sh23 = unpackF32ToHalf2(pix2.y);
-    vec2 sh45 = unpackF32ToHalf2(pix2.z);
-    vec2 sh67 = unpackF32ToHalf2(pix2.w);
-    vec2 sh89 = unpackF32ToHalf2(pix3.x);
-
-    vec3 c1 = vec3(sh01.x, sh01.y, sh23.x); // r1,g1,b1
-    vec3 c2 = vec3(sh23.y, sh45.x, sh45.y); // r2,g2,b2
-    vec3 c3 = vec3(sh67.x, sh67.y, sh89.x); // r3,g3,b3
-
     vec3 dir = normalize(-pos_view.xyz);
     vec3 rgb = clamp(evalSh1(baseColor, dir, c1, c2, c3), 0.0, 1.0);
-    vColor = vec4(rgb, pix0.a);
+    vColor = vec4(rgb, opacity);
 
-    // New packed attributes (stored in pix3.yzw)
-    vOriColor = unpackF32ToRGB8(pix3.y).rgb;
-    vec2 rr = unpackF32ToHalf2(pix3.z); // refl, roughness
-    vec2 m0 = unpackF32ToHalf2(pix3.w); // metalness, pad
-    vPbr = vec3(rr.x, rr.y, m0.x);
+    vOriColor = oriColor;
+    vPbr = pbr;
 }  
\ No newline at end of file
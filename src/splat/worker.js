@@ -5,6 +5,38 @@ function createWorker(self) {
     // performs a simple depth sort, and posts texdata and depthIndex back to main thread.
     let buffer = null;
     let vertexCount = 0;
+    // compact layout (splat-packing: compact): { min, max } quantization bounds
+    let compact = null;
+    let positions = null;
+    // optional (min, max) box per run of blockSplats splats (/block_bounds),
+    // 6 floats per block, used to skip whole blocks outside the frustum
+    let blockBounds = null;
+    let blockSplats = 0;
+
+    function decodePositions() {
+        // xyz per splat for sorting; the compact layout stores unorm16
+        // offsets within the bounds in words 0-1 of each 8-word splat
+        positions = new Float32Array(vertexCount * 3);
+        if (!compact) {
+            const f_buffer = new Float32Array(buffer);
+            const stride = CONFIG.PACKED_FLOAT_PER_SPLAT;
+            for (let i = 0; i < vertexCount; i++) {
+                positions[3 * i + 0] = f_buffer[stride * i + 0];
+                positions[3 * i + 1] = f_buffer[stride * i + 1];
+                positions[3 * i + 2] = f_buffer[stride * i + 2];
+            }
+            return;
+        }
+        const words = new Uint32Array(buffer);
+        const lo = compact.min, hi = compact.max;
+        const sx = (hi[0] - lo[0]) / 65535, sy = (hi[1] - lo[1]) / 65535, sz = (hi[2] - lo[2]) / 65535;
+        for (let i = 0; i < vertexCount; i++) {
+            const w0 = words[8 * i], w1 = words[8 * i + 1];
+            positions[3 * i + 0] = lo[0] + (w0 & 0xFFFF) * sx;
+            positions[3 * i + 1] = lo[1] + (w0 >>> 16) * sy;
+            positions[3 * i + 2] = lo[2] + (w1 & 0xFFFF) * sz;
+        }
+    }
 
     function multiplyMat4(out, a, b) {
         // column-major out = a * b
@@ -47,8 +79,9 @@ function createWorker(self) {
         //  p2: sh1 packed as half2x16 (5 u32 words = 9 halfs + pad)
         //  p3: sh1 packed as half2x16 & roughness/metallic/originColor
 
+        // compact layout: 2 pixels per splat, decoded in the vertex shader
         const rowSplats = CONFIG.DATA_TEXTURE_WIDTH;
-        const pix_per_splat = CONFIG.PACKED_PIX_PER_SPLAT;
+        const pix_per_splat = compact ? 2 : CONFIG.PACKED_PIX_PER_SPLAT;
         const texwidth = rowSplats * pix_per_splat;
         const texheight = Math.ceil(vertexCount / rowSplats);
 
@@ -65,23 +98,57 @@ function createWorker(self) {
         self.postMessage({ texdata, texwidth, texheight }, [texdata.buffer]);
     }
 
+    function boxOutside(m, b, o, margin) {
+        // true when the box is entirely outside one of the clip planes
+        // |x|, |y|, |z| <= (1 + margin) w, i.e. no point in it can pass the
+        // per-splat NDC test below
+        const k = 1 + margin;
+        for (let p = 0; p < 6; p++) {
+            const row = p >> 1, sign = (p & 1) ? -1 : 1;
+            const a = m[3] * k + sign * m[row];
+            const bb = m[7] * k + sign * m[4 + row];
+            const c = m[11] * k + sign * m[8 + row];
+            const d = m[15] * k + sign * m[12 + row];
+            // box corner furthest along the plane normal
+            const x = a >= 0 ? b[o + 3] : b[o];
+            const y = bb >= 0 ? b[o + 4] : b[o + 1];
+            const z = c >= 0 ? b[o + 5] : b[o + 2];
+            if (a * x + bb * y + c * z + d < 0) return true;
+        }
+        return false;
+    }
+
+    function visibleRanges(viewProj, margin) {
+        // [start, end) splat ranges left after block culling
+        if (!blockBounds) return [0, vertexCount];
+        const ranges = [];
+        const nblocks = blockBounds.length / 6;
+        for (let b = 0; b < nblocks; b++) {
+            if (boxOutside(viewProj, blockBounds, 6 * b, margin)) continue;
+            const start = b * blockSplats, end = Math.min(start + blockSplats, vertexCount);
+            if (ranges.length && ranges[ranges.length - 1] === start) ranges[ranges.length - 1] = end;
+            else ranges.push(start, end);
+        }
+        return ranges;
+    }
+
     function runSort(view, projection) {
         if (!buffer) return;
-        // stride in texdata (4 pixels * 4 channels)
-        const TEX_STRIDE = CONFIG.PACKED_FLOAT_PER_SPLAT; // 16
         const viewProj = new Float32Array(16);
         multiplyMat4(viewProj, projection, view);
 
-        const f_buffer = new Float32Array(buffer);
         let maxDepth = -Infinity, minDepth = Infinity;
         let sizeList = new Int32Array(vertexCount);
         let visibleIndices = new Uint32Array(vertexCount);
         let visibleCount = 0;
-
-        for (let i = 0; i < vertexCount; i++) {
-            const x = f_buffer[TEX_STRIDE * i + 0];
-            const y = f_buffer[TEX_STRIDE * i + 1];
-            const z = f_buffer[TEX_STRIDE * i + 2];
+        const margin = 0.25;
+        const ranges = visibleRanges(viewProj, margin);
+
+        for (let r = 0; r < ranges.length; r += 2)
+        for (let i = ranges[r]; i < ranges[r + 1]; i++) {
+            const x = positions[3 * i + 0];
+            const y = positions[3 * i + 1];
+            const z = positions[3 * i + 2];
             // view-space z (Three.js camera looks down -Z, so z > 0 is behind camera)
             const viewZ = (view[2] * x + view[6] * y + view[10] * z + view[14]);
             if (viewZ > 0) continue;
@@ -94,7 +161,6 @@ function createWorker(self) {
             const ndcX = clipX / clipW;
             const ndcY = clipY / clipW;
             const ndcZ = clipZ / clipW;
-            const margin = 0.25;
             if (ndcX < -1 - margin || ndcX > 1 + margin || ndcY < -1 - margin || ndcY > 1 + margin || ndcZ < -1 - margin || ndcZ > 1 + margin) continue;
 
             const depth = (viewZ * 4096) | 0;
@@ -133,11 +199,20 @@ function createWorker(self) {
             console.log("Worker received buffer");
             buffer = e.data.buffer;
             vertexCount = e.data.vertexCount;
+            compact = e.data.compact || null;
+            blockBounds = null;
+            decodePositions();
             console.log(">> buffer size (byte):", buffer.byteLength, "vertexCount:", vertexCount);
             console.log(buffer);
 
             generateTexture();
 
+        } else if (e.data.blockBounds) {
+            // boxes must cover the current buffer exactly
+            const bounds = new Float32Array(e.data.blockBounds);
+            const splats = e.data.blockSplats;
+            blockBounds = splats > 0 && bounds.length / 6 === Math.ceil(vertexCount / splats) ? bounds : null;
+            blockSplats = splats;
         } else if (e.data.view) {
             // Update the view, sort and chunk the splats
             runSort(e.data.view, e.data.projection);
@@ -0,0 +1,114 @@
+import unittest
+import tempfile
+import numpy as np
+
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, project_root)
+
+from src.scripts._archive import ARCHIVE_ALIGN, ChunkArchive, archive_paths, update_archive, write_archive
+
+
+def _chunks():
+    bounds = np.array([[0, 0, 0], [1, 1, 1]], dtype=np.float32)
+    return [
+        ('0_0_0', np.arange(16, dtype=np.uint32), 1, bounds),
+        ('r0m356', np.arange(40, dtype=np.uint32), 2, bounds + 1),   # not a multiple of 64 bytes
+        ('empty', b'', 0, bounds),
+        ('1_0_0', np.full(32, 7, dtype=np.uint32), 2, bounds - 1),
+    ]
+
+
+class TestChunkArchive(unittest.TestCase):
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            chunks = _chunks()
+            write_archive(tmp, chunks)
+            archive = ChunkArchive(tmp)
+
+            self.assertEqual(archive.ids, [c[0] for c in chunks])
+            for row, (chunk_id, payload, vcount, bounds) in enumerate(chunks):
+                self.assertEqual(bytes(archive.payload(chunk_id)), bytes(memoryview(payload)))
+                record = archive.records[row]
+                self.assertEqual(record['offset'] % ARCHIVE_ALIGN, 0)
+                self.assertEqual(record['vertex_count'], vcount)
+                np.testing.assert_array_equal(record['bounds'], bounds)
+                archive.warm(chunk_id)
+            self.assertNotIn('missing', archive)
+
+    def test_mismatched_data_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_archive(tmp, _chunks())
+            data_path, _ = archive_paths(tmp)
+            # bytes past the indexed size (an interrupted append) are ignored
+            with open(data_path, 'ab') as f:
+                f.write(b'\0' * 64)
+            ChunkArchive(tmp)
+
+            with open(data_path, 'r+b') as f:
+                f.truncate(ARCHIVE_ALIGN)
+            with self.assertRaises(ValueError):
+                ChunkArchive(tmp)
+
+        # a data file from another build is rejected even when large enough
+        with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as other:
+            write_archive(tmp, _chunks())
+            write_archive(other, _chunks())
+            os.replace(archive_paths(other)[0], archive_paths(tmp)[0])
+            with self.assertRaises(ValueError):
+                ChunkArchive(tmp)
+
+    def test_empty_archive(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_archive(tmp, [])
+            self.assertEqual(ChunkArchive(tmp).ids, [])
+
+    def test_update_appends_changed_payloads(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            chunks = _chunks()
+            digests = [f'{i:040x}' for i in range(len(chunks))]
+            self.assertEqual(update_archive(tmp, chunks, digests), len(chunks))
+            data_path, index_path = archive_paths(tmp)
+            with open(data_path, 'rb') as f:
+                before = f.read()
+            old = ChunkArchive(tmp)
+
+            # same digests: neither file is touched
+            mtimes = [os.stat(p).st_mtime_ns for p in (data_path, index_path)]
+            self.assertEqual(update_archive(tmp, chunks, digests), 0)
+            self.assertEqual([os.stat(p).st_mtime_ns for p in (data_path, index_path)], mtimes)
+
+            # one changed chunk is appended; everything before stays byte for byte
+            chunks[1] = ('r0m356', np.arange(40, 80, dtype=np.uint32), 2, chunks[1][3])
+            digests[1] = 'ff' * 20
+            self.assertEqual(update_archive(tmp, chunks, digests), 1)
+            archive = ChunkArchive(tmp)
+            with open(data_path, 'rb') as f:
+                after = f.read()
+            self.assertEqual(after[:len(before)], before)
+            self.assertGreaterEqual(int(archive.records[1]['offset']), len(before))
+            for row in (0, 2, 3):
+                self.assertEqual(archive.records[row]['offset'], old.records[row]['offset'])
+            for chunk_id, payload, _, _ in chunks:
+                self.assertEqual(bytes(archive.payload(chunk_id)), bytes(memoryview(payload)))
+            # a reader of the previous index still sees the previous payload
+            self.assertEqual(bytes(old.payload('r0m356')), np.arange(40, dtype=np.uint32).tobytes())
+
+    def test_update_compacts_dead_payloads(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            chunks = _chunks()
+            update_archive(tmp, chunks, [f'{i:040x}' for i in range(len(chunks))])
+            data_path, _ = archive_paths(tmp)
+            for n in range(1, 5):
+                update_archive(tmp, chunks, [f'{i + 10 * n:040x}' for i in range(len(chunks))])
+                archive = ChunkArchive(tmp)
+                live = sum(-(-int(r['length']) // ARCHIVE_ALIGN) * ARCHIVE_ALIGN for r in archive.records)
+                self.assertLessEqual(os.path.getsize(data_path) - ARCHIVE_ALIGN, 2 * live)
+                for chunk_id, payload, _, _ in chunks:
+                    self.assertEqual(bytes(archive.payload(chunk_id)), bytes(memoryview(payload)))
+
+
+if __name__ == '__main__':
+    unittest.main()
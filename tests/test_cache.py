@@ -0,0 +1,158 @@
+import unittest
+import tempfile
+import gzip
+import numpy as np
+
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, project_root)
+
+from src.scripts._cache import (
+    ByteLRU, block_bounds_path, packed_data_path, write_packed_cache, read_packed_cache, source_fingerprint,
+)
+from src.scripts._morton import BlockBoundsBuilder, block_bounds, read_block_bounds
+from src.scripts._splat import packed_positions
+from src.scripts._encoding import encoded_path, shuffle_bytes, unshuffle_bytes
+
+
+class TestByteLRU(unittest.TestCase):
+
+    def test_evicts_least_recently_used_under_budget(self):
+        cache = ByteLRU(100)
+        cache.put('a', 1, b'a' * 40, 40)
+        cache.put('b', 1, b'b' * 40, 40)
+        self.assertIsNotNone(cache.get('a', 1))   # 'a' is now most recent
+        cache.put('c', 1, b'c' * 40, 40)          # evicts 'b'
+
+        self.assertIsNone(cache.get('b', 1))
+        self.assertIsNotNone(cache.get('a', 1))
+        self.assertIsNotNone(cache.get('c', 1))
+
+        stats = cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['hits'], 3)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['bytes'], 80)
+
+    def test_new_version_replaces_old(self):
+        cache = ByteLRU(100)
+        cache.put('scene', 1, b'old', 3)
+        cache.put('scene', 2, b'new!', 4)
+
+        self.assertIsNone(cache.get('scene', 1))
+        self.assertEqual(cache.get('scene', 2), b'new!')
+        self.assertEqual(cache.stats()['bytes'], 4)
+        self.assertEqual(cache.stats()['invalidations'], 1)
+
+    def test_oversized_value_is_not_cached(self):
+        cache = ByteLRU(10)
+        self.assertFalse(cache.put('big', 1, b'x' * 11, 11))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_pinned_identity_is_not_evicted(self):
+        cache = ByteLRU(100)
+        cache.pin('hot')
+        cache.put('hot', 1, b'h' * 60, 60)
+        cache.put('a', 1, b'a' * 30, 30)
+        cache.put('b', 1, b'b' * 30, 30)          # evicts 'a', not the older 'hot'
+        self.assertIsNotNone(cache.get('hot', 1))
+        self.assertIsNone(cache.get('a', 1))
+
+        # nothing unpinned left to evict: the new value is refused
+        self.assertFalse(cache.put('c', 1, b'c' * 50, 50))
+        self.assertIsNotNone(cache.get('b', 1))
+        self.assertEqual(cache.stats()['bytes'], 90)
+
+
+class TestPackedCache(unittest.TestCase):
+
+    def test_sidecar_must_match_inputs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, 'point_cloud.ply')
+            with open(src, 'wb') as f:
+                f.write(b'ply')
+            bin_path = os.path.join(tmp, 'packed_4.bin')
+            meta_path = os.path.join(tmp, 'packed_4.json')
+
+            fp = source_fingerprint(src)
+            expect = {'source': [fp['mtime_ns'], fp['size']], 'transform': 'abc'}
+            raw = np.arange(32, dtype=np.uint32)
+            meta = write_packed_cache(bin_path, meta_path, [(raw, 2)], 4, **expect)
+
+            self.assertEqual(read_packed_cache(bin_path, meta_path, expect)['vertexCount'], 2)
+            self.assertIsNone(read_packed_cache(bin_path, meta_path, {**expect, 'transform': 'def'}))
+
+            # truncated data file is rejected even with a matching sidecar
+            with open(packed_data_path(bin_path, meta), 'r+b') as f:
+                f.truncate(16)
+            self.assertIsNone(read_packed_cache(bin_path, meta_path, expect))
+
+    def test_precompressed_variants(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            bin_path = os.path.join(tmp, 'packed_4.bin')
+            meta_path = os.path.join(tmp, 'packed_4.json')
+            raw = np.arange(5 * 16, dtype=np.uint32)
+            meta = write_packed_cache(bin_path, meta_path, [(raw, 5)], 4, encodings=['gzip'], shuffle=True)
+
+            data_path = packed_data_path(bin_path, meta)
+            with open(encoded_path(data_path, 'gzip'), 'rb') as f:
+                self.assertEqual(gzip.decompress(f.read()), raw.tobytes())
+            with open(encoded_path(data_path, 'gzip', shuffled=True), 'rb') as f:
+                self.assertEqual(unshuffle_bytes(gzip.decompress(f.read()), 64), raw.tobytes())
+            self.assertIsNotNone(read_packed_cache(bin_path, meta_path))
+
+            # a missing variant invalidates the whole cache
+            os.remove(encoded_path(data_path, 'gzip', shuffled=True))
+            self.assertIsNone(read_packed_cache(bin_path, meta_path))
+            self.assertEqual(set(meta['variants']), {'packed', 'shuffled'})
+
+    def test_block_bounds_sidecar(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            bin_path = os.path.join(tmp, 'packed_4.bin')
+            meta_path = os.path.join(tmp, 'packed_4.json')
+            X = np.random.default_rng(0).standard_normal((100, 16)).astype(np.float32)
+            raw = X.view(np.uint32)
+            builder = BlockBoundsBuilder(16, lambda r: packed_positions(r, 4))
+            meta = write_packed_cache(bin_path, meta_path, [(raw[:30], 30), (raw[30:], 70)], 4, block_bounds=builder)
+
+            self.assertEqual(meta['blocks'], {'splats': 16, 'count': 7})
+            boxes_path = block_bounds_path(packed_data_path(bin_path, meta))
+            np.testing.assert_array_equal(read_block_bounds(boxes_path), block_bounds(X[:, :3], 16))
+            self.assertIsNotNone(read_packed_cache(bin_path, meta_path))
+
+            os.remove(boxes_path)
+            self.assertIsNone(read_packed_cache(bin_path, meta_path))
+
+    def test_rebuild_keeps_files_of_the_previous_sidecar(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            bin_path = os.path.join(tmp, 'packed_4.bin')
+            meta_path = os.path.join(tmp, 'packed_4.json')
+            first = write_packed_cache(bin_path, meta_path, [(np.zeros(16, dtype=np.uint32), 1)], 4, encodings=['gzip'])
+            old_path = packed_data_path(bin_path, first)
+
+            # same size, new bytes: a reader that resolved the old sidecar
+            # still gets the old bytes from the old files
+            second = write_packed_cache(bin_path, meta_path, [(np.ones(16, dtype=np.uint32), 1)], 4, encodings=['gzip'])
+            self.assertNotEqual(second['data'], first['data'])
+            with open(old_path, 'rb') as f:
+                self.assertEqual(f.read(), bytes(64))
+            self.assertEqual(read_packed_cache(bin_path, meta_path), second)
+
+            # one more build drops the first generation, variants included
+            third = write_packed_cache(bin_path, meta_path, [(np.ones(16, dtype=np.uint32), 1)], 4, encodings=['gzip'])
+            self.assertFalse(os.path.exists(old_path))
+            self.assertFalse(os.path.exists(encoded_path(old_path, 'gzip')))
+            self.assertEqual(
+                sorted(os.listdir(tmp)),
+                sorted(['packed_4.json'] + [name for m in (second, third) for name in (m['data'], m['data'] + '.gz')]),
+            )
+
+    def test_shuffle_round_trip_over_blocks(self):
+        data = np.random.default_rng(0).integers(0, 256, 10 * 64, dtype=np.uint8).tobytes()
+        shuffled = shuffle_bytes(data, 64, block_records=4)
+        self.assertEqual(shuffled[:4], bytes(data[i * 64] for i in range(4)))
+        self.assertEqual(unshuffle_bytes(shuffled, 64, block_records=4), data)
+
+if __name__ == '__main__':
+    unittest.main()
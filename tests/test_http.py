@@ -0,0 +1,109 @@
+import unittest
+import tempfile
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, project_root)
+
+from src.scripts._http import (
+    parse_range, slice_bounds, negotiate_encoding, payload_response, frame_header, iter_frames,
+)
+
+BODY = bytes(range(256)) * 4   # 1024 bytes = 16 splats of 64 bytes
+ETAG = '"v1"'
+
+
+def _client(path=None):
+    app = FastAPI()
+
+    @app.get("/payload")
+    def payload(request: Request):
+        return payload_response(
+            request, len(BODY), ETAG, {"n-vertex": "16"},
+            body=None if path else BODY, path=path, align=64, slice_bytes=200,
+        )
+
+    return TestClient(app)
+
+
+class TestParseRange(unittest.TestCase):
+
+    def test_forms(self):
+        self.assertIsNone(parse_range(None, 100))
+        self.assertEqual(parse_range("bytes=0-63", 100), (0, 64))
+        self.assertEqual(parse_range("bytes=64-", 100), (64, 100))
+        self.assertEqual(parse_range("bytes=-10", 100), (90, 100))
+        self.assertEqual(parse_range("bytes=90-500", 100), (90, 100))
+        # answered with the full body
+        self.assertIsNone(parse_range("bytes=0-1,4-5", 100))
+        self.assertIsNone(parse_range("items=0-1", 100))
+        self.assertIsNone(parse_range("bytes=abc", 100))
+
+    def test_unsatisfiable(self):
+        with self.assertRaises(HTTPException) as ctx:
+            parse_range("bytes=100-", 100)
+        self.assertEqual(ctx.exception.status_code, 416)
+        self.assertEqual(ctx.exception.headers["Content-Range"], "bytes */100")
+
+    def test_negotiate_encoding(self):
+        available = ["zstd", "br", "gzip"]
+        self.assertEqual(negotiate_encoding(None, available), "identity")
+        self.assertEqual(negotiate_encoding("gzip, deflate", available), "gzip")
+        # server preference breaks ties, client q-values win otherwise
+        self.assertEqual(negotiate_encoding("gzip, br", available), "br")
+        self.assertEqual(negotiate_encoding("br;q=0.5, gzip", available), "gzip")
+        self.assertEqual(negotiate_encoding("*;q=0.1, zstd;q=0", available), "br")
+        self.assertEqual(negotiate_encoding("gzip", []), "identity")
+
+    def test_frames_round_trip(self):
+        header = frame_header("1_2_3", 2, 128)
+        self.assertEqual(len(header) % 4, 0)
+        stream = header + BODY[:128] + frame_header("é", 0, 0)
+        self.assertEqual(list(iter_frames(stream)), [("1_2_3", 2, BODY[:128]), ("é", 0, b"")])
+
+    def test_slices_are_aligned(self):
+        bounds = list(slice_bounds(10, 500, 128))
+        self.assertEqual(bounds[0], (10, 128))
+        self.assertTrue(all(a % 128 == 0 for a, _ in bounds[1:]))
+        self.assertEqual(bounds[-1][1], 500)
+
+
+class TestPayloadResponse(unittest.TestCase):
+
+    def _check(self, client):
+        full = client.get("/payload")
+        self.assertEqual(full.status_code, 200)
+        self.assertEqual(full.content, BODY)
+        self.assertEqual(full.headers["accept-ranges"], "bytes")
+        self.assertEqual(full.headers["n-vertex"], "16")
+
+        part = client.get("/payload", headers={"Range": "bytes=64-191"})
+        self.assertEqual(part.status_code, 206)
+        self.assertEqual(part.content, BODY[64:192])
+        self.assertEqual(part.headers["content-range"], "bytes 64-191/1024")
+
+        resumed = client.get("/payload", headers={"Range": "bytes=512-", "If-Range": ETAG})
+        self.assertEqual(resumed.status_code, 206)
+        self.assertEqual(resumed.content, BODY[512:])
+
+        stale = client.get("/payload", headers={"Range": "bytes=512-", "If-Range": '"old"'})
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(stale.content, BODY)
+
+        self.assertEqual(client.get("/payload", headers={"Range": "bytes=4096-"}).status_code, 416)
+
+    def test_memory_body(self):
+        self._check(_client())
+
+    def test_file_body(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "packed.bin")
+            with open(path, "wb") as f:
+                f.write(BODY)
+            self._check(_client(path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,18 +1,39 @@
 import unittest
-from unittest.mock import patch, MagicMock
+import tempfile
+import json
+from unittest.mock import patch
 import numpy as np
+from fastapi.testclient import TestClient
 
 import os
 import sys
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))  
 sys.path.insert(0, project_root)
 
-from src.scripts.load_resource import _load_ply, _load_map, _pack_data, pack_half2, pack_half1
+from src.scripts.load_resource import (
+    app, _get_memory_cache, _load_ply, _load_map, _pack_data, _iter_packed_blocks,
+)
+from src.scripts._http import iter_frames
+from src.scripts._archive import archive_variant, write_archive
+from src.scripts._encoding import encode_bytes, shuffle_bytes
+from src.scripts._cache import write_packed_cache, read_packed_cache, open_packed, packed_data_path
+from src.scripts._splat import pack_half1, pack_half2, transform_splats
 from src.scripts._read_config import config
 
+# PLY vertex properties in the order of a trained scene file (not the
+# loader's PLY_COLUMNS order, so the column mapping is exercised)
+VERTEX_NAMES = [
+    'x', 'y', 'z', 'opacity', 'scale_0', 'scale_1',
+    'rot_0', 'rot_1', 'rot_2', 'rot_3',
+    'refl_strength', 'roughness', 'metalness',
+    'ori_color_0', 'ori_color_1', 'ori_color_2',
+    'f_dc_0', 'f_dc_1', 'f_dc_2',
+] + [f'f_rest_{i}' for i in range(9)]
+VERTEX_DTYPE = [(name, 'f4') for name in VERTEX_NAMES]
+
 class TestLoadPly(unittest.TestCase):
 
-    @patch('src.scripts.load_resource.PlyData.read')
+    @patch('src.scripts.load_resource.read_ply_vertices')
     def test_load_ply(self, mock_read):
         # Create mock vertex data as a structured array
         mock_data = np.array([
@@ -31,25 +52,9 @@ class TestLoadPly(unittest.TestCase):
                 0.21, 0.22, 0.23,
                 0.31, 0.32, 0.33,
             )
-        ], dtype=[
-            ('x', 'f4'), ('y', 'f4'), ('z', 'f4'), ('opacity', 'f4'),
-            ('scale_0', 'f4'), ('scale_1', 'f4'),
-            ('rot_0', 'f4'), ('rot_1', 'f4'), ('rot_2', 'f4'), ('rot_3', 'f4'),
-            ('refl_strength', 'f4'), ('roughness', 'f4'), ('metalness', 'f4'),
-            ('ori_color_0', 'f4'), ('ori_color_1', 'f4'), ('ori_color_2', 'f4'),
-            ('f_dc_0', 'f4'), ('f_dc_1', 'f4'), ('f_dc_2', 'f4'),
-            ('f_rest_0', 'f4'), ('f_rest_1', 'f4'), ('f_rest_2', 'f4'),
-            ('f_rest_3', 'f4'), ('f_rest_4', 'f4'), ('f_rest_5', 'f4'),
-            ('f_rest_6', 'f4'), ('f_rest_7', 'f4'), ('f_rest_8', 'f4'),
-        ])
-
-        mock_vertex = MagicMock()
-        mock_vertex.data = mock_data
-
-        mock_ply = MagicMock()
-        mock_ply.__getitem__.return_value = mock_vertex
-
-        mock_read.return_value = mock_ply
+        ], dtype=VERTEX_DTYPE)
+
+        mock_read.return_value = mock_data
 
         rot_x_180 = np.array([
             [1.0, 0.0, 0.0, 0.0],
@@ -100,6 +105,20 @@ class TestLoadPly(unittest.TestCase):
         np.testing.assert_almost_equal(result[0, 26], 0.5)  # ori_g
         np.testing.assert_almost_equal(result[0, 27], 0.5)  # ori_b
 
+    @patch('src.scripts.load_resource.read_ply_vertices')
+    def test_load_ply_drops_invalid_rows(self, mock_read):
+        mock_data = np.zeros(4, dtype=VERTEX_DTYPE)
+        mock_data['x'] = [0.0, 1.0, 2.0, 3.0]
+        mock_data['rot_0'] = 1.0
+        mock_data['scale_1'][1] = np.nan   # NaN property
+        mock_data['rot_0'][2] = 0.0        # degenerate quaternion
+        mock_read.return_value = mock_data
+
+        result = _load_ply('test', transform=None)
+
+        self.assertEqual(result.shape, (2, config['RAW_FLOAT_PER_SPLAT']))
+        np.testing.assert_array_equal(result[:, 0], [0.0, 3.0])
+
     def test_pack_data(self):
         # Create a single splat X already in RAW format (values post-_load_ply)
         pixels = config['PACKED_PIX_PER_SPLAT']
@@ -139,6 +158,130 @@ class TestLoadPly(unittest.TestCase):
         np.testing.assert_array_equal(tex_u32[0, 11], pack_half2(np.array([sh1[6]], dtype=np.float32), np.array([sh1[7]], dtype=np.float32))[0])
         np.testing.assert_array_equal(tex_u32[0, 12], pack_half1(np.array([sh1[8]], dtype=np.float32))[0])
 
+    @patch('src.scripts.load_resource.read_ply_vertices')
+    def test_streamed_pack_matches_one_shot(self, mock_read):
+        rng = np.random.default_rng(0)
+        mock_data = np.zeros(1000, dtype=VERTEX_DTYPE)
+        for n in VERTEX_NAMES:
+            mock_data[n] = rng.standard_normal(1000).astype(np.float32)
+        mock_data['scale_0'][::97] = np.nan
+        mock_read.return_value = mock_data
+
+        transform = np.eye(4, dtype=np.float32)
+        transform[:3, :3] = [[0.0, -1.5, 0.0], [1.5, 0.0, 0.0], [0.0, 0.0, 1.5]]
+        transform[:3, 3] = [1.0, 2.0, 3.0]
+        pixels = config['PACKED_PIX_PER_SPLAT']
+
+        expected, vcount = _pack_data(_load_ply('test', transform=transform), pixels)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            bin_path = os.path.join(tmp, 'packed.bin')
+            meta_path = os.path.join(tmp, 'packed.json')
+            blocks = _iter_packed_blocks('test', transform, pixels, block_rows=97)
+            meta = write_packed_cache(bin_path, meta_path, blocks, pixels)
+
+            self.assertEqual(meta['vertexCount'], vcount)
+            self.assertEqual(read_packed_cache(bin_path, meta_path), meta)
+            self.assertEqual(open_packed(packed_data_path(bin_path, meta)).tobytes(), expected.tobytes())
+            # temp files are renamed into place, nothing else is left behind
+            self.assertEqual(sorted(os.listdir(tmp)), [meta['data'], 'packed.json'])
+
+        # Morton order: per-block gathers from the PLY give the one-shot bytes
+        expected, vcount = _pack_data(_load_ply('test', transform=transform, order='morton'), pixels)
+        blocks = _iter_packed_blocks('test', transform, pixels, block_rows=97, order='morton')
+        streamed = np.concatenate([raw.reshape(-1) for raw, _ in blocks])
+        self.assertEqual(streamed.tobytes(), expected.tobytes())
+        self.assertNotEqual(expected.tobytes(), _pack_data(_load_ply('test', transform=transform), pixels)[0].tobytes())
+
+        # a pruned row selection, alone and in Morton order
+        rows = np.arange(0, 1000, 3)
+        for order in ('input', 'morton'):
+            expected, vcount = _pack_data(_load_ply('test', transform=transform, order=order, rows=rows), pixels)
+            blocks = list(_iter_packed_blocks('test', transform, pixels, block_rows=97, order=order, rows=rows))
+            self.assertEqual(sum(n for _, n in blocks), vcount)
+            self.assertEqual(np.concatenate([raw.reshape(-1) for raw, _ in blocks]).tobytes(), expected.tobytes())
+        self.assertLess(vcount, 334)
+
+    def test_pack_data_half_words(self):
+        rng = np.random.default_rng(2)
+        X = rng.standard_normal((1000, config['RAW_FLOAT_PER_SPLAT'])).astype(np.float32)
+        pixels = config['PACKED_PIX_PER_SPLAT']
+
+        raw_data, vcount = _pack_data(X, pixels)
+        tex_u32 = raw_data.reshape((vcount, pixels * 4))
+
+        q = X[:, 6:10] / np.linalg.norm(X[:, 6:10], axis=-1)[:, None]
+        w, x, y, z = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+        sx, sy = X[:, 4], X[:, 5]
+        np.testing.assert_array_equal(tex_u32[:, 4], pack_half2((1 - 2*(y*y + z*z)) * sx, (2*(x*y - w*z)) * sy))
+        np.testing.assert_array_equal(tex_u32[:, 5], pack_half2((2*(x*y + w*z)) * sx, (1 - 2*(x*x + z*z)) * sy))
+        np.testing.assert_array_equal(tex_u32[:, 6], pack_half2((2*(x*z - w*y)) * sx, (2*(y*z + w*x)) * sy))
+        np.testing.assert_array_equal(tex_u32[:, 14], pack_half2(X[:, 22], X[:, 23]))
+        np.testing.assert_array_equal(tex_u32[:, 15], pack_half1(X[:, 24]))
+
+    def test_pack_data_compact(self):
+        rng = np.random.default_rng(3)
+        n = 2000
+        X = rng.standard_normal((n, config['RAW_FLOAT_PER_SPLAT'])).astype(np.float32)
+        X[:, 3] = rng.uniform(0, 1, n)
+        X[:, 4:6] = rng.uniform(0.01, 2.0, (n, 2))
+        X[:, 13:22] *= 0.3
+        X[:, 22:28] = rng.uniform(0, 1, (n, 6))
+        lo, hi = X[:, :3].min(axis=0), X[:, :3].max(axis=0)
+
+        raw_data, vcount = _pack_data(X, 2, bounds=(lo, hi))
+        self.assertEqual(raw_data.nbytes, n * 32)
+        w = raw_data.reshape((vcount, 8))
+
+        # positions: one 16-bit step
+        q = np.stack([w[:, 0] & 0xFFFF, w[:, 0] >> 16, w[:, 1] & 0xFFFF], axis=1) / 65535.0
+        np.testing.assert_allclose(lo + q * (hi - lo), X[:, :3], atol=float((hi - lo).max()) / 65535)
+
+        # 8-bit fields
+        unorm8 = lambda word, shift: ((word >> shift) & 0xFF) / 255.0
+        np.testing.assert_allclose(unorm8(w[:, 1], 16), X[:, 3], atol=0.5 / 255 + 1e-6)
+        np.testing.assert_allclose(unorm8(w[:, 1], 24), X[:, 22], atol=0.5 / 255 + 1e-6)
+        np.testing.assert_allclose(unorm8(w[:, 2], 24), X[:, 23], atol=0.5 / 255 + 1e-6)
+        np.testing.assert_allclose(unorm8(w[:, 3], 24), X[:, 24], atol=0.5 / 255 + 1e-6)
+
+        # rotation * scale, decoded as in splat.vert, against the full layout
+        largest = w[:, 4] & 3
+        rest = (np.stack([(w[:, 4] >> s) & 0x3FF for s in (2, 12, 22)], axis=1) / 1023.0 * 2 - 1) * np.sqrt(0.5)
+        quat = np.zeros((n, 4))
+        quat[np.arange(n), largest] = np.sqrt(np.maximum(0, 1 - (rest ** 2).sum(axis=1)))
+        for k in range(3):
+            quat[np.arange(n), (largest + k + 1) % 4] = rest[:, k]
+        qw, qx, qy, qz = quat.T
+        scale = w[:, 5:6].view(np.float16).astype(np.float32)
+        rs = np.stack([
+            (1 - 2*(qy*qy + qz*qz)) * scale[:, 0], (2*(qx*qy - qw*qz)) * scale[:, 1],
+            (2*(qx*qy + qw*qz)) * scale[:, 0], (1 - 2*(qx*qx + qz*qz)) * scale[:, 1],
+            (2*(qx*qz - qw*qy)) * scale[:, 0], (2*(qy*qz + qw*qx)) * scale[:, 1],
+        ], axis=1)
+        full, _ = _pack_data(X, 4)
+        rs_full = full.reshape((n, 16))[:, 4:7].copy().view(np.float16).astype(np.float32)
+        np.testing.assert_allclose(rs, rs_full, atol=0.01 * 2.0)
+
+        # SH1: snorm7 over [-1, 1], clamped outside
+        bits = w[:, 6].astype(np.uint64) | (w[:, 7].astype(np.uint64) << np.uint64(32))
+        sh = np.stack([((bits >> np.uint64(7 * k)) & np.uint64(0x7F)).astype(np.float32) for k in range(9)], axis=1)
+        np.testing.assert_allclose((sh - 64) / 63, np.clip(X[:, 13:22], -1, 1), atol=0.5 / 63 + 1e-6)
+
+    def test_parallel_shards_match_serial(self):
+        rng = np.random.default_rng(1)
+        X = rng.standard_normal((50000, config['RAW_FLOAT_PER_SPLAT'])).astype(np.float32)
+        transform = np.diag([1.0, -1.0, -1.0, 1.0]).astype(np.float32)
+        pixels = config['PACKED_PIX_PER_SPLAT']
+
+        serial, parallel = X.copy(), X.copy()
+        transform_splats(serial, transform, workers=1)
+        transform_splats(parallel, transform, workers=3)
+        np.testing.assert_array_equal(serial, parallel)
+
+        raw_serial, _ = _pack_data(serial, pixels, workers=1)
+        raw_parallel, _ = _pack_data(parallel, pixels, workers=3)
+        np.testing.assert_array_equal(raw_serial, raw_parallel)
+
     @patch('src.scripts.load_resource.np.load')
     def test_load_map(self, mock_load):
         fake_map = np.ones((6, 128, 128, 3), dtype=np.float32)  # RGB format without alpha
@@ -151,5 +294,306 @@ class TestLoadPly(unittest.TestCase):
         args, _ = mock_load.call_args
         self.assertTrue(args[0].endswith(os.path.join('res', 'test', 'map1.npz')))
 
+
+class TestChunkEndpoints(unittest.TestCase):
+
+    def setUp(self):
+        # endpoints resolve res/<scene>/... against the working directory
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        os.makedirs('res/scene/chunks')
+
+        self.raw = {}
+        entries = []
+        for i, chunk_id in enumerate(['0_0_0', '1_0_0', '0_1_0']):
+            raw = np.full((i + 1) * 16, i, dtype=np.uint32)
+            np.savez(f'res/scene/chunks/{chunk_id}.npz', raw_data=raw)
+            self.raw[chunk_id] = raw
+            entries.append({
+                'id': chunk_id, 'file': f'{chunk_id}.npz', 'vertexCount': i + 1,
+                'bounds': {'min': [0, 0, 0], 'max': [1, 1, 1]},
+            })
+        with open('res/scene/chunks/metadata.json', 'w') as f:
+            json.dump({'chunks': entries, 'trunk_size': 1.0, 'total_vertex': 6}, f)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_load_chunks_frames(self):
+        res = self.client.get('/load_chunks', params={'filename': 'scene', 'chunk_ids': '1_0_0,0_1_0,1_0_0'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.headers['n-chunks'], '2')
+
+        frames = list(iter_frames(res.content))
+        self.assertEqual([f[0] for f in frames], ['1_0_0', '0_1_0'])
+        for chunk_id, vertex_count, data in frames:
+            self.assertEqual(data, self.raw[chunk_id].tobytes())
+            self.assertEqual(vertex_count * 64, len(data))
+
+    def test_get_chunk_meta(self):
+        res = self.client.get('/get_chunk_meta', params={'filename': 'scene'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([c['id'] for c in res.json()['chunks']], ['0_0_0', '1_0_0', '0_1_0'])
+        self.assertEqual(self.client.get('/get_chunk_meta', params={'filename': 'missing'}).status_code, 404)
+
+    def test_visible_chunks(self):
+        # identity view-projection: the visible volume is the [-1, 1] cube
+        eye = ','.join(map(str, np.eye(4).flatten()))
+        res = self.client.get('/visible_chunks', params={'filename': 'scene', 'view_proj': eye, 'camera': '0,0,0'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['ids'], ['0_0_0', '1_0_0', '0_1_0'])
+        self.assertEqual(res.json()['vertexCount'], [1, 2, 3])
+
+        bad = self.client.get('/visible_chunks', params={'filename': 'scene', 'view_proj': '1,2'})
+        self.assertEqual(bad.status_code, 422)
+
+    def test_prefetch_warms_cache(self):
+        res = self.client.get('/prefetch_chunks', params={'filename': 'scene', 'position': '0,0,0', 'budget': 1 << 20})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(sorted(res.json()['ids']), ['0_0_0', '0_1_0', '1_0_0'])
+        self.assertEqual(res.json()['bytes'], 6 * 64)
+
+        # background task has already run: the chunk is served from memory
+        hits = _get_memory_cache().stats()['hits']
+        self.client.get('/load_chunk', params={'filename': 'scene', 'chunk_id': '0_1_0'})
+        self.assertEqual(_get_memory_cache().stats()['hits'], hits + 1)
+
+    def test_load_chunks_unknown_id(self):
+        res = self.client.get('/load_chunks', params={'filename': 'scene', 'chunk_ids': '0_0_0,9_9_9'})
+        self.assertEqual(res.status_code, 404)
+
+    def test_compact_chunk_headers(self):
+        with open('res/scene/chunks/metadata.json') as f:
+            metadata = json.load(f)
+        metadata['packing'] = 'compact'
+        metadata['chunks'][2]['bounds'] = {'min': [0, 1, 2], 'max': [3, 4, 5]}
+        with open('res/scene/chunks/metadata.json', 'w') as f:
+            json.dump(metadata, f)
+
+        res = self.client.get('/load_chunk', params={'filename': 'scene', 'chunk_id': '0_1_0'})
+        self.assertEqual(res.headers['splat-packing'], 'compact')
+        self.assertEqual([float(v) for v in res.headers['splat-bounds'].split(',')], [0, 1, 2, 3, 4, 5])
+        self.assertEqual(res.headers['n-channels'], '8')
+        self.assertEqual(self.client.get('/get_chunk_meta', params={'filename': 'scene'}).json()['packing'], 'compact')
+
+    def _update_metadata(self, **changes):
+        with open('res/scene/chunks/metadata.json') as f:
+            metadata = json.load(f)
+        metadata.update(changes)
+        with open('res/scene/chunks/metadata.json', 'w') as f:
+            json.dump(metadata, f)
+
+    def _store_gzip_variants(self):
+        # what separate_trunk.py --encodings gzip --shuffled stores
+        for chunk_id, raw in self.raw.items():
+            with open(f'res/scene/chunks/{chunk_id}.bin.gz', 'wb') as f:
+                f.write(encode_bytes(raw.tobytes(), 'gzip'))
+            with open(f'res/scene/chunks/{chunk_id}.shuffled.bin.gz', 'wb') as f:
+                f.write(encode_bytes(shuffle_bytes(raw.tobytes(), 64), 'gzip'))
+        self._update_metadata(encodings=['gzip'], shuffled=True)
+
+    def test_load_chunks_compressed_frames(self):
+        import gzip
+        self._store_gzip_variants()
+        params = {'filename': 'scene', 'chunk_ids': '1_0_0,0_1_0'}
+
+        # only a client that decodes frames itself gets compressed ones
+        res = self.client.get('/load_chunks', params=params, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(res.headers['frame-encoding'], 'identity')
+        self.assertIn('Accept-Encoding', res.headers['vary'])
+
+        res = self.client.get('/load_chunks', params={**params, 'frame_encodings': 'gzip'},
+                              headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(res.headers['frame-encoding'], 'gzip')
+        self.assertNotIn('content-encoding', res.headers)
+        frames = list(iter_frames(res.content))
+        self.assertEqual([f[0] for f in frames], ['1_0_0', '0_1_0'])
+        for chunk_id, vertex_count, data in frames:
+            self.assertEqual(gzip.decompress(data), self.raw[chunk_id].tobytes())
+            self.assertEqual(vertex_count * 64, len(self.raw[chunk_id].tobytes()))
+
+        # the coding must also be acceptable to the request
+        res = self.client.get('/load_chunks', params={**params, 'frame_encodings': 'gzip'},
+                              headers={'Accept-Encoding': 'identity'})
+        self.assertEqual(res.headers['frame-encoding'], 'identity')
+
+    def test_stored_variants_only(self):
+        # no stored variants: served as is, never compressed per request
+        res = self.client.get('/load_chunk', params={'filename': 'scene', 'chunk_id': '1_0_0'},
+                              headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('content-encoding', res.headers)
+        self.assertEqual(res.content, self.raw['1_0_0'].tobytes())
+
+        self._store_gzip_variants()
+
+        res = self.client.get('/load_chunk', params={'filename': 'scene', 'chunk_id': '1_0_0'},
+                              headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(res.headers['content-encoding'], 'gzip')
+        self.assertEqual(res.content, self.raw['1_0_0'].tobytes())
+        res = self.client.get('/load_chunk', params={'filename': 'scene', 'chunk_id': '0_1_0', 'shuffle': 1},
+                              headers={'Accept-Encoding': 'gzip'})
+        self.assertTrue(res.headers['splat-layout'].startswith('shuffled;stride=64'))
+        self.assertEqual(res.content, shuffle_bytes(self.raw['0_1_0'].tobytes(), 64))
+
+        # a coding the build did not store is never offered
+        res = self.client.get('/load_chunk', params={'filename': 'scene', 'chunk_id': '1_0_0'},
+                              headers={'Accept-Encoding': 'br'})
+        self.assertNotIn('content-encoding', res.headers)
+
+    def test_map_is_served_from_stored_variants(self):
+        from src.scripts._synthetic import write_synthetic_map
+        write_synthetic_map('res/scene/map1.npz', size=8)
+        expected = _load_map('scene').tobytes()
+        self.addCleanup(_get_memory_cache().clear)
+
+        with patch.dict(config, {'PRECOMPRESS_ENCODINGS': ['gzip']}), patch.object(_get_memory_cache(), 'budget', 0):
+            res = self.client.get('/map', params={'filename': 'scene'}, headers={'Accept-Encoding': 'gzip'})
+            self.assertEqual(res.headers['content-encoding'], 'gzip')
+            self.assertEqual(res.headers['width'], '8')
+            self.assertEqual(res.content, expected)
+            with open('res/scene/map1_rgba.json') as f:
+                meta = json.load(f)
+            self.assertIn('gzip', meta['variants']['packed'])
+
+            # nothing fits in memory: the stored file is streamed, neither
+            # rebuilt nor compressed again
+            res = self.client.get('/map', params={'filename': 'scene'}, headers={'Accept-Encoding': 'gzip'})
+            self.assertEqual(res.content, expected)
+            stages = [part.split(';')[0] for part in res.headers['server-timing'].split(', ')]
+            self.assertNotIn('load', stages)
+            self.assertNotIn('compress', stages)
+
+    def test_archive_layout(self):
+        bounds = np.zeros((2, 3), dtype=np.float32)
+        write_archive('res/scene/chunks', [(i, raw, raw.size // 16, bounds) for i, raw in self.raw.items()])
+        write_archive('res/scene/chunks', [
+            (i, encode_bytes(raw.tobytes(), 'gzip'), raw.size // 16, bounds) for i, raw in self.raw.items()
+        ], variant=archive_variant('gzip'))
+        for chunk_id in self.raw:
+            os.remove(f'res/scene/chunks/{chunk_id}.npz')
+        with open('res/scene/chunks/metadata.json') as f:
+            metadata = json.load(f)
+        for entry in metadata['chunks']:
+            entry['file'] = 'chunks.bin'
+        metadata['layout'] = 'archive'
+        metadata['encodings'] = ['gzip']
+        with open('res/scene/chunks/metadata.json', 'w') as f:
+            json.dump(metadata, f)
+
+        res = self.client.get('/load_chunk', params={'filename': 'scene', 'chunk_id': '0_1_0'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, self.raw['0_1_0'].tobytes())
+
+        res = self.client.get('/load_chunks', params={'filename': 'scene', 'chunk_ids': '1_0_0,0_0_0'})
+        frames = list(iter_frames(res.content))
+        self.assertEqual([(f[0], f[2]) for f in frames],
+                         [(i, self.raw[i].tobytes()) for i in ['1_0_0', '0_0_0']])
+
+        res = self.client.get('/load_chunk', params={'filename': 'scene', 'chunk_id': '0_1_0'},
+                              headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(res.headers['content-encoding'], 'gzip')
+        self.assertEqual(res.content, self.raw['0_1_0'].tobytes())
+
+    def test_block_bounds(self):
+        res = self.client.get('/block_bounds', params={'filename': 'scene', 'chunk_id': '0_1_0'})
+        self.assertEqual(res.status_code, 404)
+
+        boxes = np.arange(3 * 6, dtype=np.float32).reshape(3, 2, 3)
+        boxes.tofile('res/scene/chunks/blocks.bin')
+        with open('res/scene/chunks/metadata.json') as f:
+            metadata = json.load(f)
+        metadata['block_splats'] = 2
+        for entry, blocks in zip(metadata['chunks'], [[0, 1], [1, 1], [2, 1]]):
+            entry['blocks'] = blocks
+        with open('res/scene/chunks/metadata.json', 'w') as f:
+            json.dump(metadata, f)
+
+        res = self.client.get('/block_bounds', params={'filename': 'scene', 'chunk_id': '0_1_0'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual((res.headers['n-blocks'], res.headers['block-splats']), ('1', '2'))
+        self.assertEqual(res.content, boxes[2].tobytes())
+        self.assertEqual(self.client.get('/get_chunk_meta', params={'filename': 'scene'}).json()['block_splats'], 2)
+
+    def test_server_timing_and_metrics(self):
+        res = self.client.get('/load_chunk', params={'filename': 'scene', 'chunk_id': '1_0_0'},
+                              headers={'Accept-Encoding': 'gzip'})
+        stages = [part.split(';')[0] for part in res.headers['server-timing'].split(', ')]
+        self.assertIn('manifest', stages)
+        # timed on the offload pool into the job's own timer, then merged
+        self.assertIn('body', stages)
+        self.assertEqual(stages[-1], 'total')
+
+        text = self.client.get('/metrics').text
+        self.assertIn('splat_request_seconds_count{endpoint="load_chunk"}', text)
+        self.assertIn('splat_stage_seconds_bucket{endpoint="load_chunk",stage="manifest",le="+Inf"}', text)
+        self.assertRegex(text, r'splat_cache_requests_total\{endpoint="load_chunk",result="(disk|memory)"\}')
+        self.assertIn('splat_memory_cache_budget_bytes', text)
+        self.assertIn('# TYPE splat_memory_cache_hits_total counter', text)
+        self.assertIn('# TYPE splat_memory_cache_entries gauge', text)
+
+        with patch.dict(config, {'METRICS_ENABLED': False}):
+            res = self.client.get('/load_chunk', params={'filename': 'scene', 'chunk_id': '1_0_0'})
+            self.assertNotIn('server-timing', res.headers)
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    def test_saturated_pool_returns_503(self):
+        import threading
+        from src.scripts import load_resource
+        from src.scripts._offload import OffloadPool
+
+        warm = self.client.get('/load_chunk', params={'filename': 'scene', 'chunk_id': '0_0_0'})
+        self.assertEqual(warm.status_code, 200)
+
+        pool = OffloadPool(workers=1, queue=0, retry_after=3)
+        gate = threading.Event()
+        try:
+            with patch.object(load_resource, '_offload_pool', pool):
+                pool.submit('busy', gate.wait, 5)
+                res = self.client.get('/load_chunk', params={'filename': 'scene', 'chunk_id': '1_0_0'})
+                self.assertEqual(res.status_code, 503)
+                self.assertEqual(res.headers['retry-after'], '3')
+                # a batch is refused before its stream starts
+                res = self.client.get('/load_chunks', params={'filename': 'scene', 'chunk_ids': '1_0_0,0_0_0'})
+                self.assertEqual(res.status_code, 503)
+
+                # payloads already in memory never need the pool
+                res = self.client.get('/load_chunk', params={'filename': 'scene', 'chunk_id': '0_0_0'})
+                self.assertEqual(res.status_code, 200)
+                self.assertEqual(res.content, self.raw['0_0_0'].tobytes())
+                res = self.client.get('/load_chunks', params={'filename': 'scene', 'chunk_ids': '0_0_0'})
+                self.assertEqual([f[2] for f in iter_frames(res.content)], [self.raw['0_0_0'].tobytes()])
+        finally:
+            gate.set()
+            pool.shutdown()
+
+    def test_prewarm_and_ready(self):
+        import time
+        from src.scripts._synthetic import write_synthetic_ply, write_synthetic_map
+        write_synthetic_ply('res/scene/point_cloud.ply', 2000, seed=3)
+        write_synthetic_map('res/scene/map1.npz', size=8)
+        self.addCleanup(_get_memory_cache().clear)
+
+        with patch.dict(config, {'PREWARM': True, 'PREWARM_SCENES': [], 'PREWARM_PIN': ['scene']}):
+            with TestClient(app) as client:
+                deadline = time.time() + 30
+                res = client.get('/ready')
+                while res.status_code == 503 and time.time() < deadline:
+                    time.sleep(0.05)
+                    res = client.get('/ready')
+                self.assertEqual(res.status_code, 200)
+                scene = res.json()['scenes']['scene']
+                self.assertEqual(scene['status'], 'ready')
+                self.assertEqual(scene['steps']['chunks']['chunks'], 3)
+                self.assertEqual(scene['steps']['ply']['full'], 'build')
+                self.assertEqual(_get_memory_cache().stats()['pinned'], 2)
+
+                # the first visitor is served from the pinned body: no stages ran
+                res = client.get('/ply', params={'filename': 'scene'}, headers={'Accept-Encoding': 'gzip, deflate, br, zstd'})
+                self.assertEqual(res.status_code, 200)
+                self.assertTrue(res.headers['server-timing'].startswith('total;'))
+
 if __name__ == '__main__':
     unittest.main()
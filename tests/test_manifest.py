@@ -0,0 +1,80 @@
+import unittest
+import tempfile
+import json
+import numpy as np
+
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, project_root)
+
+from src.scripts._manifest import ManifestCache
+
+
+def _write_metadata(res_dir, chunks):
+    os.makedirs(os.path.join(res_dir, 'scene', 'chunks'), exist_ok=True)
+    with open(os.path.join(res_dir, 'scene', 'chunks', 'metadata.json'), 'w') as f:
+        json.dump({'chunks': chunks, 'trunk_size': 2.0, 'total_vertex': sum(c['vertexCount'] for c in chunks)}, f)
+
+
+def _chunk(chunk_id, lo, hi, count):
+    return {'id': chunk_id, 'file': f'{chunk_id}.npz', 'bounds': {'min': lo, 'max': hi}, 'vertexCount': count}
+
+
+class TestManifestCache(unittest.TestCase):
+
+    def test_index_and_bounds(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            _write_metadata(tmp, [
+                _chunk('0_0_0', [0, 0, 0], [2, 2, 2], 5),
+                _chunk('1_0_0', [2, 0, 0], [4, 2, 2], 7),
+            ])
+            manifest = ManifestCache(tmp).get('scene')
+
+            self.assertEqual(manifest.entry('1_0_0')['vertexCount'], 7)
+            self.assertIsNone(manifest.entry('9_9_9'))
+            self.assertEqual(manifest.bounds.shape, (2, 2, 3))
+            np.testing.assert_array_equal(manifest.bounds[1], [[2, 0, 0], [4, 2, 2]])
+            np.testing.assert_array_equal(manifest.vertex_counts, [5, 7])
+
+            body = json.loads(manifest.meta_body)
+            self.assertEqual(body['scene'], 'scene')
+            self.assertEqual(body['total_vertex'], 12)
+            self.assertEqual([c['id'] for c in body['chunks']], ['0_0_0', '1_0_0'])
+
+    def test_hierarchy_passthrough(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            chunk = {**_chunk('r0', [0, 0, 0], [1, 1, 1], 3), 'depth': 1, 'parent': 'r'}
+            _write_metadata(tmp, [chunk])
+            path = os.path.join(tmp, 'scene', 'chunks', 'metadata.json')
+            with open(path) as f:
+                metadata = json.load(f)
+            metadata.update({'partition': 'octree', 'max_splats': 4, 'nodes': [{'id': 'r', 'children': ['r0']}]})
+            with open(path, 'w') as f:
+                json.dump(metadata, f)
+
+            body = json.loads(ManifestCache(tmp).get('scene').meta_body)
+            self.assertEqual(body['partition'], 'octree')
+            self.assertEqual(body['nodes'][0]['children'], ['r0'])
+            self.assertEqual(body['chunks'][0]['parent'], 'r')
+
+    def test_reloads_only_on_change(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            _write_metadata(tmp, [_chunk('0_0_0', [0, 0, 0], [2, 2, 2], 5)])
+            cache = ManifestCache(tmp)
+            first = cache.get('scene')
+            self.assertIs(cache.get('scene'), first)
+
+            _write_metadata(tmp, [_chunk('0_0_0', [0, 0, 0], [2, 2, 2], 5), _chunk('0_1_0', [0, 2, 0], [2, 4, 2], 1)])
+            path = cache.metadata_path('scene')
+            st = os.stat(path)
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+            self.assertEqual(cache.get('scene').ids, ['0_0_0', '0_1_0'])
+
+    def test_missing_metadata(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(FileNotFoundError):
+                ManifestCache(tmp).get('scene')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, project_root)
+
+from src.scripts._metrics import NULL_TIMER, MetricsRegistry, StageTimer
+
+
+class TestStageTimer(unittest.TestCase):
+
+    def test_header_accumulates_stages(self):
+        timer = StageTimer()
+        for _ in range(3):
+            with timer.stage("read"):
+                pass
+        with timer.stage("pack"):
+            pass
+        parts = timer.header().split(", ")
+        self.assertEqual([p.split(";")[0] for p in parts], ["read", "pack", "total"])
+        self.assertTrue(all(p.split(";")[1].startswith("dur=") for p in parts))
+
+    def test_merge_adds_job_stages(self):
+        timer, job = StageTimer(), StageTimer()
+        with timer.stage("offload"):
+            pass
+        with job.stage("body"):
+            pass
+        job.cache_result("disk")
+        timer.merge(job)
+        self.assertEqual(list(timer.stages), ["offload", "body"])
+        self.assertEqual(timer.stages["body"], job.stages["body"])
+        self.assertEqual(timer.cache, "disk")
+
+    def test_null_timer_records_nothing(self):
+        with NULL_TIMER.stage("read"):
+            pass
+        NULL_TIMER.cache_result("memory")
+        self.assertFalse(NULL_TIMER.enabled)
+        self.assertIsNone(NULL_TIMER.header())
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_render(self):
+        registry = MetricsRegistry()
+        registry.histogram("req_seconds", "Request time", buckets=(0.1, 1.0))
+        registry.counter("hits_total", "Hits")
+        for value in (0.05, 0.1, 0.5, 2.0):
+            registry.observe("req_seconds", value, endpoint="ply")
+        registry.inc("hits_total", endpoint="ply", result="memory")
+        registry.inc("hits_total", endpoint="ply", result="memory")
+
+        lines = registry.render({"cache_bytes": ("Cached", 42)}, {"evictions_total": ("Evicted", 3)}).splitlines()
+        self.assertIn("# TYPE req_seconds histogram", lines)
+        # buckets are cumulative and upper-inclusive
+        self.assertIn('req_seconds_bucket{endpoint="ply",le="0.1"} 2', lines)
+        self.assertIn('req_seconds_bucket{endpoint="ply",le="1"} 3', lines)
+        self.assertIn('req_seconds_bucket{endpoint="ply",le="+Inf"} 4', lines)
+        self.assertIn('req_seconds_count{endpoint="ply"} 4', lines)
+        self.assertIn('req_seconds_sum{endpoint="ply"} 2.650000', lines)
+        self.assertIn('hits_total{endpoint="ply",result="memory"} 2', lines)
+        self.assertIn("# TYPE cache_bytes gauge", lines)
+        self.assertIn("cache_bytes 42", lines)
+        self.assertIn("# TYPE evictions_total counter", lines)
+        self.assertIn("evictions_total 3", lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
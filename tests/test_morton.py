@@ -0,0 +1,73 @@
+import unittest
+import numpy as np
+
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, project_root)
+
+from src.scripts._morton import BlockBoundsBuilder, block_bounds, check_order, morton_codes, morton_order
+
+
+def interleave(x: int, y: int, z: int) -> int:
+    code = 0
+    for bit in range(21):
+        code |= ((x >> bit) & 1) << (3 * bit)
+        code |= ((y >> bit) & 1) << (3 * bit + 1)
+        code |= ((z >> bit) & 1) << (3 * bit + 2)
+    return code
+
+
+class TestMortonCodes(unittest.TestCase):
+
+    def test_codes_interleave_quantized_axes(self):
+        rng = np.random.default_rng(0)
+        q = rng.integers(0, 1 << 21, (200, 3))
+        scale = (1 << 21) - 1
+        # points exactly on the quantization grid of the [0, scale] box
+        codes = morton_codes(q.astype(np.float64), lo=[0, 0, 0], hi=[scale] * 3)
+        self.assertEqual(codes.tolist(), [interleave(*map(int, row)) for row in q])
+
+    def test_nan_and_empty(self):
+        points = np.array([[np.nan, 1.0, 1.0], [0.0, 0.0, 0.0], [1.0, 1.0, 1.0]], dtype=np.float32)
+        codes = morton_codes(points)
+        self.assertEqual(codes[0], interleave(0, (1 << 21) - 1, (1 << 21) - 1))
+        self.assertEqual(morton_codes(np.zeros((0, 3))).shape, (0,))
+
+    def test_order_improves_block_locality(self):
+        rng = np.random.default_rng(1)
+        points = rng.uniform(0, 10, (8192, 3)).astype(np.float32)
+
+        def mean_volume(p):
+            boxes = block_bounds(p, 256)
+            return np.prod(boxes[:, 1] - boxes[:, 0], axis=1).mean()
+
+        order = morton_order(points)
+        self.assertEqual(sorted(order.tolist()), list(range(len(points))))
+        self.assertLess(mean_volume(points[order]), mean_volume(points) / 10)
+
+    def test_check_order(self):
+        self.assertEqual(check_order('morton'), 'morton')
+        with self.assertRaises(ValueError):
+            check_order('hilbert')
+
+
+class TestBlockBounds(unittest.TestCase):
+
+    def test_short_last_block(self):
+        points = np.arange(30, dtype=np.float32).reshape(10, 3)
+        boxes = block_bounds(points, 4)
+        self.assertEqual(boxes.shape, (3, 2, 3))
+        np.testing.assert_array_equal(boxes[2], [points[8], points[9]])
+
+    def test_builder_matches_one_shot(self):
+        rng = np.random.default_rng(2)
+        points = rng.standard_normal((5000, 3)).astype(np.float32)
+        builder = BlockBoundsBuilder(64)
+        for start in range(0, len(points), 777):
+            builder.add(points[start:start + 777])
+        np.testing.assert_array_equal(builder.result(), block_bounds(points, 64))
+        self.assertEqual(BlockBoundsBuilder(64).result().shape, (0, 2, 3))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import asyncio
+import threading
+
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, project_root)
+
+from src.scripts._offload import OffloadPool, Saturated
+
+
+class TestOffloadPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = OffloadPool(workers=2, queue=0, retry_after=1.5)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_single_flight(self):
+        gate = threading.Event()
+        calls = []
+
+        def build():
+            calls.append(1)
+            gate.wait(5)
+            return "packed"
+
+        async def scenario():
+            tasks = [asyncio.ensure_future(self.pool.run("scene", build)) for _ in range(8)]
+            await asyncio.sleep(0.05)
+            gate.set()
+            return await asyncio.gather(*tasks)
+
+        self.assertEqual(asyncio.run(scenario()), ["packed"] * 8)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.pool.stats()["joined"], 7)
+        self.assertEqual(self.pool.stats()["pending"], 0)
+
+        # a finished key runs again
+        asyncio.run(self.pool.run("scene", build))
+        self.assertEqual(len(calls), 2)
+
+    def test_exception_reaches_every_waiter(self):
+        def fail():
+            raise FileNotFoundError("point_cloud.ply")
+
+        async def scenario():
+            return await asyncio.gather(*(self.pool.run("scene", fail) for _ in range(3)), return_exceptions=True)
+
+        self.assertTrue(all(isinstance(r, FileNotFoundError) for r in asyncio.run(scenario())))
+
+    def test_admission(self):
+        gate = threading.Event()
+        held = [self.pool.submit(key, gate.wait, 5) for key in ("a", "b")]
+        with self.assertRaises(Saturated) as ctx:
+            self.pool.submit("c", gate.wait, 5)
+        self.assertEqual(ctx.exception.header(), "2")
+        # joining work already in flight is still admitted
+        self.assertIs(self.pool.submit("a", gate.wait, 5), held[0])
+        self.assertEqual(self.pool.stats()["rejected"], 1)
+
+        gate.set()
+        for future in held:
+            future.result(5)
+        self.pool.submit("c", lambda: None).result(5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, project_root)
+
+from src.scripts._partition import grid_partition, octree_partition
+
+
+class TestGridPartition(unittest.TestCase):
+
+    def test_cells_match_floor_keys(self):
+        rng = np.random.default_rng(1)
+        points = rng.uniform(-5, 7, (2000, 3)).astype(np.float32)
+        cells = grid_partition(points, 2.0)
+
+        keys = [tuple(int(v) for v in c.id.split('_')) for c in cells]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(sum(c.rows.size for c in cells), len(points))
+        for cell in cells:
+            self.assertTrue(np.all(np.diff(cell.rows) > 0))
+            p = points[cell.rows]
+            self.assertTrue(np.all(p >= cell.lo) and np.all(p < cell.hi))
+            np.testing.assert_array_equal(cell.hi - cell.lo, [2.0, 2.0, 2.0])
+
+
+class TestOctreePartition(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # a dense cluster in one corner plus a sparse background
+        self.points = np.concatenate([
+            rng.uniform(0, 1, (3000, 3)),
+            rng.uniform(0, 16, (300, 3)),
+        ]).astype(np.float32)
+
+    def test_leaves_cover_every_row_once(self):
+        leaves, nodes = octree_partition(self.points, max_splats=256)
+        rows = np.concatenate([leaf.rows for leaf in leaves])
+        self.assertEqual(sorted(rows.tolist()), list(range(len(self.points))))
+        self.assertTrue(all(leaf.rows.size <= 256 for leaf in leaves))
+
+        for leaf in leaves:
+            p = self.points[leaf.rows]
+            self.assertTrue(np.all(p >= leaf.lo - 1e-6) and np.all(p <= leaf.hi + 1e-6))
+
+    def test_hierarchy_links(self):
+        leaves, nodes = octree_partition(self.points, max_splats=256)
+        by_id = {node["id"]: node for node in nodes}
+        self.assertIsNone(by_id["r"]["parent"])
+        for leaf in leaves:
+            self.assertIn(leaf.id, by_id[leaf.parent]["children"])
+            self.assertEqual(leaf.depth, by_id[leaf.parent]["depth"] + 1)
+
+    def test_sparse_siblings_are_merged(self):
+        merged, _ = octree_partition(self.points, max_splats=256, min_splats=64)
+        unmerged, _ = octree_partition(self.points, max_splats=256, min_splats=1)
+        self.assertLess(len(merged), len(unmerged))
+        self.assertTrue(any("m" in leaf.id for leaf in merged))
+
+    def test_identical_points_stop_at_max_depth(self):
+        leaves, _ = octree_partition(np.zeros((10, 3), dtype=np.float32), max_splats=2, max_depth=3)
+        self.assertEqual(sum(leaf.rows.size for leaf in leaves), 10)
+
+if __name__ == '__main__':
+    unittest.main()
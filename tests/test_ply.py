@@ -0,0 +1,62 @@
+import unittest
+import tempfile
+import numpy as np
+from plyfile import PlyData, PlyElement
+
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, project_root)
+
+from src.scripts._ply import read_ply_header, read_ply_vertices
+
+VERTEX_DTYPE = [
+    ('x', 'f4'), ('y', 'f4'), ('z', 'f4'), ('opacity', 'f4'),
+    ('scale_0', 'f4'), ('scale_1', 'f4'),
+    ('rot_0', 'f4'), ('rot_1', 'f4'), ('rot_2', 'f4'), ('rot_3', 'f4'),
+]
+
+
+def _write_ply(path, data, text=False, byte_order='<'):
+    PlyData([PlyElement.describe(data, 'vertex')], text=text, byte_order=byte_order).write(path)
+
+
+class TestPlyReader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        self.data = np.zeros(64, dtype=VERTEX_DTYPE)
+        for name in self.data.dtype.names:
+            self.data[name] = rng.standard_normal(64).astype(np.float32)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_binary_little_endian_is_memmapped(self):
+        path = os.path.join(self.tmp.name, 'point_cloud.ply')
+        _write_ply(path, self.data)
+
+        header = read_ply_header(path)
+        self.assertEqual(header.format, 'binary_little_endian')
+        self.assertEqual(header.element('vertex').count, 64)
+
+        v = read_ply_vertices(path)
+        self.assertIsInstance(v, np.memmap)
+        # columns are strided views into the mapping, not copies
+        self.assertFalse(v['x'].flags['OWNDATA'])
+        for name in self.data.dtype.names:
+            np.testing.assert_array_equal(v[name], self.data[name])
+        del v
+
+    def test_fallback_formats(self):
+        for text, byte_order in [(True, '='), (False, '>')]:
+            path = os.path.join(self.tmp.name, f'point_cloud_{text}.ply')
+            _write_ply(path, self.data, text=text, byte_order=byte_order)
+
+            v = read_ply_vertices(path)
+            for name in self.data.dtype.names:
+                np.testing.assert_allclose(v[name], self.data[name], rtol=1e-6)
+
+if __name__ == '__main__':
+    unittest.main()
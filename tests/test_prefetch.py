@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, project_root)
+
+from src.scripts._prefetch import extrapolate_path, plan_prefetch
+
+
+def _boxes(centers, half=0.5):
+    c = np.asarray(centers, dtype=np.float32)[:, None, :]
+    return np.concatenate([c - half, c + half], axis=1)
+
+
+# a row of unit chunks along x, camera at the origin
+BOUNDS = _boxes([[-3, 0, 0], [0, 0, 0], [3, 0, 0], [6, 0, 0], [20, 0, 0], [0, 0, 9]])
+SIZES = np.full(len(BOUNDS), 100)
+
+
+class TestPrefetch(unittest.TestCase):
+
+    def test_extrapolate_path(self):
+        path, t = extrapolate_path([1, 0, 0], [2, 0, 0], horizon=1.0, steps=3)
+        np.testing.assert_allclose(path[:, 0], [1, 2, 3])
+        np.testing.assert_allclose(t, [0, 0.5, 1])
+
+    def test_ranks_along_motion(self):
+        rows = plan_prefetch(BOUNDS, SIZES, [0, 0, 0], [4, 0, 0], horizon=2.0, radius=1.0)
+        # boxes ahead in travel order; the one behind, the one past the
+        # horizon and the one off to the side are out of range
+        self.assertEqual(rows.tolist(), [1, 2, 3])
+
+    def test_heading_prefers_view_direction(self):
+        ahead = plan_prefetch(BOUNDS, SIZES, [0, 0, 0], [0, 0, 0], heading=[1, 0, 0], radius=4.0)
+        behind = plan_prefetch(BOUNDS, SIZES, [0, 0, 0], [0, 0, 0], heading=[-1, 0, 0], radius=4.0)
+        self.assertLess(ahead.tolist().index(2), ahead.tolist().index(0))
+        self.assertLess(behind.tolist().index(0), behind.tolist().index(2))
+
+    def test_byte_budget_keeps_prefix(self):
+        full = plan_prefetch(BOUNDS, SIZES, [0, 0, 0], [4, 0, 0], radius=1.0)
+        cut = plan_prefetch(BOUNDS, SIZES, [0, 0, 0], [4, 0, 0], radius=1.0, budget_bytes=250)
+        self.assertEqual(cut.tolist(), full.tolist()[:2])
+        self.assertEqual(len(full), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import tempfile
+
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, project_root)
+
+from src.scripts._prewarm import PrewarmStatus, discover_scenes
+
+
+class TestPrewarm(unittest.TestCase):
+
+    def test_discover_scenes(self):
+        with tempfile.TemporaryDirectory() as res:
+            os.makedirs(os.path.join(res, 'full', 'chunks'))
+            for rel in ('point_cloud.ply', 'map1.npz', os.path.join('chunks', 'metadata.json')):
+                open(os.path.join(res, 'full', rel), 'wb').close()
+            os.makedirs(os.path.join(res, 'chunked', 'chunks'))
+            open(os.path.join(res, 'chunked', 'chunks', 'metadata.json'), 'wb').close()
+            os.makedirs(os.path.join(res, 'empty'))
+            for generated in ('bench_1m', 'synth5m'):
+                os.makedirs(os.path.join(res, generated))
+                open(os.path.join(res, generated, 'point_cloud.ply'), 'wb').close()
+            open(os.path.join(res, 'notes.txt'), 'wb').close()
+
+            self.assertEqual(discover_scenes(res), {'chunked': ['chunks'], 'full': ['ply', 'chunks', 'map']})
+            self.assertEqual(discover_scenes(res, ['full', 'missing']), {'full': ['ply', 'chunks', 'map']})
+            # generated scenes are prewarmed only when named
+            self.assertEqual(discover_scenes(res, ['synth5m']), {'synth5m': ['ply']})
+            self.assertEqual(discover_scenes(os.path.join(res, 'nope')), {})
+
+    def test_status(self):
+        status = PrewarmStatus()
+        self.assertTrue(status.ready())          # prewarm disabled
+
+        status.begin()
+        status.plan({'a': ['ply', 'map'], 'b': ['map']})
+        self.assertFalse(status.ready())
+        status.start('a', 'ply')
+        status.done('a', 'ply', 1.5, full='build')
+        status.start('a', 'map')
+        status.fail('a', 'map', 0.1, 'Resource not found: map1.npz')
+        status.finish_scene('a')
+        status.finish()
+
+        report = status.report()
+        self.assertTrue(report['ready'])
+        self.assertEqual(report['scenes']['a']['status'], 'failed')
+        self.assertEqual(report['scenes']['a']['steps']['ply'], {'status': 'ready', 'seconds': 1.5, 'full': 'build'})
+        self.assertEqual(report['scenes']['b']['status'], 'pending')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import numpy as np
+
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, project_root)
+
+from src.scripts._prune import prune_stats, prune_target, select_rows, vertex_importance
+from src.scripts._splat import PLY_COLUMNS, process_vertices
+
+
+def make_vertices(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    v = np.zeros(n, dtype=[(name, '<f4') for name in PLY_COLUMNS])
+    for name in PLY_COLUMNS:
+        v[name] = rng.standard_normal(n).astype(np.float32)
+    return v
+
+
+class TestImportance(unittest.TestCase):
+
+    def test_scores_match_activated_rows(self):
+        v = make_vertices(500)
+        v['scale_0'][::50] = np.nan
+        scores = vertex_importance(v, reflectance_weight=0.5, block_rows=64)
+
+        X = process_vertices(v)
+        expected = X[:, 3] * np.pi * X[:, 4] * X[:, 5] * (1 + 0.5 * X[:, 22])
+        np.testing.assert_allclose(scores[np.isfinite(scores)], expected, rtol=1e-5)
+        self.assertEqual(int(np.count_nonzero(np.isneginf(scores))), 10)
+
+    def test_target_is_tightest_budget(self):
+        self.assertEqual(prune_target(1000, 64), 1000)
+        self.assertEqual(prune_target(1000, 64, max_splats=300), 300)
+        self.assertEqual(prune_target(1000, 64, max_splats=300, max_bytes=64 * 100 + 10), 100)
+        self.assertEqual(prune_target(50, 64, max_splats=300), 50)
+
+
+class TestSelection(unittest.TestCase):
+
+    def test_keeps_highest_scores_in_row_order(self):
+        scores = np.array([0.5, -np.inf, 3.0, 1.0, 3.0, 0.1], dtype=np.float32)
+        rows = select_rows(scores, 3)
+        self.assertEqual(rows.tolist(), [2, 3, 4])
+        # never selects invalid rows, even when asked for more
+        self.assertEqual(select_rows(scores, 10).tolist(), [0, 2, 3, 4, 5])
+
+    def test_stats(self):
+        scores = np.array([1.0, -np.inf, 3.0, 2.0, 4.0], dtype=np.float32)
+        stats = prune_stats(scores, select_rows(scores, 2))
+        self.assertEqual((stats['sourceSplats'], stats['validSplats']), (5, 4))
+        self.assertEqual((stats['keptSplats'], stats['droppedSplats']), (2, 2))
+        self.assertAlmostEqual(stats['keptImportance'], 0.7)
+        self.assertEqual(stats['threshold'], 3.0)
+        self.assertEqual(stats['droppedImportance'], {'max': 2.0, 'median': 1.5})
+
+if __name__ == '__main__':
+    unittest.main()
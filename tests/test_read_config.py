@@ -0,0 +1,76 @@
+import unittest
+import tempfile
+import json
+
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, project_root)
+
+from src.scripts._read_config import CONFIG_PATH, load_config, parse_config, validate_config
+
+SOURCE = """export const CONFIG = {
+  /* backend
+      PACKED_PIX_PER_SPLAT : pixels per splat
+  */
+  RAW_FLOAT_PER_SPLAT: 28,
+  PACKED_PIX_PER_SPLAT: 4,   // full layout
+  PACKED_LAYOUT: 'full',
+  PRECOMPRESS_ENCODINGS: ['zstd', 'gzip',],
+  PRUNE_VARIANTS: {
+    mobile: { maxSplats: 1000000, maxBytes: 33554432 },
+  },
+  PREFETCH_RADIUS: 4,
+  PREWARM: true
+} as const;
+"""
+
+
+class TestReadConfig(unittest.TestCase):
+
+    def test_parse(self):
+        config = parse_config(SOURCE)
+        self.assertEqual(config['PACKED_LAYOUT'], 'full')
+        self.assertEqual(config['PRECOMPRESS_ENCODINGS'], ['zstd', 'gzip'])
+        self.assertEqual(config['PRUNE_VARIANTS'], {'mobile': {'maxSplats': 1000000, 'maxBytes': 33554432}})
+        self.assertIs(validate_config(config), config)
+
+    def test_validate(self):
+        config = parse_config(SOURCE)
+        with self.assertRaisesRegex(ValueError, 'PREWARM must be bool'):
+            validate_config({**config, 'PREWARM': 1})
+        with self.assertRaisesRegex(ValueError, 'MEMORY_CACHE_BYTES must be int'):
+            validate_config({**config, 'MEMORY_CACHE_BYTES': True})
+        with self.assertRaisesRegex(ValueError, 'RAW_FLOAT_PER_SPLAT is missing'):
+            validate_config({'PACKED_PIX_PER_SPLAT': 4})
+
+    def test_compiled_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'config.ts')
+            compiled_path = os.path.join(tmp, '__pycache__', 'config.json')
+            with open(path, 'w') as f:
+                f.write(SOURCE)
+            config = load_config(path, compiled_path)
+            with open(compiled_path) as f:
+                self.assertEqual(json.load(f)['config'], config)
+
+            # served from the compiled file while the source is unchanged
+            with open(compiled_path) as f:
+                compiled = json.load(f)
+            compiled['config']['PACKED_LAYOUT'] = 'cached'
+            with open(compiled_path, 'w') as f:
+                json.dump(compiled, f)
+            self.assertEqual(load_config(path, compiled_path)['PACKED_LAYOUT'], 'cached')
+
+            # an edit to config.ts recompiles
+            with open(path, 'w') as f:
+                f.write(SOURCE.replace("'full'", "'compact'") + "\n")
+            self.assertEqual(load_config(path, compiled_path)['PACKED_LAYOUT'], 'compact')
+
+    def test_repo_config_is_valid(self):
+        with open(CONFIG_PATH) as f:
+            validate_config(parse_config(f.read()))
+
+
+if __name__ == '__main__':
+    unittest.main()
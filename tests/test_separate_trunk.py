@@ -0,0 +1,164 @@
+import unittest
+import tempfile
+import gzip
+import numpy as np
+
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, project_root)
+
+from src.scripts.separate_trunk import _npz_bytes, write_chunks, write_chunk_archive, remove_orphans
+from src.scripts._archive import ChunkArchive, archive_paths, archive_variant
+from src.scripts._encoding import shuffle_bytes
+from src.scripts._manifest import chunk_variants, variant_file
+from src.scripts._partition import grid_partition
+
+
+class TestWriteChunks(unittest.TestCase):
+
+    def test_npz_bytes_loads_like_savez(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'c.npz')
+            raw = np.arange(64, dtype=np.uint32)
+            with open(path, 'wb') as f:
+                f.write(_npz_bytes(raw_data=raw, vertexCount=4))
+            with np.load(path) as npz:
+                np.testing.assert_array_equal(npz['raw_data'], raw)
+                self.assertEqual(int(npz['vertexCount']), 4)
+
+    def test_chunks_are_row_slices_of_the_scene(self):
+        rng = np.random.default_rng(0)
+        points = rng.uniform(0, 4, (500, 3)).astype(np.float32)
+        raw = rng.integers(0, 2**32, (500, 16), dtype=np.uint32)
+        cells = grid_partition(points, 2.0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            serial, hashes, _ = write_chunks(raw, cells, tmp, 4, workers=1)
+            parallel, _, _ = write_chunks(raw, cells, tmp, 4, workers=3)
+            self.assertEqual(serial, parallel)
+
+            for cell, entry in zip(cells, serial):
+                with np.load(os.path.join(tmp, entry['file'])) as npz:
+                    np.testing.assert_array_equal(npz['raw_data'], raw[cell.rows].reshape(-1))
+                self.assertEqual(entry['vertexCount'], cell.rows.size)
+
+    def test_incremental_rewrite(self):
+        rng = np.random.default_rng(0)
+        points = rng.uniform(0, 4, (500, 3)).astype(np.float32)
+        raw = rng.integers(0, 2**32, (500, 16), dtype=np.uint32)
+        cells = grid_partition(points, 2.0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            _, hashes, written = write_chunks(raw, cells, tmp, 4, params=b'a')
+            self.assertEqual(written, len(cells))
+
+            # unchanged rows and parameters: nothing is rewritten
+            _, same, written = write_chunks(raw, cells, tmp, 4, params=b'a', previous=hashes)
+            self.assertEqual((same, written), (hashes, 0))
+
+            # one edited splat packs and rewrites exactly its chunk
+            raw[cells[0].rows[0], 3] ^= 1
+            packed = []
+            pack = lambda i: packed.append(i) or raw[cells[i].rows]
+            _, edited, written = write_chunks(raw, cells, tmp, 4, params=b'a', previous=hashes, pack=pack)
+            self.assertEqual((written, packed), (1, [0]))
+            self.assertNotEqual(edited[cells[0].id], hashes[cells[0].id])
+
+            # new parameters invalidate everything; missing files are rewritten
+            os.remove(os.path.join(tmp, f'{cells[1].id}.npz'))
+            _, _, written = write_chunks(raw, cells, tmp, 4, params=b'a', previous=edited)
+            self.assertEqual(written, 1)
+            _, _, written = write_chunks(raw, cells, tmp, 4, params=b'b', previous=edited)
+            self.assertEqual(written, len(cells))
+
+    def test_archive_matches_files(self):
+        rng = np.random.default_rng(0)
+        points = rng.uniform(0, 4, (500, 3)).astype(np.float32)
+        raw = rng.integers(0, 2**32, (500, 16), dtype=np.uint32)
+        cells = grid_partition(points, 2.0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            files_meta, file_hashes, _ = write_chunks(raw, cells, tmp, 4, params=b'a')
+            meta, hashes, changed = write_chunk_archive(raw, cells, tmp, 4, params=b'a')
+            self.assertEqual((hashes, changed), (file_hashes, len(cells)))
+            self.assertEqual([e['vertexCount'] for e in meta], [e['vertexCount'] for e in files_meta])
+
+            archive = ChunkArchive(tmp)
+            for entry in files_meta:
+                with np.load(os.path.join(tmp, entry['file'])) as npz:
+                    self.assertEqual(bytes(archive.payload(entry['id'])), npz['raw_data'].tobytes())
+
+            # unchanged chunks leave the archive alone
+            data_path, _ = archive_paths(tmp)
+            mtime = os.stat(data_path).st_mtime_ns
+            _, _, changed = write_chunk_archive(raw, cells, tmp, 4, params=b'a')
+            self.assertEqual(changed, 0)
+            self.assertEqual(os.stat(data_path).st_mtime_ns, mtime)
+
+    def test_archive_rewrites_only_the_changed_chunk(self):
+        rng = np.random.default_rng(0)
+        points = rng.uniform(0, 4, (500, 3)).astype(np.float32)
+        raw = rng.integers(0, 2**32, (500, 16), dtype=np.uint32)
+        cells = grid_partition(points, 2.0)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            write_chunk_archive(raw, cells, tmp, 4, params=b'a')
+            before = ChunkArchive(tmp)
+            data_path, _ = archive_paths(tmp)
+            with open(data_path, 'rb') as f:
+                old_bytes = f.read()
+
+            raw[cells[0].rows[0], 3] ^= 1
+            packed = []
+            pack = lambda i: packed.append(i) or raw[cells[i].rows]
+            _, _, changed = write_chunk_archive(raw, cells, tmp, 4, params=b'a', pack=pack)
+            self.assertEqual((changed, packed), (1, [0]))
+
+            after = ChunkArchive(tmp)
+            with open(data_path, 'rb') as f:
+                self.assertEqual(f.read(len(old_bytes)), old_bytes)
+            for cell in cells[1:]:
+                row = after.index[cell.id]
+                self.assertEqual(after.records[row]['offset'], before.records[before.index[cell.id]]['offset'])
+                self.assertEqual(bytes(after.payload(cell.id)), bytes(before.payload(cell.id)))
+            self.assertGreaterEqual(int(after.records[after.index[cells[0].id]]['offset']), len(old_bytes))
+            self.assertEqual(bytes(after.payload(cells[0].id)), raw[cells[0].rows].tobytes())
+
+    def test_precompressed_variants(self):
+        rng = np.random.default_rng(0)
+        points = rng.uniform(0, 4, (500, 3)).astype(np.float32)
+        raw = rng.integers(0, 2**32, (500, 16), dtype=np.uint32)
+        cells = grid_partition(points, 2.0)
+        variants = chunk_variants(['gzip'], True)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            write_chunks(raw, cells, tmp, 4, variants=variants)
+            write_chunk_archive(raw, cells, tmp, 4, variants=variants)
+            packed = ChunkArchive(tmp, archive_variant('gzip'))
+            shuffled = ChunkArchive(tmp, archive_variant('gzip', shuffled=True))
+            for cell in cells:
+                rows = raw[cell.rows].tobytes()
+                with open(os.path.join(tmp, variant_file(cell.id, 'packed', 'gzip')), 'rb') as f:
+                    self.assertEqual(gzip.decompress(f.read()), rows)
+                with open(os.path.join(tmp, variant_file(cell.id, 'shuffled', 'gzip')), 'rb') as f:
+                    self.assertEqual(gzip.decompress(f.read()), shuffle_bytes(rows, 64))
+                self.assertEqual(gzip.decompress(packed.payload(cell.id)), rows)
+                self.assertEqual(gzip.decompress(shuffled.payload(cell.id)), shuffle_bytes(rows, 64))
+
+            # a missing variant file rewrites its chunk
+            _, hashes, _ = write_chunks(raw, cells, tmp, 4, variants=variants)
+            os.remove(os.path.join(tmp, variant_file(cells[0].id, 'shuffled', 'gzip')))
+            _, _, written = write_chunks(raw, cells, tmp, 4, previous=hashes, variants=variants)
+            self.assertEqual(written, 1)
+
+    def test_remove_orphans(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ['a.npz', 'a.bin.gz', 'b.npz', 'b.bin.gz', 'chunks.bin', 'chunks.idx',
+                         'chunks.gzip.bin', 'metadata.json']:
+                open(os.path.join(tmp, name), 'wb').close()
+            self.assertEqual(remove_orphans(tmp, {'a.npz', 'a.bin.gz'}), 5)
+            self.assertEqual(sorted(os.listdir(tmp)), ['a.bin.gz', 'a.npz', 'metadata.json'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import tempfile
+import numpy as np
+
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, project_root)
+
+from src.scripts import _synthetic
+from src.scripts._ply import read_ply_vertices
+from src.scripts._splat import PLY_COLUMNS, process_vertices
+from src.scripts.benchmark import compare
+
+
+class TestSyntheticScene(unittest.TestCase):
+
+    def test_ply_is_deterministic_and_loadable(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            a, b = os.path.join(tmp, 'a.ply'), os.path.join(tmp, 'b.ply')
+            _synthetic.write_synthetic_ply(a, 5000, seed=3)
+            _synthetic.write_synthetic_ply(b, 5000, seed=3)
+            with open(a, 'rb') as fa, open(b, 'rb') as fb:
+                self.assertEqual(fa.read(), fb.read())
+
+            v = read_ply_vertices(a)
+            self.assertEqual(list(v.dtype.names), PLY_COLUMNS)
+            X = process_vertices(v)
+            # a few invalid rows are generated and dropped by the loader
+            self.assertLess(X.shape[0], 5000)
+            self.assertGreater(X.shape[0], 4950)
+
+
+class TestCompare(unittest.TestCase):
+
+    def test_flags_slower_stages(self):
+        def report(*walls):
+            return {'results': [
+                {'scene': 's', 'stage': stage, 'wall_s': wall, 'peak_rss_bytes': 100}
+                for stage, wall in zip(['ply', 'map'], walls)
+            ]}
+        rows = compare(report(1.0, 1.0), report(1.1, 2.0), threshold=1.2)
+        self.assertEqual([(r['stage'], r['regression']) for r in rows], [('ply', False), ('map', True)])
+        self.assertAlmostEqual(rows[1]['time_ratio'], 2.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+
+import os
+import sys
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+sys.path.insert(0, project_root)
+
+from src.scripts._visibility import (
+    parse_matrix, frustum_planes, boxes_in_frustum, projected_area, visible_order,
+)
+
+
+def _perspective(fov_deg=90.0, aspect=1.0, near=0.1, far=100.0):
+    # OpenGL projection; the camera sits at the origin looking down -Z
+    f = 1.0 / np.tan(np.radians(fov_deg) / 2)
+    return np.array([
+        [f / aspect, 0, 0, 0],
+        [0, f, 0, 0],
+        [0, 0, (far + near) / (near - far), 2 * far * near / (near - far)],
+        [0, 0, -1, 0],
+    ])
+
+
+def _box(center, half=0.5):
+    c = np.asarray(center, dtype=np.float32)
+    return np.stack([c - half, c + half])
+
+
+BOUNDS = np.stack([
+    _box([0, 0, -10]),    # ahead, far
+    _box([0, 0, 5]),      # behind
+    _box([30, 0, -5]),    # outside the right plane
+    _box([1, 0, -3]),     # ahead, near
+    _box([0, 0, -200]),   # beyond the far plane
+    _box([0, 0, 0], 2.0), # contains the camera
+])
+
+
+class TestVisibility(unittest.TestCase):
+
+    def test_column_major_matrix(self):
+        m = _perspective()
+        np.testing.assert_array_equal(parse_matrix(m.flatten(order="F")), m)
+        with self.assertRaises(ValueError):
+            parse_matrix([1, 2, 3])
+
+    def test_frustum_mask(self):
+        mask = boxes_in_frustum(BOUNDS, frustum_planes(_perspective()))
+        self.assertEqual(mask.tolist(), [True, False, False, True, False, True])
+
+    def test_distance_order_and_budget(self):
+        rows = visible_order(BOUNDS, _perspective(), camera=[0, 0, 0])
+        self.assertEqual(rows.tolist(), [5, 3, 0])
+        rows = visible_order(BOUNDS, _perspective(), camera=[0, 0, 0], budget=2)
+        self.assertEqual(rows.tolist(), [5, 3])
+
+    def test_area_order(self):
+        area = projected_area(BOUNDS[[0, 3, 5]], _perspective())
+        self.assertGreater(area[1], area[0])
+        self.assertEqual(area[2], 4.0)   # straddles the near plane
+        rows = visible_order(BOUNDS, _perspective(), order="area")
+        self.assertEqual(rows.tolist(), [5, 3, 0])
+
+if __name__ == '__main__':
+    unittest.main()